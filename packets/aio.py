@@ -0,0 +1,194 @@
+"""An asyncio backend for running capinfos and mergecap"""
+# python standard library
+import asyncio
+import shlex
+
+# this project
+from .base import AlpacaBase
+from .defaults import GetDefaults
+from .errors import CaptureFormatError
+
+
+class AsyncDefaults:
+    """Default values for the asyncio backend"""
+    limit = GetDefaults.workers
+    chunk_size = 2**20
+    merge_command = "mergecap -w -"
+
+
+class AsyncTools(AlpacaBase):
+    """Runs the external tools on an event loop
+
+    capinfos and mergecap are started with ``create_subprocess_exec`` and
+    no more than ``limit`` of them run at once. Their output is read as it
+    comes (line by line for capinfos, chunk by chunk for mergecap) instead
+    of being gathered up by the process. The native reading and merging
+    (and the catalog) still block, so they're run on threads.
+
+    Args:
+     limit (int): most tools to run at the same time
+     chunk_size (int): bytes of mergecap's output to pass on at a time
+    """
+    def __init__(self, limit=AsyncDefaults.limit,
+                 chunk_size=AsyncDefaults.chunk_size, *args, **kwargs):
+        super(AsyncTools, self).__init__(*args, **kwargs)
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self._semaphore = None
+        return
+
+    @property
+    def semaphore(self):
+        """Limits the tools running at once (made on the running loop)"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def output(self, command):
+        """Runs a command and reads its output
+
+        Args:
+         command (list): the command and its arguments
+
+        Returns:
+         str: what it printed to stdout
+        """
+        lines = []
+        async with self.semaphore:
+            self.logger.debug("Running: '%s'", " ".join(command))
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL)
+            async for line in process.stdout:
+                lines.append(line.decode("utf-8", "replace"))
+            await process.wait()
+        return "".join(lines)
+
+    def readable(self, capture):
+        """Checks if the native reader can read a capture (run on a thread)
+
+        Args:
+         capture (CaptureInfo): the capture
+
+        Returns:
+         bool: True if it's a libpcap or pcapng file
+        """
+        try:
+            capture.reader.header
+        except CaptureFormatError as error:
+            self.logger.debug("Using '%s' for %s: %s", capture.command,
+                              capture.path, error)
+            return False
+        return True
+
+    async def probe(self, capture):
+        """Runs capinfos for a capture the native reader can't read
+
+        Args:
+         capture (CaptureInfo): the capture
+
+        Returns:
+         CaptureInfo: the capture (with capinfos' output if it was needed)
+        """
+        if capture.native and await asyncio.to_thread(self.readable,
+                                                      capture):
+            return capture
+        capture.native = False
+        capture.output = await self.output(
+            shlex.split(capture.command) + [capture.path])
+        return capture
+
+    async def prepare(self, filterer):
+        """Runs capinfos for the files that need it before they're filtered
+
+        Args:
+         filterer (FileFilterer): the filterer for a source directory
+        """
+        captures = await asyncio.to_thread(list, filterer.all_files)
+        filterer.captures = await asyncio.gather(
+            *(self.probe(capture) for capture in captures))
+        return
+
+    def stop(self, process):
+        """Kills a tool that's still running
+
+        Args:
+         process (asyncio.subprocess.Process): the tool's process
+        """
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        return
+
+    async def mergecap(self, merger):
+        """Merges the files with mergecap, passing its output on as it comes
+
+        Args:
+         merger (Merger): the merger (its target and compression are used)
+        """
+        command = shlex.split(AsyncDefaults.merge_command) + list(
+            merger.files)
+        async with self.semaphore:
+            self.logger.debug("Running: '%s'", " ".join(command))
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE)
+            try:
+                with merger.open() as stream, \
+                     merger.compressor(stream) as output:
+                    while True:
+                        chunk = await process.stdout.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        await asyncio.to_thread(output.write, chunk)
+            except BrokenPipeError:
+                self.stop(process)
+                if not merger.streaming:
+                    raise
+                merger.stop_streaming()
+            except BaseException:
+                # cancelled (or the output failed), don't leave it running
+                self.stop(process)
+                raise
+            finally:
+                returncode = await process.wait()
+        if returncode > 0:
+            self.logger.warning("mergecap exited with %d", returncode)
+        return
+
+    async def merge(self, merger):
+        """Merges the files (natively on a thread when it can)
+
+        Args:
+         merger (Merger): the merger for the files
+
+        Returns:
+         PcapWriter: the native merge's writer (None for mergecap)
+        """
+        if not merger.files:
+            self.logger.warning("No packet files to merge")
+            return None
+        if merger.native:
+            try:
+                await asyncio.to_thread(merger.engine.validate)
+            except CaptureFormatError as error:
+                self.logger.debug("Falling back to mergecap: %s", error)
+                merger.native = False
+        if merger.native or (merger.fan_in is not None
+                             and len(merger.files) > merger.fan_in):
+            return await asyncio.to_thread(merger)
+        if merger.dedupe is not None:
+            self.logger.warning("mergecap is merging, the duplicate frames "
+                                "are kept")
+        await self.mergecap(merger)
+        return None
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.limit > 0
+        return
@@ -5,44 +5,52 @@ from abc import (
     ABC,
     abstractmethod,
     )
-from logging.config import dictConfig
 import logging
 
+# this project
+from .defaults import LoggingDefaults
+
+
+class LoggingHandler:
+    """The handler added to the root logger (once per process)"""
+    handler = None
+
+
+def configure_logging(level=LoggingDefaults.level):
+    """Sets up logging for the whole process
+
+    The handler is only added the first time, calling it again just changes
+    the level. Code using the classes as a library can configure logging
+    its own way instead.
+
+    Args:
+     level (str): name of the least severe level to show (e.g. 'debug')
+    """
+    root = logging.getLogger()
+    if LoggingHandler.handler is None:
+        LoggingHandler.handler = logging.StreamHandler()
+        LoggingHandler.handler.setFormatter(
+            logging.Formatter(LoggingDefaults.format))
+        root.addHandler(LoggingHandler.handler)
+    root.setLevel(level.upper())
+    return
+
+
 class AlpacaBase(ABC):
-    """Base class for most things ALPaCa"""
+    """Base class for most things ALPaCa
+
+    The logger is the module's logger, getting it doesn't change the logging
+    configuration (see ``configure_logging``)
+    """
     def __init__(self):
-        self._logging_configuration = None
         self._logger = None
         return
 
-    @property
-    def logging_configuration(self):
-        """dictionary of logging values"""
-        if self._logging_configuration is None:
-            self._logging_configuration = dict(
-                version = 1,
-                formatters = {
-                    'f': {'format':
-                          '%(asctime)s %(name)-12s %(levelname)-8s %(message)s'}
-                },
-                handlers = {
-                    'h': {'class': 'logging.StreamHandler',
-                          'formatter': 'f',
-                          'level': logging.DEBUG}
-                },
-                root = {
-                    'handlers': ['h'],
-                    'level': logging.DEBUG,
-                },
-            )
-        return self._logging_configuration
-
     @property
     def logger(self):
         """a python logger"""
         if self._logger is None:
-            dictConfig(self.logging_configuration)
-            self._logger = logging.getLogger()
+            self._logger = logging.getLogger(type(self).__module__)
         return self._logger
 
     @abstractmethod
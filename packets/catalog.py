@@ -0,0 +1,456 @@
+"""A persistent catalog of the capture files' metadata"""
+# python standard library
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os
+import sqlite3
+import time
+
+# this project
+from .base import AlpacaBase
+from .errors import CaptureFormatError
+
+
+class CatalogDefaults:
+    """Default values for the catalog"""
+    name = ".packets-catalog.sqlite3"
+    heartbeat = 10
+    largest = 2**63 - 1
+    minute = 60 * 10**9
+    version = 1
+
+
+Entry = namedtuple("Entry", ["name", "size", "mtime", "first", "last",
+                             "packets", "end"])
+
+Minute = namedtuple("Minute", ["name", "minute", "packets", "bytes", "peak",
+                               "second", "count"])
+
+Bucket = namedtuple("Bucket", ["start", "packets", "bytes", "peak"])
+
+
+class Rollup:
+    """Adds up a capture's packets per minute as its records are walked
+
+    The peak is the most packets in any one second of the minute. The
+    second being counted (and its count so far) are kept with the minute,
+    so a file that only grew is added up from where the last walk stopped
+    and its rollups come out the same as if it had been walked in one go
+
+    Args:
+     name (str): the capture's file name
+     resumed (Minute): the stored minute the last walk stopped in (None to
+       start over)
+    """
+    def __init__(self, name, resumed=None):
+        self.name = name
+        self.minutes = {}
+        self.since = None
+        if resumed is not None:
+            self.minutes[resumed.minute] = list(resumed[2:])
+            self.since = resumed.minute
+        self._minute = None
+        self._counts = None
+        return
+
+    def add(self, timestamp, length):
+        """Counts a packet
+
+        Args:
+         timestamp (int): the packet's epoch nanoseconds
+         length (int): the packet's original length
+        """
+        minute = timestamp - timestamp % CatalogDefaults.minute
+        if minute != self._minute:
+            self._minute = minute
+            self._counts = self.minutes.setdefault(minute, [0, 0, 0, None, 0])
+        counts = self._counts
+        counts[0] += 1
+        counts[1] += length
+        second = timestamp // 10**9
+        if counts[3] == second:
+            counts[4] += 1
+        else:
+            counts[3], counts[4] = second, 1
+        if counts[4] > counts[2]:
+            counts[2] = counts[4]
+        return
+
+    @property
+    def rows(self):
+        """The Minutes in time order"""
+        return [Minute(self.name, minute, *counts)
+                for minute, counts in sorted(self.minutes.items())]
+
+
+class Catalog(AlpacaBase):
+    """Stores the size, mtime, timestamps and packet-count of capture files
+
+    The catalog lives in a SQLite file (by default in the capture directory)
+    and captures are only re-probed when their size or mtime changes. The
+    timestamps are stored as epoch nanoseconds.
+
+    While a watcher (``packets index --watch``) keeps the catalog current
+    its heartbeat is stored with the entries and lookups don't stat the
+    files at all.
+
+    Each probe also adds up the capture's packets, bytes and peak rate per
+    minute (see Rollup), so timelines come from the catalog instead of the
+    captures. A file's rollups are only replaced when it changes.
+
+    Args:
+     directory (str): the directory with the capture files
+     path (str): the SQLite file (default is in the directory)
+     workers (int): number of files to probe at the same time
+     shared (bool): let several threads use the connection (the caller has
+       to take turns)
+    """
+    schema = """
+    CREATE TABLE IF NOT EXISTS captures (
+        name TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime INTEGER NOT NULL,
+        first INTEGER,
+        last INTEGER,
+        packets INTEGER,
+        end INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS captures_first ON captures (first);
+    CREATE INDEX IF NOT EXISTS captures_last ON captures (last);
+    CREATE TABLE IF NOT EXISTS rollups (
+        name TEXT NOT NULL,
+        minute INTEGER NOT NULL,
+        packets INTEGER NOT NULL,
+        bytes INTEGER NOT NULL,
+        peak INTEGER NOT NULL,
+        second INTEGER,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (name, minute)
+    );
+    CREATE INDEX IF NOT EXISTS rollups_minute ON rollups (minute);
+    CREATE TABLE IF NOT EXISTS watcher (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        heartbeat REAL NOT NULL
+    );
+    """
+
+    def __init__(self, directory, path=None, workers=1, shared=False,
+                 *args, **kwargs):
+        super(Catalog, self).__init__(*args, **kwargs)
+        self.directory = Path(directory)
+        self.path = (Path(path) if path is not None
+                     else self.directory/CatalogDefaults.name)
+        self.workers = workers
+        self.shared = shared
+        self._connection = None
+        return
+
+    @classmethod
+    def is_catalog(cls, name):
+        """Checks if a file is a catalog (or one of its journals)
+
+        Args:
+         name (str): path to check
+
+        Returns:
+         bool: True if the file belongs to a catalog
+        """
+        return os.path.basename(name).startswith(CatalogDefaults.name)
+
+    @property
+    def connection(self):
+        """Connection to the SQLite database
+
+        A catalog from before the rollups has its entries dropped so that
+        every capture is probed (and rolled up) again
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                str(self.path), check_same_thread=not self.shared)
+            self._connection.executescript(self.schema)
+            version, = self._connection.execute(
+                "PRAGMA user_version").fetchone()
+            if version < CatalogDefaults.version:
+                with self._connection:
+                    self._connection.execute("DELETE FROM captures")
+                    self._connection.execute(
+                        "PRAGMA user_version = {}".format(
+                            CatalogDefaults.version))
+        return self._connection
+
+    @property
+    def entries(self):
+        """Dictionary of stored entries keyed by file-name"""
+        rows = self.connection.execute(
+            "SELECT {} FROM captures".format(", ".join(Entry._fields)))
+        return {row[0]: Entry(*row) for row in rows}
+
+    def resumed(self, previous):
+        """Gets the last stored minute of a capture's rollups
+
+        Args:
+         previous (Entry): what was stored for the capture (or None)
+
+        Returns:
+         Minute: the minute its last probe stopped in (None if there isn't
+           one)
+        """
+        if previous is None:
+            return None
+        row = self.connection.execute(
+            "SELECT {} FROM rollups WHERE name = ? ORDER BY minute DESC "
+            "LIMIT 1".format(", ".join(Minute._fields)),
+            (previous.name,)).fetchone()
+        return None if row is None else Minute(*row)
+
+    def probe(self, capture, stat, previous=None, resumed=None):
+        """Gets the metadata (and rollups) for a capture file
+
+        A file that only grew since the last probe (the file tcpdump is
+        currently writing) is only walked from where the last probe stopped
+
+        Args:
+         capture (CaptureInfo): the capture to probe
+         stat (os.stat_result): the capture's stat
+         previous (Entry): what was stored for the file before
+         resumed (Minute): the minute the last probe's rollups stopped in
+
+        Returns:
+         tuple: the new Entry for the file and its Rollup
+        """
+        name = os.path.basename(capture.path)
+        self.logger.debug("Probing %s", capture.path)
+        rollup = Rollup(name)
+        try:
+            first = capture.reader.first
+            resume = (previous is not None
+                      and previous.end is not None
+                      and previous.first == first
+                      and stat.st_size >= previous.size)
+            offset = (previous.end if resume
+                      else capture.reader.data_offset)
+            if resume:
+                rollup = Rollup(name, resumed)
+            packets, last, end = capture.reader.scan(offset, rollup)
+            if resume:
+                packets += previous.packets
+                last = previous.last if last is None else last
+        except CaptureFormatError as error:
+            self.logger.debug("Not indexing natively: %s", error)
+            capture.native = False
+            first = capture.first
+            last = capture.last
+            packets, end = None, None
+        return (Entry(name=name, size=stat.st_size, mtime=stat.st_mtime_ns,
+                      first=first, last=last, packets=packets, end=end),
+                rollup)
+
+    def changes(self, captures, stored):
+        """Finds the captures whose size or mtime changed
+
+        Args:
+         captures (iter): CaptureInfo objects to check
+         stored (dict): the stored entries keyed by name
+
+        Returns:
+         list: (capture, stat, previous entry) for each changed capture
+        """
+        changed = []
+        for capture in captures:
+            stat = os.stat(capture.path)
+            previous = stored.get(os.path.basename(capture.path))
+            if (previous is None or previous.size != stat.st_size
+                    or previous.mtime != stat.st_mtime_ns):
+                changed.append((capture, stat, previous))
+        return changed
+
+    def store(self, changed, gone):
+        """Probes the changed captures and saves the catalog
+
+        A capture's rollups from the minute its probe started in are
+        replaced (all of them unless it was only walked from where it
+        stopped)
+
+        Args:
+         changed (list): (capture, stat, previous entry) tuples to probe
+         gone (list): names of the files to drop
+        """
+        changed = [arguments + (self.resumed(arguments[2]),)
+                   for arguments in changed]
+        if self.workers > 1 and len(changed) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                probed = list(pool.map(self.probe, *zip(*changed)))
+        else:
+            probed = [self.probe(*arguments) for arguments in changed]
+        gone = [(name,) for name in gone]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO captures ({}) VALUES ({})".format(
+                    ", ".join(Entry._fields),
+                    ", ".join("?" * len(Entry._fields))),
+                [entry for entry, _ in probed])
+            self.connection.executemany(
+                "DELETE FROM rollups WHERE name = ? AND minute >= ?",
+                [(rollup.name, -CatalogDefaults.largest
+                  if rollup.since is None else rollup.since)
+                 for _, rollup in probed])
+            self.connection.executemany(
+                "INSERT INTO rollups ({}) VALUES ({})".format(
+                    ", ".join(Minute._fields),
+                    ", ".join("?" * len(Minute._fields))),
+                [row for _, rollup in probed for row in rollup.rows])
+            self.connection.executemany(
+                "DELETE FROM captures WHERE name = ?", gone)
+            self.connection.executemany(
+                "DELETE FROM rollups WHERE name = ?", gone)
+        self.logger.debug("Catalog: %d probed, %d dropped", len(probed),
+                          len(gone))
+        return
+
+    def update(self, captures):
+        """Re-probes the captures that changed and drops deleted files
+
+        Args:
+         captures (iter): CaptureInfo objects for the files in the directory
+        """
+        captures = list(captures)
+        stored = self.entries
+        seen = set(os.path.basename(capture.path) for capture in captures)
+        self.store(self.changes(captures, stored),
+                   [name for name in stored if name not in seen
+                    and not (self.directory/name).exists()])
+        return
+
+    def refresh(self, captures, gone=()):
+        """Updates only some of the files (e.g. the ones a watcher saw change)
+
+        Args:
+         captures (iter): CaptureInfo objects for new or changed files
+         gone (iter): names of files that were deleted (or moved away)
+        """
+        captures = list(captures)
+        names = [os.path.basename(capture.path) for capture in captures]
+        rows = self.connection.execute(
+            "SELECT {} FROM captures WHERE name IN ({})".format(
+                ", ".join(Entry._fields), ", ".join("?" * len(names))),
+            names)
+        self.store(self.changes(captures, {row[0]: Entry(*row)
+                                           for row in rows}),
+                   list(gone))
+        return
+
+    def beat(self):
+        """Records that a watcher is keeping the catalog current"""
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO watcher (id, heartbeat) VALUES (0, ?)",
+                (time.time(),))
+        return
+
+    @property
+    def watched(self):
+        """True if a watcher has beaten recently"""
+        row = self.connection.execute(
+            "SELECT heartbeat FROM watcher WHERE id = 0").fetchone()
+        return (row is not None
+                and time.time() - row[0] < CatalogDefaults.heartbeat)
+
+    def current(self, captures):
+        """Brings the catalog up to date (unless a watcher is doing it)
+
+        Args:
+         captures (iter): CaptureInfo objects for the files in the directory
+
+        Returns:
+         list: the captures
+        """
+        captures = list(captures)
+        if self.watched:
+            self.logger.debug("The catalog is being watched, not updating")
+        else:
+            self.update(captures)
+        return captures
+
+    def between(self, captures, start=None, end=None):
+        """Gets the captures that have packets within the times
+
+        Args:
+         captures (list): CaptureInfo objects for the candidate files
+         start (int): earliest packet time in epoch nanoseconds (or None)
+         end (int): latest packet time in epoch nanoseconds (or None)
+
+        Returns:
+         list: paths of the matching captures ordered by first packet
+        """
+        captures = self.current(captures)
+        paths = {os.path.basename(capture.path): capture.path
+                 for capture in captures}
+        clauses, values = ["first IS NOT NULL"], []
+        # the default end (the year 9999) doesn't fit in sqlite's integers
+        if start is not None:
+            clauses.append("last >= ?")
+            values.append(max(start, -CatalogDefaults.largest))
+        if end is not None:
+            clauses.append("first <= ?")
+            values.append(min(end, CatalogDefaults.largest))
+        rows = self.connection.execute(
+            "SELECT name FROM captures WHERE {} ORDER BY first, name".format(
+                " AND ".join(clauses)),
+            values)
+        return [paths[name] for name, in rows if name in paths]
+
+    def timeline(self, captures, start=None, end=None,
+                 bucket=CatalogDefaults.minute):
+        """Adds up the captures' rollups over time
+
+        Only the rollups are read (and the files that changed re-probed).
+        Where files overlap in a minute (e.g. at a rotation) the peak is the
+        larger of their peaks.
+
+        Args:
+         captures (list): CaptureInfo objects for the files to count
+         start (int): epoch nanoseconds of the earliest minute (or None)
+         end (int): epoch nanoseconds of the latest minute (or None)
+         bucket (int): nanoseconds per bucket (a whole number of minutes)
+
+        Returns:
+         list: Buckets (packets, bytes and peak packets per second) in time
+           order, leaving out the ones without packets
+        """
+        names = set(os.path.basename(capture.path)
+                    for capture in self.current(captures))
+        start = (-CatalogDefaults.largest if start is None
+                 else max(start - start % CatalogDefaults.minute,
+                          -CatalogDefaults.largest))
+        end = (CatalogDefaults.largest if end is None
+               else min(end, CatalogDefaults.largest))
+        rows = self.connection.execute(
+            "SELECT name, minute, packets, bytes, peak FROM rollups "
+            "WHERE minute >= ? AND minute <= ? ORDER BY minute",
+            (start, end))
+        buckets = {}
+        for name, minute, packets, size, peak in rows:
+            if name not in names:
+                continue
+            totals = buckets.setdefault(minute - minute % bucket, [0, 0, 0])
+            totals[0] += packets
+            totals[1] += size
+            totals[2] = max(totals[2], peak)
+        return [Bucket(start, *totals)
+                for start, totals in sorted(buckets.items())]
+
+    def close(self):
+        """Closes the database connection"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        return
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        return
@@ -0,0 +1,324 @@
+"""Multi-threaded compression of the merged output"""
+# python standard library
+from abc import abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import bz2
+import struct
+import time
+import zlib
+
+# this project
+from .base import AlpacaBase
+
+
+class CompressionDefaults:
+    """Default values for the compressors"""
+    block_size = 2**17
+    dictionary_size = 2**15
+    level = 6
+    bz2_block_size = 900 * 1000
+    bz2_level = 9
+
+
+class BlockCompressor(AlpacaBase):
+    """Compresses a stream in independent blocks on several threads
+
+    Like pigz, the data is cut into blocks that are compressed at the same
+    time by a pool of threads (zlib and bz2 release the GIL) and written out
+    in order. At most two blocks per worker are held at once.
+
+    Args:
+     stream: binary file-object to write the compressed data to
+     workers (int): number of blocks to compress at the same time
+     block_size (int): bytes of uncompressed data per block
+     name (str): name of the uncompressed file (for archive formats)
+    """
+    suffix = None
+    default_block_size = CompressionDefaults.block_size
+
+    def __init__(self, stream, workers=1, block_size=None, name=None,
+                 *args, **kwargs):
+        super(BlockCompressor, self).__init__(*args, **kwargs)
+        self.stream = stream
+        self.workers = workers
+        self.block_size = block_size or self.default_block_size
+        self.name = name
+        self.started = False
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.size = 0
+        self.written = 0
+        self.closed = False
+        self._pool = None
+        self._previous = b""
+        return
+
+    @property
+    def pool(self):
+        """The thread pool compressing the blocks"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def output(self, data):
+        """Writes compressed bytes to the stream
+
+        Args:
+         data (bytes): bytes to write
+        """
+        self.stream.write(data)
+        self.written += len(data)
+        return
+
+    def start(self):
+        """Writes the header the first time it's called"""
+        if not self.started:
+            self.started = True
+            self.output(self.header())
+        return
+
+    def write(self, data):
+        """Adds uncompressed data
+
+        Args:
+         data (bytes): the data to compress
+
+        Returns:
+         int: the number of bytes taken
+        """
+        self.start()
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            block = bytes(self.buffer[:self.block_size])
+            del self.buffer[:self.block_size]
+            self.submit(block)
+        return len(data)
+
+    def submit(self, block, last=False):
+        """Hands a block to the pool and writes out finished blocks
+
+        Args:
+         block (bytes): uncompressed block
+         last (bool): True if this is the final block
+        """
+        self.checksum(block)
+        self.size += len(block)
+        dictionary = self._previous
+        self._previous = block[-CompressionDefaults.dictionary_size:]
+        self.pending.append(self.pool.submit(self.compress, block,
+                                             dictionary, last))
+        self.drain(2 * self.workers)
+        return
+
+    def drain(self, limit=0):
+        """Writes out compressed blocks (in order) until few enough are left
+
+        Args:
+         limit (int): number of blocks that can stay pending
+        """
+        while len(self.pending) > limit:
+            self.output(self.pending.popleft().result())
+        return
+
+    def close(self):
+        """Compresses what's left and writes the trailer"""
+        if self.closed:
+            return
+        self.start()
+        self.submit(bytes(self.buffer), last=True)
+        self.buffer = bytearray()
+        self.drain()
+        self.output(self.trailer())
+        if self._pool is not None:
+            self._pool.shutdown()
+        self.closed = True
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+        return False
+
+    def checksum(self, block):
+        """Updates a running checksum (if the format needs one)
+
+        Args:
+         block (bytes): the next uncompressed block
+        """
+        return
+
+    def header(self):
+        """Bytes to write before the first block"""
+        return b""
+
+    def trailer(self):
+        """Bytes to write after the last block"""
+        return b""
+
+    @abstractmethod
+    def compress(self, block, dictionary, last):
+        """Compresses a single block
+
+        Args:
+         block (bytes): the uncompressed block
+         dictionary (bytes): the end of the previous block
+         last (bool): True if this is the final block
+
+        Returns:
+         bytes: the compressed block
+        """
+        return
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.workers >= 1
+        assert self.block_size > 0
+        return
+
+
+class DeflateCompressor(BlockCompressor):
+    """Compresses the blocks into a single raw deflate stream
+
+    Each block is primed with the end of the block before it and all but
+    the last one end with a sync-flush, so the blocks join up into one
+    stream, the way pigz does it.
+    """
+    def __init__(self, *args, **kwargs):
+        super(DeflateCompressor, self).__init__(*args, **kwargs)
+        self.crc = 0
+        return
+
+    def checksum(self, block):
+        """Updates the CRC-32 of the uncompressed data
+
+        Args:
+         block (bytes): the next uncompressed block
+        """
+        self.crc = zlib.crc32(block, self.crc)
+        return
+
+    def compress(self, block, dictionary, last):
+        """Deflates a block
+
+        Args:
+         block (bytes): the uncompressed block
+         dictionary (bytes): the end of the previous block
+         last (bool): True if this is the final block
+
+        Returns:
+         bytes: raw deflate data
+        """
+        arguments = dict(zdict=dictionary) if dictionary else {}
+        compressor = zlib.compressobj(CompressionDefaults.level, zlib.DEFLATED,
+                                      -zlib.MAX_WBITS, **arguments)
+        return compressor.compress(block) + compressor.flush(
+            zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class GzipCompressor(DeflateCompressor):
+    """Writes a single-member gzip file"""
+    suffix = ".gz"
+
+    def header(self):
+        """The gzip member header"""
+        return (b"\x1f\x8b\x08\x00" + struct.pack("<I", int(time.time()))
+                + b"\x00\x03")
+
+    def trailer(self):
+        """The CRC and size of the uncompressed data"""
+        return struct.pack("<II", self.crc, self.size & 0xffffffff)
+
+
+class ZipCompressor(DeflateCompressor):
+    """Writes a zip archive with a single (zip64) deflated member
+
+    The name is the name of the file in the archive
+    """
+    suffix = ".zip"
+    version = 45
+    flags = 0x08
+    unknown = 0xffffffff
+
+    def __init__(self, *args, **kwargs):
+        super(ZipCompressor, self).__init__(*args, **kwargs)
+        self.member = (self.name or "packets.pcap").encode("utf-8")
+        self.compressed_start = None
+        localtime = time.localtime()
+        self.dos_time = (localtime.tm_hour << 11 | localtime.tm_min << 5
+                         | localtime.tm_sec // 2)
+        self.dos_date = ((localtime.tm_year - 1980) << 9
+                         | localtime.tm_mon << 5 | localtime.tm_mday)
+        return
+
+    def header(self):
+        """The local file header (the sizes come in the data descriptor)"""
+        extra = struct.pack("<HHQQ", 1, 16, 0, 0)
+        header = struct.pack("<IHHHHHIIIHH", 0x04034b50, self.version,
+                             self.flags, zlib.DEFLATED, self.dos_time,
+                             self.dos_date, 0, self.unknown, self.unknown,
+                             len(self.member), len(extra))
+        self.compressed_start = len(header) + len(self.member) + len(extra)
+        return header + self.member + extra
+
+    def trailer(self):
+        """The data descriptor, central directory and end records"""
+        compressed = self.written - self.compressed_start
+        descriptor = struct.pack("<IIQQ", 0x08074b50, self.crc, compressed,
+                                 self.size)
+        directory_offset = self.written + len(descriptor)
+        extra = struct.pack("<HHQQ", 1, 16, self.size, compressed)
+        directory = struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014b50, 3 << 8 | self.version,
+            self.version, self.flags, zlib.DEFLATED, self.dos_time,
+            self.dos_date, self.crc, self.unknown, self.unknown,
+            len(self.member), len(extra), 0, 0, 0, 0o100644 << 16,
+            0) + self.member + extra
+        end = b""
+        offset = directory_offset
+        if directory_offset >= self.unknown:
+            zip64_offset = directory_offset + len(directory)
+            end = struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, self.version,
+                              self.version, 0, 0, 1, 1, len(directory),
+                              directory_offset)
+            end += struct.pack("<IIQI", 0x07064b50, 0, zip64_offset, 1)
+            offset = self.unknown
+        end += struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, 1, 1,
+                           len(directory), offset, 0)
+        return descriptor + directory + end
+
+
+class Bz2Compressor(BlockCompressor):
+    """Writes a multi-stream bzip2 file (like pbzip2)
+
+    Every block is a complete bzip2 stream, which bzip2 decompresses as a
+    single file
+    """
+    suffix = ".bz2"
+    default_block_size = CompressionDefaults.bz2_block_size
+
+    def compress(self, block, dictionary, last):
+        """Compresses the block as its own bzip2 stream
+
+        Args:
+         block (bytes): the uncompressed block
+         dictionary: not used
+         last (bool): not used
+
+        Returns:
+         bytes: a bzip2 stream
+        """
+        if not block and self.size:
+            return b""
+        return bz2.compress(block, CompressionDefaults.bz2_level)
+
+
+COMPRESSORS = dict(bz2=Bz2Compressor,
+                   gzip=GzipCompressor,
+                   zip=ZipCompressor)
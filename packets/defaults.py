@@ -0,0 +1,76 @@
+"""Default values for the command line
+
+These are kept apart from the code that uses them so the command line can
+build its options without importing (and paying the start-up cost of) the
+modules that do the work
+"""
+# python standard library
+import os
+
+
+class GetDefaults:
+    """Default Values when getting packets"""
+    start = '0'
+    end = '9999'
+    compression = None
+    compressions = ["bz2", "gzip", "zip"]
+    glob = "*"
+    info_command = "capinfos -ae"
+    catalog = True
+    workers = os.cpu_count() or 1
+    rotation = False
+    index = False
+    stdout = "-"
+    chunk_size = 2**16
+    tag = False
+    fan_in = None
+    max_memory = None
+    max_files = None
+    buffer_size = None
+    dedupe = None
+    dedupe_window = 0.1
+    size_units = dict(k=2**10, m=2**20, g=2**30)
+
+
+class IndexDefaults:
+    """Default values for the seek-indices"""
+    suffix = ".pktidx"
+    magic = b"PKTIDX1\n"
+    packets = 1000
+    seconds = 1
+
+
+class LoggingDefaults:
+    """Default values for the logging"""
+    format = "%(asctime)s %(name)-12s %(levelname)-8s %(message)s"
+    level = "warning"
+    levels = ["debug", "info", "warning", "error", "critical"]
+
+
+class WatchDefaults:
+    """Default values for the watcher"""
+    interval = 1.0
+    buffer_size = 2**16
+
+
+class ServeDefaults:
+    """Default values for the query server"""
+    host = "127.0.0.1"
+    port = 8642
+    path = "/packets"
+    content_type = "application/vnd.tcpdump.pcap"
+    buffer_size = 2**16
+
+
+class StatsDefaults:
+    """Default values for the statistics"""
+    gap = 1.0
+    chunk_size = 2**22
+    records = 2**16
+    percentiles = (50, 90, 99, 99.9)
+    size_bins = (0, 64, 128, 256, 512, 1024, 1519, 9001)
+
+
+class TimelineDefaults:
+    """Default values for the timelines"""
+    minutes = 1
@@ -3,3 +3,7 @@
 
 class ConfigurationError(Exception):
     """Somebody passed in a bad argument"""
+
+
+class CaptureFormatError(Exception):
+    """The capture file isn't in a format we can read natively"""
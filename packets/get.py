@@ -1,47 +1,95 @@
 """Get the packets"""
 # python standard library
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
-import os
+import asyncio
+import io
 import re
+import os
 import shlex
+import sqlite3
 import subprocess
-
-# pypi
-import dateparser
+import sys
+import tempfile
 
 # this project
+from .aio import AsyncTools
 from .base import AlpacaBase
-from .errors import ConfigurationError
+from .catalog import Catalog
+from .compress import COMPRESSORS
+from .defaults import (
+    GetDefaults,
+    StatsDefaults,
+    )
+from .errors import (
+    CaptureFormatError,
+    ConfigurationError,
+    )
+from .index import SeekIndex
+from .merge import (
+    Deduplicator,
+    MemoryBudget,
+    MergeDefaults,
+    MergeEngine,
+    TreeMerge,
+    )
+from .plan import Planner
+from .rotation import Rotation
+from .pcapng import capture_reader
+from .timestamps import (
+    TimestampFormat,
+    parse_timestamp,
+    parse_user_timestamp,
+    )
 
 
-class GetDefaults:
-    """Default Values when getting packets"""
-    start = '0'
-    end = '9999'
-    compression = "gzip"
-    glob = "*"
-    info_command = "capinfos -ae"
-
 class GetPackets(AlpacaBase):
     """Packet retriever
 
     This gets the packets and assembles them into a single file
 
+    Several sources (e.g. one directory per channel) are merged into one
+    time-ordered output, each source is read on a thread of its own
+
     Args:
-     source: path to the directory with the PCAP files
-     target: name of file to store the packets
+     source: path to the directory with the PCAP files (or a list of them)
+     target: name of file to store the packets ('-' for stdout)
      start: date/time for the earliest packet
      end: date/time for the latest packets you want
      source_glob: file-glob to match files in source directory
+     catalog: keep the capture metadata in a catalog in the source directory
+     workers: number of capture files to probe (or blocks to compress) at once
+     compression: how to compress the output (one of ``compressions`` or None)
+     rotation: the files are a tcpdump rotation that can be binary-searched
+     index: seek into the files with (lazily built) sidecar indices
+     tag: write pcapng with each packet's source directory as its interface
+     fan_in: merge at most this many files at once (in levels, on processes)
+     max_memory: bytes the merge's buffers can use (files are opened lazily)
+     max_files: most capture files to have open at once
+     buffer_size: bytes to buffer per open capture file
+     dedupe: seconds to look back for duplicate frames (None to keep them)
 
     Raises:
      ConfigurationError: any of the arguments are invalid
     """
-    compressions=["bz2", "gzip", "zip"]
+    compressions = GetDefaults.compressions
     def __init__(self, source, target,
                  start=GetDefaults.start,
                  end=GetDefaults.end,
                  source_glob=GetDefaults.glob,
+                 catalog=GetDefaults.catalog,
+                 workers=GetDefaults.workers,
+                 compression=GetDefaults.compression,
+                 rotation=GetDefaults.rotation,
+                 index=GetDefaults.index,
+                 tag=GetDefaults.tag,
+                 fan_in=GetDefaults.fan_in,
+                 max_memory=GetDefaults.max_memory,
+                 max_files=GetDefaults.max_files,
+                 buffer_size=GetDefaults.buffer_size,
+                 dedupe=GetDefaults.dedupe,
                  *args, **kwargs):
         super(GetPackets, self).__init__(*args, **kwargs)
         self._source = None
@@ -53,22 +101,44 @@ class GetPackets(AlpacaBase):
         self._end = None
         self.end = end
         self.source_glob = source_glob
-        self._filterer = None
+        self.catalog = catalog
+        self.workers = workers
+        self.compression = compression
+        self.rotation = rotation
+        self.index = index
+        self.tag = tag
+        self.fan_in = fan_in
+        self.max_memory = max_memory
+        self.max_files = max_files
+        self.buffer_size = buffer_size
+        self.dedupe = dedupe
+        self._filterers = None
         self._merger = None
         return
 
+    @property
+    def sources(self):
+        """The source directories
+
+        Returns:
+         list: the source (or sources) as a list
+        """
+        if isinstance(self.source, (str, os.PathLike)):
+            return [self.source]
+        return list(self.source)
+
     @property
     def start(self):
         """the start time
 
         Returns:
-         datetime: the start datetime
+         int: the start time in epoch nanoseconds
         """
         return self._start
 
     @start.setter
     def start(self, timestamp):
-        """converts the timestamp to a datetime
+        """converts the timestamp to epoch nanoseconds
 
         Args:
          timestamp (str): time-stamp of starting packets
@@ -79,14 +149,14 @@ class GetPackets(AlpacaBase):
         self._start = timestamp
         if self._start is not None:
             try:
-                self._start = dateparser.parse(self._start)
+                self._start = parse_user_timestamp(self._start)
             except TypeError as error:
                 message = "Non-string start time: {}".format(timestamp)
                 self.logger.error(error)
                 self.logger.error(message)
                 raise ConfigurationError(message)
             if self._start is None:
-                message = "Un-parseable start time: %s".format(timestamp)
+                message = "Un-parseable start time: {}".format(timestamp)
                 self.logger.error(message)
                 raise ConfigurationError(message)
         self.logger.debug("Start Time: %s", self._start)            
@@ -97,7 +167,7 @@ class GetPackets(AlpacaBase):
         """Time of last packets to get
 
         Returns:
-         datetime: the end datetime
+         int: the end time in epoch nanoseconds
         """
         return self._end
 
@@ -105,8 +175,9 @@ class GetPackets(AlpacaBase):
     def end(self, timestamp):
         """Sets the end time
 
-        .. warning:: dateparser sometimes converts three-letter strings to 
-           date-times, don't rely on it to detect garbage all the time
+        .. warning:: dateparser (used for free-form times) sometimes
+           converts three-letter strings to date-times, don't rely on it to
+           detect garbage all the time
 
         Args:
          timestamp (str): time to parse (or None)
@@ -117,41 +188,128 @@ class GetPackets(AlpacaBase):
         self._end = timestamp
         if self._end is not None:
             try:
-                self._end = dateparser.parse(self._end)
+                self._end = parse_user_timestamp(self._end)
             except TypeError as error:
                 message = "Non-String end-time: {}".format(timestamp)
                 self.logger.error(error)
                 self.logger.error(message)
                 raise ConfigurationError(message)
             if self._end is None:
-                message = "Un-parseable end: {}".format(self._end)
+                message = "Un-parseable end: {}".format(timestamp)
                 self.logger.error(message)
                 raise ConfigurationError(message)
         self.logger.debug("End Time: %s", timestamp)
         return
 
     @property
-    def filterer(self):
-        """File filterer for the packets"""
-        if self._filterer is None:
-            self._filterer = FileFilterer(self.source, self.source_glob,
-                                          self.start,
-                                          self.end)
-        return self._filterer
+    def filterers(self):
+        """File filterers for the packets (one per source)"""
+        if self._filterers is None:
+            self._filterers = [
+                FileFilterer(
+                    source, self.source_glob,
+                    self.start,
+                    self.end,
+                    catalog=(Catalog(source, workers=self.workers)
+                             if self.catalog else None),
+                    workers=self.workers,
+                    rotation=self.rotation)
+                for source in self.sources]
+        return self._filterers
+
+    @property
+    def channels(self):
+        """The files' channels (the name of their source directory)
+
+        Returns:
+         dict: channel names keyed by file path
+        """
+        return {path: filterer.path.resolve().name
+                for filterer in self.filterers
+                for path in filterer.file_names}
 
     @property
     def merger(self):
         """File Merger"""
         if self._merger is None:
-            self._merger = Merger(self.filterer.file_names,
-                                  self.target)
+            channels = self.channels
+            self._merger = Merger(list(channels),
+                                  self.target,
+                                  start=self.start,
+                                  end=self.end,
+                                  compression=self.compression,
+                                  workers=self.workers,
+                                  index=self.index,
+                                  channels=channels,
+                                  tag=self.tag,
+                                  fan_in=self.fan_in,
+                                  max_memory=self.max_memory,
+                                  max_files=self.max_files,
+                                  buffer_size=self.buffer_size,
+                                  dedupe=self.dedupe)
         return self._merger
 
+    def plan(self):
+        """Estimates the merge without doing it
+
+        The files are picked the same way as for the merge (so the catalog
+        is brought up to date) but no packets are read
+
+        Returns:
+         Planner: the estimates (its ``report`` describes them)
+        """
+        entries = {}
+        for filterer in self.filterers:
+            files = filterer.file_names
+            if filterer.catalog is not None:
+                stored = filterer.catalog.entries
+                entries.update(
+                    (path, stored[os.path.basename(path)]) for path in files
+                    if os.path.basename(path) in stored)
+        return Planner([CaptureInfo(path) for path in self.channels],
+                       start=self.start, end=self.end, entries=entries,
+                       index=self.index, target=self.target)
+
+    def stats(self, gap=StatsDefaults.gap):
+        """Works out statistics for the packets without merging them
+
+        Needs NumPy (imported here so the rest of the package doesn't)
+
+        Args:
+         gap (float): seconds without packets that count as a gap
+
+        Returns:
+         CaptureStats: the statistics (its ``report`` describes them)
+        """
+        from .stats import CaptureStats
+        files = [path for filterer in self.filterers
+                 for path in filterer.file_names]
+        return CaptureStats(files, start=self.start, end=self.end, gap=gap,
+                            index=self.index)
+
     def __call__(self):
         """Merges the packet files and saves them"""
         self.merger()
         return
 
+    async def run_async(self, limit=None):
+        """Merges the packet files without blocking the event loop
+
+        capinfos and mergecap run as asyncio sub-processes (see AsyncTools),
+        the native probing, catalog and merge run on threads
+
+        Args:
+         limit (int): most tools to run at once (default is ``workers``)
+
+        Returns:
+         PcapWriter: the native merge's writer (None for mergecap)
+        """
+        tools = AsyncTools(limit=limit or self.workers)
+        await asyncio.gather(*(tools.prepare(filterer)
+                               for filterer in self.filterers))
+        merger = await asyncio.to_thread(lambda: self.merger)
+        return await tools.merge(merger)
+
     def check_rep(self):
         """checks the arguments passed in
 
@@ -167,17 +325,24 @@ class FileFilterer(AlpacaBase):
     Args:
      path (directory): directory where the files are stored
      glob (str): file-glob to match the files
-     start (DateTime): start time to filter out early packets
-     end (DateTime): end time to filter out later packets
+     start (int): start time (epoch nanoseconds) to filter out early packets
+     end (int): end time (epoch nanoseconds) to filter out later packets
+     catalog (Catalog): persistent catalog to look up the times in
+     workers (int): number of captures to probe at the same time
+     rotation (bool): binary-search the files as a tcpdump rotation
     """
-    def __init__(self, path, glob, start=None, end=None,
-                 *args, **kwargs):
+    def __init__(self, path, glob, start=None, end=None, catalog=None,
+                 workers=1, rotation=False, *args, **kwargs):
         super(FileFilterer, self).__init__(*args, **kwargs)
         self._path = None        
         self.path = path
         self.glob = glob
         self.start = start
         self.end = end
+        self.catalog = catalog
+        self.workers = workers
+        self.rotation = rotation
+        self.captures = None
         self._file_names = None
         return
 
@@ -213,24 +378,72 @@ class FileFilterer(AlpacaBase):
     def all_files(self):
         """All the files in the directory
 
+        The captures can be set ahead of time (e.g. already probed by the
+        asyncio backend) with the ``captures`` attribute
+
         Returns:
          iter: iterable of CaptureInfo files that match the glob in the path
         """
-        return (CaptureInfo(str(path)) for path in self.path.glob(self.glob))
+        if self.captures is not None:
+            return iter(self.captures)
+        return (CaptureInfo(str(path)) for path in self.path.glob(self.glob)
+                if not (Catalog.is_catalog(str(path))
+                        or SeekIndex.is_index(str(path))))
+
+    def probe(self, capture):
+        """Reads the timestamps that the filter needs so they're cached
+
+        Args:
+         capture (CaptureInfo): the capture to probe
+
+        Returns:
+         CaptureInfo: the capture
+        """
+        if self.start is not None:
+            capture.last
+        if self.end is not None:
+            capture.first
+        return capture
+
+    @property
+    def probed_files(self):
+        """All the files with their timestamps read by the worker pool
+
+        Returns:
+         list: CaptureInfo objects in the same order as ``all_files``
+        """
+        captures = list(self.all_files)
+        if self.workers > 1 and len(captures) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                return list(pool.map(self.probe, captures))
+        return captures
 
     @property
     def file_names(self):
         """list of file-names to use
 
+        The files only need to overlap the time-span, the merge drops the
+        packets outside of it
+
         Returns:
-         list: file-names within the time-span
+         list: file-names with packets within the time-span
         """
+        timed = self.start is not None or self.end is not None
+        if self._file_names is None and timed and self.rotation:
+            self._file_names = Rotation(self.all_files).between(self.start,
+                                                                self.end)
+        if self._file_names is None and timed and self.catalog is not None:
+            try:
+                self._file_names = self.catalog.between(self.all_files,
+                                                        self.start, self.end)
+            except sqlite3.Error as error:
+                self.logger.warning("Not using the catalog %s: %s",
+                                    self.catalog.path, error)
+                self.catalog = None
         if self._file_names is None:
-            captures = self.all_files
-            if self.start is not None:
-                captures = (capture for capture in captures if capture >= self.start)
-            if self.end is not None:
-                captures = (capture for capture in captures if capture <= self.end)
+            captures = self.probed_files if timed else self.all_files
+            captures = (capture for capture in captures
+                        if capture.overlaps(self.start, self.end))
             self._file_names = [capture.path for capture in captures]
         return self._file_names
 
@@ -246,29 +459,60 @@ class FileFilterer(AlpacaBase):
 class Info:
     first_key = 'first'
     last_key = 'last'
-    first_regex = "First packet time:\s+(?P<{}>.+)".format(first_key)
-    last_regex = "Last packet time:\s+(?P<{}>.+)".format(last_key)
+    first_regex = r"First packet time:\s+(?P<{}>.+)".format(first_key)
+    last_regex = r"Last packet time:\s+(?P<{}>.+)".format(last_key)
     
 class CaptureInfo(AlpacaBase):
     """Holds the basic info for a PCAP file
 
+    The timestamps are read natively from the file, the command is only
+    used for formats that the native reader can't handle
+
     Args:
      path (str): path to file
      command (str): command to get the info
+     native (bool): try the built-in reader before the command
     """
     first_key = "first"
     last_key = "last"
-    def __init__(self, path, command=GetDefaults.info_command, *args, **kwargs):
+    def __init__(self, path, command=GetDefaults.info_command, native=True,
+                 *args, **kwargs):
         super(CaptureInfo, self).__init__(*args, **kwargs)
         self.path = path
         self.command = command
+        self.native = native
         self._first = None
         self._last = None
         self._first_regex = None
         self._last_regex = None
         self._output = None
+        self._reader = None
         return
 
+    @property
+    def reader(self):
+        """The native reader for the file"""
+        if self._reader is None:
+            self._reader = capture_reader(self.path)
+        return self._reader
+
+    def read(self, attribute):
+        """Gets a timestamp from the native reader
+
+        Args:
+         attribute (str): name of the reader's timestamp (first or last)
+
+        Returns:
+         int: epoch nanoseconds (None if there are no packets or the reader
+           can't handle the file)
+        """
+        try:
+            return getattr(self.reader, attribute)
+        except CaptureFormatError as error:
+            self.logger.debug("Falling back to '%s': %s", self.command, error)
+            self.native = False
+            return None
+
     @property
     def output(self):
         """output of the command
@@ -287,9 +531,19 @@ class CaptureInfo(AlpacaBase):
                                      universal_newlines=True,
             )
             self._output = outcome.stdout
-            self.logger.debug(self._output)
+            self.logger.debug("'%s' output:\n%s", command, self._output)
         return self._output
 
+    @output.setter
+    def output(self, output):
+        """Sets the command's output (when it was run some other way)
+
+        Args:
+         output (str): what the command printed
+        """
+        self._output = output
+        return
+
     @property
     def first_regex(self):
         """Regular expression to get the first packet time"""
@@ -305,70 +559,113 @@ class CaptureInfo(AlpacaBase):
         return self._last_regex
 
     
+    def parse(self, regex, key):
+        """Gets a timestamp from the command's output
+
+        Args:
+         regex: compiled regular expression with a named group
+         key (str): name of the group with the timestamp
+
+        Returns:
+         int: the timestamp in epoch nanoseconds (None if there are no
+           packets)
+
+        Raises:
+         RuntimeError: the output didn't have the timestamp
+        """
+        match = regex.search(self.output)
+        if match is None:
+            raise RuntimeError(
+                "{} didn't match the {} timestamp".format(self.command, key))
+        text = match.groupdict()[key].strip()
+        if text == TimestampFormat.missing:
+            return None
+        timestamp = parse_timestamp(text)
+        if timestamp is None:
+            raise RuntimeError("Can't parse the {} timestamp from {}: {}".format(
+                key, self.command, text))
+        return timestamp
+
     @property
     def first(self):
-        """Datetime for the first packet"""
+        """Epoch nanoseconds of the first packet"""
         if self._first is None:
-            match = self.first_regex.search(self.output)
-            if match is None:
-                raise RuntimeError(
-                    "{} didn't match the first timestamp".format(self.command))
-            self._first = dateparser.parse(match.groupdict()[Info.first_key])
+            if self.native:
+                self._first = self.read(Info.first_key)
+            if not self.native:
+                self._first = self.parse(self.first_regex, Info.first_key)
         return self._first
 
     @property
     def last(self):
-        """datetime for the last packet"""
+        """Epoch nanoseconds of the last packet"""
         if self._last is None:
-            match = self.last_regex.search(self.output)
-            if match is None:
-                raise RuntimeError(
-                    "{} didn't match the last timestamp".format(self.command))
-            self._last = dateparser.parse(match.groupdict()[Info.last_key])
+            if self.native:
+                self._last = self.read(Info.last_key)
+            if not self.native:
+                self._last = self.parse(self.last_regex, Info.last_key)
         return self._last
 
+    def overlaps(self, start=None, end=None):
+        """Checks if the capture has packets in the time-span
+
+        Args:
+         start (int): start of the span (None for no start)
+         end (int): end of the span (None for no end)
+
+        Returns:
+         bool: True if the capture overlaps the span
+        """
+        if start is None and end is None:
+            return True
+        if start is not None and (self.last is None or self.last < start):
+            return False
+        if end is not None and (self.first is None or self.first > end):
+            return False
+        return True
+
     def __lt__(self, other):
         """less than comparison
 
         Args:
-         other (DateTime): time to compare to last timestamp
+         other (int): epoch nanoseconds to compare to last timestamp
 
         Returns:
          bool: True if self.last < other
         """
-        return self.last < other
+        return self.last is not None and self.last < other
 
     def __le__(self, other):
         """<= comparison
 
         Args:
-         other (DateTime): time to compare to last timestamp
+         other (int): epoch nanoseconds to compare to last timestamp
         Returns:
          bool: True if self.last <= other
         """
-        return self.last <= other
+        return self.last is not None and self.last <= other
 
     def __gt__(self, other):
         """> comparison
 
         Args:
-         other (DateTime): time to compare to first timestamp
+         other (int): epoch nanoseconds to compare to first timestamp
 
         Returns:
          bool: True if self.first > other
         """
-        return self.first > other
+        return self.first is not None and self.first > other
 
     def __ge__(self, other):
         """>= comparison
 
         Args:
-         other (DateTime): time to compare to first timestamp
+         other (int): epoch nanoseconds to compare to first timestamp
 
         Returns:
          bool: True if self.first >= other
         """
-        return self.first >= other
+        return self.first is not None and self.first >= other
 
     def check_rep(self):
         """Checks that the arguments passed in are okay
@@ -379,27 +676,129 @@ class CaptureInfo(AlpacaBase):
         return
 
 
+class ChunkedOutput:
+    """Passes writes on to a stream in chunks of a bounded size
+
+    Each full chunk is written and flushed, so whatever reads the stream
+    (e.g. a pipe to tshark) gets the first packets while later ones are
+    still being merged, and no more than a chunk is held back
+
+    Args:
+     stream: binary file-object to write to
+     chunk_size (int): bytes to gather before writing
+    """
+    def __init__(self, stream, chunk_size=GetDefaults.chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        return
+
+    def write(self, data):
+        """Adds data, writing out a chunk when there's enough
+
+        Args:
+         data (bytes): the data to write
+
+        Returns:
+         int: the number of bytes taken
+        """
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        """Writes out and flushes what's been gathered"""
+        if self.buffer:
+            self.stream.write(self.buffer)
+            self.buffer = bytearray()
+        self.stream.flush()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if exception_type is None:
+            self.flush()
+        return False
+
+
 class Merger(AlpacaBase):
     """Merge the packets
 
+    The packets are merged natively and trimmed to the start and end times,
+    whole files are only handed to mergecap if a file is in a format that
+    the native merge can't handle
+
     Args:
      files (list): list of packet files
-     target (str): place to store the files
+     target (str): place to store the files ('-' streams them to stdout)
+     start (int): epoch nanoseconds of the earliest packet to keep
+     end (int): epoch nanoseconds of the latest packet to keep
+     native (bool): try the native merge before mergecap
+     compression (str): compress the output (bz2, gzip, zip or None)
+     workers (int): number of threads compressing the output
+     index (bool): seek to the start time with the files' seek-indices
+     channels (dict): channel names keyed by path (each read on a thread)
+     tag (bool): write pcapng with each packet's channel as its interface
+     fan_in (int): most files to merge at once (None to merge them all)
+     max_memory (int): bytes the native merge's buffers can use
+     max_files (int): most files to have open at once
+     buffer_size (int): bytes to buffer per open file
+     dedupe (float): seconds to look back for duplicate frames (None to
+       keep them, mergecap always keeps them)
     """
-    def __init__(self, files, target, *args, **kwargs):
+    def __init__(self, files, target, start=None, end=None, native=True,
+                 compression=None, workers=1, index=False, channels=None,
+                 tag=False, fan_in=None, max_memory=None, max_files=None,
+                 buffer_size=None, dedupe=None, *args, **kwargs):
         super(Merger, self).__init__(*args, **kwargs)
         self.files = files
+        self.index = index
+        self.channels = channels
+        self.tag = tag
+        self.fan_in = fan_in
+        self.max_memory = max_memory
+        self.max_files = max_files
+        self.buffer_size = buffer_size
+        self.dedupe = dedupe
+        self.compression = compression
+        self.workers = workers
+        self.streaming = target == GetDefaults.stdout
         self._target = None
         self.target = target
+        self.start = start
+        self.end = end
+        self.native = native
         self._command = None
+        self._engine = None
+        self._deduplicator = None
         return
 
+    @property
+    def deduplicator(self):
+        """Drops the duplicate frames (None when they're kept)"""
+        if self._deduplicator is None and self.dedupe is not None:
+            self._deduplicator = Deduplicator(self.dedupe)
+        return self._deduplicator
+
+    @property
+    def engine(self):
+        """The native merge engine"""
+        if self._engine is None:
+            self._engine = MergeEngine(self.files, start=self.start,
+                                       end=self.end, index=self.index,
+                                       channels=self.channels, tag=self.tag,
+                                       deduplicator=self.deduplicator)
+        return self._engine
+
     @property
     def command(self):
         """merge command"""
         if self._command is None:
             self._command = shlex.split("mergecap -w {} {}".format(
-                self.target,
+                "-" if self.compression or self.streaming else self.target,
                 " ".join(self.files)))
         return self._command
 
@@ -412,10 +811,20 @@ class Merger(AlpacaBase):
     def target(self, file_name):
         """sets the target file name
 
+        The compression's suffix is added if the name doesn't have it, '-'
+        (stdout) is kept as it is
+
         Args:
          file_name(str): path to target file
         """
+        if self.streaming:
+            self._target = file_name
+            return
         path = Path(file_name)
+        if self.compression is not None:
+            suffix = COMPRESSORS[self.compression].suffix
+            if path.suffix != suffix:
+                path = path.with_name(path.name + suffix)
         if not path.parent.exists():
             path.parent.mkdir(parents=True)
         self._target = path
@@ -429,7 +838,162 @@ class Merger(AlpacaBase):
         """
         return
 
+    def compressor(self, stream):
+        """Wraps the output stream in the compressor
+
+        Args:
+         stream: binary file-object for the target
+
+        Returns:
+         context manager for the stream to write the packets to
+        """
+        if self.compression is None:
+            return nullcontext(stream)
+        compressor = COMPRESSORS[self.compression]
+        name = (None if self.streaming
+                else self.target.name[:-len(compressor.suffix)])
+        return compressor(stream, workers=self.workers, name=name)
+
+    def open(self):
+        """Opens the target for writing
+
+        Returns:
+         context manager for the binary stream (chunks to stdout for '-')
+        """
+        if self.streaming:
+            return ChunkedOutput(sys.stdout.buffer)
+        return self.target.open("wb")
+
+    def stop_streaming(self):
+        """Quietly gives up when whatever reads stdout has stopped
+
+        stdout is pointed at /dev/null so python doesn't complain about the
+        broken pipe again when it flushes stdout at exit
+        """
+        self.logger.debug("The reader closed stdout, stopping the merge")
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            os.close(devnull)
+        except (OSError, ValueError, AttributeError):
+            pass
+        return
+
     def __call__(self):
+        """Merges the files into the target
+
+        Returns:
+         PcapWriter: the writer (with its counts) for a native merge, None
+           if there was nothing to merge or mergecap did it
+        """
+        try:
+            return self.merge()
+        except BrokenPipeError:
+            if not self.streaming:
+                raise
+            self.stop_streaming()
+        return
+
+    def tree_merge(self):
+        """Merges the files in levels of at most ``fan_in`` files
+
+        The intermediate files go in a temporary directory next to the
+        target (or in the system's temporary directory when streaming).
+        The levels never mix channels, so the duplicates are only dropped
+        by the final merge
+
+        Returns:
+         PcapWriter: the final merge's writer (see ``__call__``)
+        """
+        scratch = None if self.streaming else str(self.target.parent)
+        with tempfile.TemporaryDirectory(prefix="packets-",
+                                         dir=scratch) as directory:
+            tree = TreeMerge(self.files, directory, self.fan_in,
+                             workers=(1 if self.max_memory is not None
+                                      else self.workers),
+                             start=self.start, end=self.end,
+                             index=self.index, native=self.native,
+                             channels=self.channels,
+                             buffer_size=self.buffer_size)
+            files = tree()
+            final = Merger(files, str(self.target), start=self.start,
+                           end=self.end, native=self.native,
+                           compression=self.compression,
+                           workers=self.workers,
+                           channels={path: tree.channels.get(path)
+                                     for path in files},
+                           tag=self.tag,
+                           buffer_size=self.buffer_size,
+                           dedupe=self.dedupe)
+            writer = final.merge()
+            self._deduplicator = final.deduplicator
+            return writer
+
+    @property
+    def bounded(self):
+        """True if there's a memory budget or a limit on the open files"""
+        return (self.max_memory is not None or self.max_files is not None
+                or self.buffer_size is not None)
+
+    @property
+    def output_memory(self):
+        """Bytes the output's buffers (and compressor) hold"""
+        if self.compression is not None:
+            block_size = COMPRESSORS[self.compression].default_block_size
+            return 2 * block_size * (2 * self.workers + 1)
+        if self.streaming:
+            return GetDefaults.chunk_size
+        return io.DEFAULT_BUFFER_SIZE
+
+    def bound(self):
+        """Fits the native merge into the memory budget and open-file limit
+
+        Returns:
+         bool: True if more files overlap than can be open at once
+        """
+        max_files = self.max_files
+        buffer_size = self.buffer_size or MergeDefaults.buffer_size
+        if self.max_memory is not None:
+            max_files, buffer_size = MemoryBudget(
+                self.max_memory, max_files, buffer_size)(self.engine.readers,
+                                                         self.output_memory)
+        self.max_files = self.engine.max_files = max_files
+        self.buffer_size = self.engine.buffer_size = buffer_size
+        return max_files is not None and self.engine.overlap() > max_files
+
+    def merge(self):
+        """Merges the files into the target (see ``__call__``)"""
+        if not self.files:
+            self.logger.warning("No packet files to merge")
+            return
+        if self.fan_in is not None and len(self.files) > self.fan_in:
+            return self.tree_merge()
+        if self.native:
+            try:
+                self.engine.validate()
+            except CaptureFormatError as error:
+                self.logger.debug("Falling back to mergecap: %s", error)
+                self.native = False
+        if self.bounded and (self.bound() if self.native
+                             else self.max_files is not None
+                             and len(self.files) > self.max_files):
+            self.logger.info("More than %d files overlap, merging in levels",
+                             self.max_files)
+            self.fan_in = self.max_files
+            return self.tree_merge()
+        if self.native:
+            with self.open() as stream, self.compressor(stream) as output:
+                return self.engine(output)
+        if self.dedupe is not None:
+            self.logger.warning("mergecap is merging, the duplicate frames "
+                                "are kept")
+        if self.compression is not None or self.streaming:
+            with subprocess.Popen(self.command, stdout=subprocess.PIPE) as process, \
+                 self.open() as stream, \
+                 self.compressor(stream) as output:
+                for chunk in iter(partial(process.stdout.read, 2**20), b""):
+                    output.write(chunk)
+            return
         output = subprocess.run(self.command, stdout=subprocess.PIPE,
                                 stderr=subprocess.PIPE)
         self.logger.debug(output.stdout)
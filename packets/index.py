@@ -0,0 +1,301 @@
+"""Sparse time-to-offset indices for seeking into capture files"""
+# python standard library
+from bisect import (
+    bisect_left,
+    bisect_right,
+    )
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+import struct
+import tempfile
+
+# this project
+from .base import AlpacaBase
+from .defaults import IndexDefaults
+from .errors import CaptureFormatError
+from .pcapng import capture_reader
+
+
+IndexHeader = namedtuple("IndexHeader", ["size", "mtime", "end", "first"])
+
+
+class SeekIndex(AlpacaBase):
+    """A sparse index of a capture file's record offsets
+
+    An entry is added every ``packets`` packets or every ``seconds`` seconds
+    (whichever comes first). Each entry holds a record's offset and the
+    latest time of all the packets before it, so seeking to an entry never
+    skips a packet in the window, even if the file is a little out of order.
+
+    The index is kept in a sidecar file next to the capture, it's rebuilt
+    if the capture changes (or extended if the capture only grew).
+
+    Args:
+     capture (str): path to the capture file
+     packets (int): most packets between entries
+     seconds (float): most seconds between entries
+    """
+    entry_struct = struct.Struct("<qQ")
+    header_struct = struct.Struct("<QQQq")
+
+    def __init__(self, capture, packets=IndexDefaults.packets,
+                 seconds=IndexDefaults.seconds, *args, **kwargs):
+        super(SeekIndex, self).__init__(*args, **kwargs)
+        self.capture = capture
+        self.path = capture + IndexDefaults.suffix
+        self.packets = packets
+        self.seconds = seconds
+        self._reader = None
+        self._header = None
+        self._times = None
+        self._offsets = None
+        return
+
+    @classmethod
+    def is_index(cls, name):
+        """Checks if a file is a seek-index
+
+        Args:
+         name (str): path to the file
+
+        Returns:
+         bool: True if the file is a seek-index
+        """
+        return name.endswith(IndexDefaults.suffix)
+
+    @property
+    def reader(self):
+        """Reader for the capture"""
+        if self._reader is None:
+            self._reader = capture_reader(self.capture)
+        return self._reader
+
+    def load(self):
+        """Loads the sidecar file
+
+        A sidecar that's cut short (or otherwise the wrong length) is treated
+        as missing, so the index gets rebuilt
+
+        Returns:
+         bool: True if there was a sidecar that could be loaded
+        """
+        try:
+            with open(self.path, "rb") as stream:
+                data = stream.read()
+        except OSError:
+            return False
+        magic = IndexDefaults.magic
+        start = len(magic) + self.header_struct.size
+        if (not data.startswith(magic) or len(data) < start
+                or (len(data) - start) % self.entry_struct.size):
+            self.logger.debug("Ignoring the damaged index %s", self.path)
+            return False
+        try:
+            header = IndexHeader(
+                *self.header_struct.unpack_from(data, len(magic)))
+            entries = list(self.entry_struct.iter_unpack(data[start:]))
+        except struct.error as error:
+            self.logger.debug("Ignoring the index %s: %s", self.path, error)
+            return False
+        self._header = header
+        self._times = [time for time, _ in entries]
+        self._offsets = [offset for _, offset in entries]
+        return True
+
+    def save(self):
+        """Writes the sidecar file (logs a warning if it can't)
+
+        The index is written to a temporary file next to the sidecar and
+        then renamed over it, so anything loading the sidecar at the same
+        time (the watcher, the server, a merge) sees the old or the new
+        index, never part of one
+        """
+        entries = b"".join(self.entry_struct.pack(time, offset)
+                           for time, offset in zip(self._times,
+                                                   self._offsets))
+        directory, name = os.path.split(self.path)
+        temporary = None
+        try:
+            descriptor, temporary = tempfile.mkstemp(
+                dir=directory or None, prefix="." + name + ".",
+                suffix=IndexDefaults.suffix)
+            with os.fdopen(descriptor, "wb") as stream:
+                stream.write(IndexDefaults.magic
+                             + self.header_struct.pack(*self._header)
+                             + entries)
+            os.replace(temporary, self.path)
+        except OSError as error:
+            self.logger.warning("Can't save the index %s: %s", self.path,
+                                error)
+            if temporary is not None and os.path.exists(temporary):
+                os.remove(temporary)
+        return
+
+    def build(self, stat):
+        """Walks the capture's record headers to add the entries
+
+        If the index is for an earlier, smaller version of the capture (the
+        file tcpdump is writing) it is extended from its last entry instead
+        of being rebuilt
+
+        Args:
+         stat (os.stat_result): the capture's current stat
+        """
+        first = self.reader.first
+        first = -1 if first is None else first
+        resume = (self._header is not None and self._offsets
+                  and stat.st_size >= self._header.size
+                  and self._header.first == first)
+        if not resume:
+            self._times, self._offsets = [], []
+        offset = (self._offsets.pop() if resume
+                  else self.reader.data_offset)
+        highest = self._times.pop() if resume else -1
+        interval = int(self.seconds * 10**9)
+        end = offset
+        with self.reader.open() as stream:
+            self.reader.read_header(stream)
+            stream.seek(offset)
+            count, marked = 0, None
+            for offset, end, timestamp, _ in self.reader.walk(stream):
+                if (marked is None or count >= self.packets
+                        or timestamp - marked >= interval):
+                    self._times.append(highest)
+                    self._offsets.append(offset)
+                    count, marked = 0, timestamp
+                count += 1
+                highest = max(highest, timestamp)
+        self._header = IndexHeader(size=stat.st_size, mtime=stat.st_mtime_ns,
+                                   end=end, first=first)
+        self.logger.debug("Indexed %s: %d entries", self.capture,
+                          len(self._offsets))
+        return
+
+    def update(self):
+        """Loads the index, (re)building it if the capture changed
+
+        Returns:
+         SeekIndex: this index
+        """
+        stat = os.stat(self.capture)
+        if self._header is None:
+            self.load()
+        if (self._header is None or self._header.size != stat.st_size
+                or self._header.mtime != stat.st_mtime_ns):
+            self.build(stat)
+            self.save()
+        return self
+
+    def seek(self, timestamp):
+        """Finds where to start reading for packets at or after a time
+
+        Args:
+         timestamp (int): epoch nanoseconds of the earliest packet wanted
+
+        Returns:
+         int: offset of the record to start reading at
+        """
+        self.update()
+        entry = bisect_left(self._times, timestamp) - 1
+        return (self._offsets[entry] if entry >= 0
+                else self.reader.data_offset)
+
+    def cached(self):
+        """Loads the sidecar without (re)building it
+
+        Returns:
+         bool: True if the sidecar is there and matches the capture
+        """
+        try:
+            stat = os.stat(self.capture)
+        except OSError:
+            return False
+        return (self.load() and self._header.size == stat.st_size
+                and self._header.mtime == stat.st_mtime_ns)
+
+    def span(self, start=None, end=None):
+        """Finds the part of the capture a merge reads for a window
+
+        This only uses what's loaded (see ``cached``), the end is an upper
+        bound since the merge stops at the first packet after the window
+
+        Args:
+         start (int): epoch nanoseconds of the earliest packet (or None)
+         end (int): epoch nanoseconds of the latest packet (or None)
+
+        Returns:
+         tuple: offsets where the reading starts and stops
+        """
+        first = self.reader.data_offset
+        if start is not None:
+            entry = bisect_left(self._times, start) - 1
+            first = self._offsets[entry] if entry >= 0 else first
+        last = self._header.end
+        if end is not None:
+            entry = bisect_right(self._times, end)
+            last = (self._offsets[entry] if entry < len(self._offsets)
+                    else last)
+        return first, max(first, last)
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.packets > 0
+        assert self.seconds > 0
+        return
+
+
+class Indexer(AlpacaBase):
+    """Builds (or refreshes) the seek-indices for capture files
+
+    Args:
+     files (list): paths to the capture files
+     packets (int): most packets between entries
+     seconds (float): most seconds between entries
+     workers (int): number of files to index at the same time
+    """
+    def __init__(self, files, packets=IndexDefaults.packets,
+                 seconds=IndexDefaults.seconds, workers=1, *args, **kwargs):
+        super(Indexer, self).__init__(*args, **kwargs)
+        self.files = files
+        self.packets = packets
+        self.seconds = seconds
+        self.workers = workers
+        return
+
+    def index(self, path):
+        """Updates one file's index
+
+        Args:
+         path (str): path to the capture
+
+        Returns:
+         SeekIndex: the updated index (None if it can't be indexed)
+        """
+        try:
+            return SeekIndex(path, packets=self.packets,
+                             seconds=self.seconds).update()
+        except CaptureFormatError as error:
+            self.logger.debug("Not indexing %s: %s", path, error)
+        return None
+
+    def __call__(self):
+        """Updates the indices
+
+        Returns:
+         list: the SeekIndex for each file
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(self.index, self.files))
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        return
@@ -1,23 +1,59 @@
-"""The Command Line Interface for the packets sub-package"""
+"""The Command Line Interface for the packets sub-package
+
+Only the defaults are imported up front, the modules that do the work are
+imported by the commands that use them so ``--help`` (and commands that
+don't need them) start quickly
+"""
+# python standard library
+import re
+
 # from pypi
 import click
 
 # this project
-from .get import (
+from .base import configure_logging
+from .defaults import (
     GetDefaults,
-    GetPackets,
+    IndexDefaults,
+    LoggingDefaults,
+    ServeDefaults,
+    StatsDefaults,
+    TimelineDefaults,
+    WatchDefaults,
     )
 
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
 
+
+class ByteSize(click.ParamType):
+    """A number of bytes with an optional K, M or G (binary) suffix"""
+    name = "size"
+    expression = re.compile(r"(?P<count>\d+)\s*(?P<unit>[kmg]?)(?:i?b)?",
+                            re.IGNORECASE)
+
+    def convert(self, value, parameter, context):
+        """Converts '512M' (or '512MiB', '512mb', ...) to bytes"""
+        if isinstance(value, int):
+            return value
+        match = self.expression.fullmatch(value.strip())
+        if match is None:
+            self.fail("{} isn't a size like 65536, 64K, 512M or 1G".format(
+                value), parameter, context)
+        unit = match.group("unit").lower()
+        return int(match.group("count")) * GetDefaults.size_units.get(unit, 1)
+
 @click.group(context_settings=CONTEXT_SETTINGS)
+@click.option("--log-level", default=LoggingDefaults.level,
+              type=click.Choice(LoggingDefaults.levels),
+              help="Least severe log messages to show.")
 @click.pass_context
-def main(context):
+def main(context, log_level):
     """A Packet (pcap) command-line utility"""
+    configure_logging(log_level)
     return
 
 @main.command(context_settings=CONTEXT_SETTINGS, short_help="Get packet files and merge them.")
-@click.argument("source", type=click.Path(exists=True))
+@click.argument("source", nargs=-1, required=True, type=click.Path(exists=True))
 @click.argument("target")
 @click.option("--glob", default=GetDefaults.glob,
               metavar="<file-glob>",
@@ -30,11 +66,220 @@ def main(context):
               help="Latest packet time to get.")
 @click.option("--compression",
               default=GetDefaults.compression,
-              type=click.Choice(GetPackets.compressions))
-def get(source, target, glob, start, end, compression):
-    """Collects the Packets for the user"""
-    collector = GetPackets(source=source, target=target,
+              type=click.Choice(GetDefaults.compressions),
+              help="Compress the output (on several threads).")
+@click.option("--catalog/--no-catalog", default=GetDefaults.catalog,
+              help="Keep the capture times in a catalog in the source directory.")
+@click.option("--workers", default=GetDefaults.workers, type=click.IntRange(min=1),
+              metavar="<count>",
+              help="Number of threads probing files and compressing the output.")
+@click.option("--rotation", is_flag=True, default=GetDefaults.rotation,
+              help="Binary-search the files as a tcpdump -C/-W rotation.")
+@click.option("--index", is_flag=True, default=GetDefaults.index,
+              help="Seek into the files with sidecar indices (built when missing).")
+@click.option("--tag", is_flag=True, default=GetDefaults.tag,
+              help="Write pcapng with each packet's source directory as its interface.")
+@click.option("--fan-in", default=GetDefaults.fan_in, type=click.IntRange(min=2),
+              metavar="<count>",
+              help="Merge at most this many files at once, in levels on --workers processes.")
+@click.option("--max-memory", default=GetDefaults.max_memory, type=ByteSize(),
+              metavar="<size>",
+              help="Memory the merge can use (e.g. 512M), files are opened as they're needed.")
+@click.option("--max-files", default=GetDefaults.max_files, type=click.IntRange(min=2),
+              metavar="<count>",
+              help="Most capture files to have open at once.")
+@click.option("--buffer-size", default=GetDefaults.buffer_size, type=ByteSize(),
+              metavar="<size>",
+              help="Read buffer for each open capture file (e.g. 64K).")
+@click.option("--dedupe", is_flag=True,
+              help="Drop frames that repeat one merged just before.")
+@click.option("--dedupe-window", default=GetDefaults.dedupe_window,
+              type=click.FloatRange(min=0, min_open=True), metavar="<seconds>",
+              help="Seconds a frame is looked for again with --dedupe.")
+@click.option("--plan", is_flag=True,
+              help="Only show the files, the estimated output size and the reading it takes.")
+def get(source, target, glob, start, end, compression, catalog, workers,
+        rotation, index, tag, fan_in, max_memory, max_files, buffer_size,
+        dedupe, dedupe_window, plan):
+    """Collects the Packets for the user
+
+    Give several SOURCE directories to merge them into one time-ordered
+    TARGET.
+    """
+    from .get import GetPackets
+    collector = GetPackets(source=list(source), target=target,
                            source_glob=glob,
-                           start=start, end=end)
+                           start=start, end=end,
+                           catalog=catalog,
+                           workers=workers,
+                           compression=compression,
+                           rotation=rotation,
+                           index=index,
+                           tag=tag,
+                           fan_in=fan_in,
+                           max_memory=max_memory,
+                           max_files=max_files,
+                           buffer_size=buffer_size,
+                           dedupe=dedupe_window if dedupe else None)
+    if plan:
+        click.echo(collector.plan().report())
+        return
     collector()
+    if dedupe:
+        deduplicator = collector.merger.deduplicator
+        click.echo("Removed {} duplicate frames ({} bytes)".format(
+            deduplicator.dropped, deduplicator.bytes), err=True)
+    return
+
+
+@main.command(context_settings=CONTEXT_SETTINGS,
+              short_help="Rates, sizes and gaps of the packets in a window.")
+@click.argument("source", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--glob", default=GetDefaults.glob,
+              metavar="<file-glob>",
+              help="Glob to match files in the source directories.")
+@click.option("--start", default=GetDefaults.start,
+              metavar="<date-time>",
+              help="Time of the earliest packet to count.")
+@click.option("--end", default=GetDefaults.end,
+              metavar="<date-time>",
+              help="Time of the latest packet to count.")
+@click.option("--catalog/--no-catalog", default=GetDefaults.catalog,
+              help="Keep the capture times in a catalog in the source directory.")
+@click.option("--workers", default=GetDefaults.workers, type=click.IntRange(min=1),
+              metavar="<count>",
+              help="Number of files to probe at the same time.")
+@click.option("--rotation", is_flag=True, default=GetDefaults.rotation,
+              help="The files are a tcpdump rotation (binary-search them).")
+@click.option("--index", is_flag=True, default=GetDefaults.index,
+              help="Seek to the start with sidecar indices (built when missing).")
+@click.option("--gap", default=StatsDefaults.gap,
+              type=click.FloatRange(min=0, min_open=True), metavar="<seconds>",
+              help="Seconds without packets to report as a gap.")
+def stats(source, glob, start, end, catalog, workers, rotation, index, gap):
+    """Counts the packets in the SOURCE directories without merging them
+
+    Only the record headers are read, they give the packet and bit rates,
+    the packet-size percentiles and histogram and the gaps in the capture.
+    This needs NumPy.
+    """
+    from .get import GetPackets
+    collector = GetPackets(source=list(source), target=None,
+                           source_glob=glob,
+                           start=start, end=end,
+                           catalog=catalog,
+                           workers=workers,
+                           rotation=rotation,
+                           index=index)
+    try:
+        statistics = collector.stats(gap=gap)
+    except ModuleNotFoundError as error:
+        if error.name != "numpy":
+            raise
+        raise click.ClickException(
+            "packets stats needs NumPy (pip install numpy)")
+    click.echo(statistics.report())
+    return
+
+
+@main.command(context_settings=CONTEXT_SETTINGS,
+              short_help="Build the seek-indices for packet files.")
+@click.argument("source", type=click.Path(exists=True))
+@click.option("--glob", default=GetDefaults.glob,
+              metavar="<file-glob>",
+              help="Glob to match files in the source directory.")
+@click.option("--packets", default=IndexDefaults.packets,
+              type=click.IntRange(min=1), metavar="<count>",
+              help="Most packets between index entries.")
+@click.option("--seconds", default=IndexDefaults.seconds,
+              type=float, metavar="<seconds>",
+              help="Most seconds between index entries.")
+@click.option("--workers", default=GetDefaults.workers, type=click.IntRange(min=1),
+              metavar="<count>",
+              help="Number of files to index at the same time.")
+@click.option("--watch", is_flag=True,
+              help="Keep the catalog and indices current as the files change.")
+@click.option("--interval", default=WatchDefaults.interval,
+              type=float, metavar="<seconds>",
+              help="Seconds to gather file changes for when watching.")
+@click.option("--poll", is_flag=True,
+              help="Poll the directory instead of using inotify.")
+def index(source, glob, packets, seconds, workers, watch, interval, poll):
+    """Builds the sidecar seek-indices for the packet files
+
+    With --watch it also keeps the source directory's catalog current,
+    only re-probing the files that change, until it's interrupted.
+    """
+    if watch:
+        from .watch import Watcher
+        try:
+            Watcher(source, glob, packets=packets, seconds=seconds,
+                    workers=workers, interval=interval, polling=poll)()
+        except KeyboardInterrupt:
+            pass
+        return
+    from .get import FileFilterer
+    from .index import Indexer
+    files = [capture.path for capture in FileFilterer(source, glob).all_files]
+    Indexer(files, packets=packets, seconds=seconds, workers=workers)()
+    return
+
+
+@main.command(context_settings=CONTEXT_SETTINGS,
+              short_help="Packets per minute from the catalog's rollups.")
+@click.argument("source", type=click.Path(exists=True))
+@click.option("--glob", default=GetDefaults.glob,
+              metavar="<file-glob>",
+              help="Glob to match files in the source directory.")
+@click.option("--start", default=GetDefaults.start,
+              metavar="<date-time>",
+              help="Time of the earliest minute to show.")
+@click.option("--end", default=GetDefaults.end,
+              metavar="<date-time>",
+              help="Time of the latest minute to show.")
+@click.option("--minutes", default=TimelineDefaults.minutes,
+              type=click.IntRange(min=1), metavar="<count>",
+              help="Minutes to add up in each row.")
+@click.option("--workers", default=GetDefaults.workers, type=click.IntRange(min=1),
+              metavar="<count>",
+              help="Number of files to probe at the same time.")
+def timeline(source, glob, start, end, minutes, workers):
+    """Shows the packets, bytes and peak rate per minute in SOURCE
+
+    The counts are kept in the directory's catalog when the files are
+    probed, only the files that changed since then are read.
+    """
+    from .timeline import Timeline
+    click.echo(Timeline(source, glob, start=start, end=end, minutes=minutes,
+                        workers=workers).report())
+    return
+
+
+@main.command(context_settings=CONTEXT_SETTINGS,
+              short_help="Serve merged packets for time-window queries.")
+@click.argument("source", type=click.Path(exists=True))
+@click.option("--socket", type=click.Path(dir_okay=False),
+              metavar="<path>",
+              help="Listen on a Unix socket instead of localhost.")
+@click.option("--port", default=ServeDefaults.port, type=click.IntRange(min=0),
+              metavar="<port>",
+              help="Localhost port to listen on (without --socket).")
+@click.option("--catalog/--no-catalog", default=GetDefaults.catalog,
+              help="Keep the capture times in a catalog in the source directory.")
+@click.option("--workers", default=GetDefaults.workers, type=click.IntRange(min=1),
+              metavar="<count>",
+              help="Number of threads probing files.")
+@click.option("--index", is_flag=True, default=GetDefaults.index,
+              help="Seek into the files with sidecar indices (built when missing).")
+def serve(source, socket, port, catalog, workers, index):
+    """Serves the merged packets over HTTP until it's interrupted
+
+    Query it with GET /packets?start=<date-time>&end=<date-time>&glob=<glob>
+    """
+    from .serve import PacketServer
+    try:
+        PacketServer(source, socket=socket, port=port, catalog=catalog,
+                     workers=workers, index=index)()
+    except KeyboardInterrupt:
+        pass
     return
@@ -0,0 +1,836 @@
+"""Native merging of capture files"""
+# python standard library
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from operator import attrgetter
+import hashlib
+import heapq
+import os
+import queue
+import subprocess
+import threading
+
+# this project
+from .base import AlpacaBase
+from .errors import (
+    CaptureFormatError,
+    ConfigurationError,
+    )
+from .index import SeekIndex
+from .pcap import (
+    PcapFormat,
+    PcapWriter,
+    global_header,
+    )
+from .pcapng import (
+    PcapngWriter,
+    capture_reader,
+    )
+
+
+class MergeDefaults:
+    """Default values for the merge"""
+    batch = 256
+    batches = 8
+    timeout = 0.1
+    buffer_size = 2**16
+    min_buffer_size = 2**12
+    gzip_state = 2**16
+    reserve = 2**25
+    dedupe_frames = 2**16
+    digest_size = 16
+    radiotap = 127
+    ieee802_11 = 105
+
+
+class MemoryBudget(AlpacaBase):
+    """Splits a memory budget between the files a merge has open
+
+    Each open file costs its read buffer, the largest packet it can hold
+    on the merge's heap and (for gzip) the decompressor's state. What's left
+    after the reserve (the interpreter, its modules and the output's
+    buffers) decides how many files can be open at once, the buffers are
+    shrunk if fewer than two would fit.
+
+    Args:
+     max_memory (int): bytes the merge can use
+     max_files (int): most files to have open (None for no other limit)
+     buffer_size (int): bytes to buffer per file
+     reserve (int): bytes set aside for everything else
+    """
+    def __init__(self, max_memory, max_files=None,
+                 buffer_size=MergeDefaults.buffer_size,
+                 reserve=MergeDefaults.reserve, *args, **kwargs):
+        super(MemoryBudget, self).__init__(*args, **kwargs)
+        self.max_memory = max_memory
+        self.max_files = max_files
+        self.buffer_size = buffer_size
+        self.reserve = reserve
+        return
+
+    def __call__(self, readers, output=0):
+        """Works out the limits for the files
+
+        Args:
+         readers (list): PcapReaders for the files
+         output (int): bytes the output's buffers (and compressor) need
+
+        Returns:
+         tuple: most files to open at once, bytes to buffer per file
+
+        Raises:
+         ConfigurationError: the budget can't fit two files
+        """
+        packet = max((min(reader.header.snaplen or PcapFormat.max_snaplen,
+                          PcapFormat.max_snaplen) for reader in readers),
+                     default=PcapFormat.max_snaplen)
+        state = (MergeDefaults.gzip_state
+                 if any(reader.compressed for reader in readers) else 0)
+        available = self.max_memory - self.reserve - output
+        buffer_size = self.buffer_size
+        if available // (buffer_size + packet + state) < 2:
+            buffer_size = max(MergeDefaults.min_buffer_size,
+                              available // 2 - packet - state)
+        files = available // (buffer_size + packet + state)
+        if files < 2:
+            raise ConfigurationError(
+                "{} bytes of memory can't fit the merge (it needs at least "
+                "{})".format(self.max_memory, self.reserve + output + 2 * (
+                    buffer_size + packet + state)))
+        if self.max_files is not None:
+            files = min(files, self.max_files)
+        self.logger.debug("Memory budget: %d files with %d byte buffers",
+                          files, buffer_size)
+        return files, buffer_size
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.max_memory > 0
+        assert self.buffer_size > 0
+        return
+
+
+class ReadAhead:
+    """Reads an iterable on its own thread, a few batches ahead of its use
+
+    The records are handed over in batches (so the threads don't take turns
+    for every packet) through a bounded queue, so a fast reader never gets
+    more than ``batches`` batches ahead. Errors in the reading thread are
+    raised where the records are used, and the thread gives up once the
+    records stop being used.
+
+    Args:
+     iterable: the records to read
+     batch (int): records to hand over at once
+     batches (int): most batches to read ahead
+    """
+    def __init__(self, iterable, batch=MergeDefaults.batch,
+                 batches=MergeDefaults.batches):
+        self.batch = batch
+        self.queue = queue.Queue(maxsize=batches)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.fill,
+                                       args=(iter(iterable),), daemon=True)
+        self.thread.start()
+        return
+
+    def put(self, item):
+        """Queues an item unless the records stopped being used
+
+        Args:
+         item: a batch of records, an empty batch at the end or an error
+
+        Returns:
+         bool: True if it was queued
+        """
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=MergeDefaults.timeout)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fill(self, iterator):
+        """Reads the batches (run on the thread)
+
+        Args:
+         iterator: the records
+        """
+        try:
+            while True:
+                batch = list(islice(iterator, self.batch))
+                if not self.put(batch) or not batch:
+                    return
+        except Exception as error:
+            self.put(error)
+        return
+
+    def __iter__(self):
+        """Generates the records in the order they were read"""
+        try:
+            while True:
+                batch = self.queue.get()
+                if isinstance(batch, Exception):
+                    raise batch
+                if not batch:
+                    return
+                yield from batch
+        finally:
+            self.stopped.set()
+        return
+
+
+class Deduplicator(AlpacaBase):
+    """Drops frames that were already merged a moment before
+
+    Monitors on neighbouring channels pick up each other's frames and
+    frames get retransmitted, so the same frame can turn up several times
+    within a few milliseconds. The frames' contents are hashed and a frame
+    whose hash was seen within ``window`` seconds of the first copy is
+    dropped (the records arrive in time order, so the first copy is the
+    one that's kept). Only the hashes in the window are kept, and no more
+    than ``frames`` of them (the oldest are forgotten early in a burst).
+
+    For 802.11 frames (with or without a radiotap header) the radiotap
+    header, the FCS and the retry flag aren't hashed, since they differ
+    between the copies of one frame.
+
+    Args:
+     window (float): seconds a frame is remembered for
+     frames (int): most hashes to remember
+    """
+    def __init__(self, window, frames=MergeDefaults.dedupe_frames,
+                 *args, **kwargs):
+        super(Deduplicator, self).__init__(*args, **kwargs)
+        self.window = window
+        self.frames = frames
+        self.dropped = 0
+        self.bytes = 0
+        return
+
+    def radiotap(self, data):
+        """Finds the 802.11 frame after a radiotap header
+
+        Args:
+         data: the packet
+
+        Returns:
+         the 802.11 frame (without its FCS when the header says it has one)
+        """
+        if len(data) < 8:
+            return data
+        length = int.from_bytes(data[2:4], "little")
+        present = int.from_bytes(data[4:8], "little")
+        fcs = False
+        if present & 0b10:
+            # the flags follow the present-bitmaps (and the TSFT if it's
+            # there, aligned to 8 bytes)
+            offset, word = 8, present
+            while word & (1 << 31) and offset + 4 <= length:
+                word = int.from_bytes(data[offset:offset + 4], "little")
+                offset += 4
+            if present & 0b1:
+                offset = -(-offset // 8) * 8 + 8
+            fcs = offset < length and bool(data[offset] & 0x10)
+        frame = data[length:]
+        return frame[:-4] if fcs else frame
+
+    def digest(self, data, linktype):
+        """Hashes the part of a packet that's the same in every copy
+
+        Args:
+         data: the packet
+         linktype (int): the packet's data-link type
+
+        Returns:
+         bytes: the hash
+        """
+        digest = hashlib.blake2b(digest_size=MergeDefaults.digest_size)
+        if linktype == MergeDefaults.radiotap:
+            data = self.radiotap(data)
+            linktype = MergeDefaults.ieee802_11
+        if linktype == MergeDefaults.ieee802_11 and len(data) >= 2:
+            # the frame-control's retry flag is set on retransmissions
+            digest.update(data[:1])
+            digest.update(bytes((data[1] & ~0x08,)))
+            data = data[2:]
+        digest.update(data)
+        return digest.digest()
+
+    def __call__(self, records, linktypes):
+        """Generates the records that aren't duplicates
+
+        Args:
+         records (iter): the merged records in time order
+         linktypes (dict): data-link types keyed by the records' interface
+
+        Yields:
+         Record: the first copy of each frame
+        """
+        window = int(self.window * 10**9)
+        seen, order = set(), deque()
+        for record in records:
+            while order and (order[0][0] < record.timestamp - window
+                             or len(order) > self.frames):
+                seen.discard(order.popleft()[1])
+            digest = self.digest(record.data, linktypes[record.interface])
+            if digest in seen:
+                self.dropped += 1
+                self.bytes += len(record.data)
+                continue
+            seen.add(digest)
+            order.append((record.timestamp, digest))
+            yield record
+        self.logger.info("Dropped %d duplicate frames (%d bytes)",
+                         self.dropped, self.bytes)
+        return
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.window > 0
+        assert self.frames > 0
+        return
+
+
+class MergeEngine(AlpacaBase):
+    """Streams a k-way merge of the packets in several capture files
+
+    The records are merged on a heap as they are read, so only one packet
+    per file is held at a time, and packets outside of the start and end
+    times are dropped instead of being written. Each file is assumed to be
+    in time-order (as tcpdump writes them), so a file stops being read once
+    it passes the end time.
+
+    Files can be grouped into channels (e.g. one per capture directory),
+    each channel's files are merged on a thread of its own and the channels
+    are merged as their packets arrive. With ``tag`` the output is pcapng
+    with an interface named after each channel (and link-type), so every
+    packet says where it came from and the channels can have different
+    link-types.
+
+    The files can be pcap or pcapng (with any number of interfaces), the
+    pcapng packets keep their interface's name. If the interfaces don't all
+    share a link-type the output is pcapng even without ``tag``.
+
+    Args:
+     files (list): paths to the capture files
+     start (int): epoch nanoseconds of the earliest packet (None for all)
+     end (int): epoch nanoseconds of the latest packet (None for all)
+     index (bool): use (and lazily build) seek-indices to skip to the start
+     channels (dict): channel names keyed by path (None for one channel)
+     tag (bool): write pcapng with each packet's channel as its interface
+     max_files (int): most files to have open (opens them lazily)
+     buffer_size (int): read through buffers this big (opens them lazily)
+     deduplicator (Deduplicator): drops repeated frames (None to keep them)
+
+    Raises:
+     CaptureFormatError: (when merging) a file can't be merged natively
+    """
+    def __init__(self, files, start=None, end=None, index=False,
+                 channels=None, tag=False, max_files=None, buffer_size=None,
+                 deduplicator=None, *args, **kwargs):
+        super(MergeEngine, self).__init__(*args, **kwargs)
+        self.files = files
+        self.start = start
+        self.end = end
+        self.index = index
+        self.channels = channels or {}
+        self.tag = tag
+        self.max_files = max_files
+        self.buffer_size = buffer_size
+        self.deduplicator = deduplicator
+        self.most_open = 0
+        self._readers = None
+        self._header = None
+        self._interfaces = None
+        self._pcapng = None
+        return
+
+    @property
+    def readers(self):
+        """Readers for the files (pcap or pcapng)"""
+        if self._readers is None:
+            self._readers = [capture_reader(path) for path in self.files]
+        return self._readers
+
+    @property
+    def pcapng(self):
+        """True if the output is pcapng (tagged or mixed link-types)"""
+        if self._pcapng is None:
+            linktypes = set(interface.linktype for reader in self.readers
+                            for interface in reader.interfaces)
+            self._pcapng = self.tag or len(linktypes) > 1
+            if self._pcapng and not self.tag:
+                self.logger.info("Writing pcapng for the link-types %s",
+                                 sorted(linktypes))
+        return self._pcapng
+
+    @property
+    def header(self):
+        """The global header for the merged output
+
+        Raises:
+         CaptureFormatError: the files don't share a link-type
+        """
+        if self._header is None:
+            headers = [reader.header for reader in self.readers]
+            linktypes = set(header.linktype for header in headers)
+            if len(linktypes) > 1:
+                raise CaptureFormatError(
+                    "Can't merge link-types {} into one pcap".format(
+                        sorted(linktypes)))
+            first = headers[0]
+            if first.raw is not None and all(header.raw == first.raw
+                                             for header in headers):
+                self._header = first
+            else:
+                self._header = global_header(
+                    linktype=first.linktype,
+                    snaplen=max(header.snaplen for header in headers),
+                    nanoseconds=any(header.nanoseconds for header in headers),
+                    byte_order=first.byte_order)
+        return self._header
+
+    def describe(self, reader, interface):
+        """The output interface for one of a file's interfaces
+
+        The name is the file's channel (when tagging) and the interface's
+        own name (pcapng), joined with a '/'
+
+        Args:
+         reader (PcapReader): reader for the file
+         interface (Interface): the interface in the file
+
+        Returns:
+         Interface: the interface for the output
+        """
+        names = (self.channels.get(reader.path) if self.tag else None,
+                 interface.name)
+        return interface._replace(
+            name="/".join(name for name in names if name) or None)
+
+    @property
+    def interfaces(self):
+        """The interfaces for pcapng output
+
+        Returns:
+         dict: interface ids keyed by Interface (in the order they were found)
+        """
+        if self._interfaces is None:
+            self._interfaces = {}
+            for reader in self.readers:
+                for interface in reader.interfaces:
+                    self._interfaces.setdefault(
+                        self.describe(reader, interface),
+                        len(self._interfaces))
+        return self._interfaces
+
+    def identifiers(self, reader):
+        """The output interface ids for a file's interfaces
+
+        Args:
+         reader (PcapReader): reader for the file
+
+        Returns:
+         list: the ids in the file's order (None when the output is pcap)
+        """
+        if not self.pcapng:
+            return None
+        return [self.interfaces[self.describe(reader, interface)]
+                for interface in reader.interfaces]
+
+    @property
+    def linktypes(self):
+        """The data-link types keyed by the records' interface ids"""
+        if self.pcapng:
+            return {identifier: interface.linktype
+                    for interface, identifier in self.interfaces.items()}
+        return {None: self.header.linktype}
+
+    def validate(self):
+        """Reads the headers the merge needs
+
+        Raises:
+         CaptureFormatError: a file can't be merged natively
+        """
+        if self.pcapng:
+            self.interfaces
+        else:
+            self.header
+        return
+
+    def writer(self, stream):
+        """Builds the writer for the output
+
+        Args:
+         stream: binary file-object for the output
+
+        Returns:
+         PcapWriter: (PcapngWriter for pcapng output) the writer
+        """
+        if self.pcapng:
+            return PcapngWriter(
+                stream, list(self.interfaces),
+                nanoseconds=any(reader.header.nanoseconds
+                                for reader in self.readers))
+        return PcapWriter(stream, self.header)
+
+    def offset(self, reader):
+        """Where to start reading a file
+
+        Args:
+         reader (PcapReader): reader for the file
+
+        Returns:
+         int: offset from the file's seek-index (None to read it all)
+        """
+        if not self.index or self.start is None:
+            return None
+        if reader.first is not None and reader.first >= self.start:
+            return None
+        return SeekIndex(reader.path).seek(self.start)
+
+    def trimmed(self, reader, writer):
+        """Generates a file's records that fall within the times
+
+        Args:
+         reader (PcapReader): reader for the file
+         writer (PcapWriter): writer whose format the records need
+
+        Yields:
+         Record: the records between the start and end times
+        """
+        same = writer.accepts(reader.header)
+        identifiers = self.identifiers(reader)
+        start, end = self.start, self.end
+        for record in reader.records(self.offset(reader),
+                                     buffer_size=self.buffer_size):
+            if start is not None and record.timestamp < start:
+                continue
+            if end is not None and record.timestamp > end:
+                return
+            if not same:
+                record = writer.convert(record)
+            if identifiers is not None:
+                record = record._replace(
+                    interface=identifiers[record.interface or 0])
+            elif record.interface is not None:
+                record = record._replace(interface=None)
+            yield record
+        return
+
+    @property
+    def groups(self):
+        """The readers grouped by channel
+
+        Returns:
+         list: lists of readers (in the order their channels were found)
+        """
+        groups = {}
+        for reader in self.readers:
+            groups.setdefault(self.channels.get(reader.path),
+                              []).append(reader)
+        return list(groups.values())
+
+    @property
+    def bounded(self):
+        """True if the files are opened lazily (there are limits)"""
+        return self.max_files is not None or self.buffer_size is not None
+
+    def span(self, reader):
+        """The part of the window that a file's packets cover
+
+        Args:
+         reader (PcapReader): reader for the file
+
+        Returns:
+         tuple: epoch nanoseconds for when it's opened and when it's done
+           (None if it has no packets in the window)
+        """
+        first, last = reader.first, reader.last
+        if first is None:
+            return None
+        if self.start is not None:
+            first = max(first, self.start)
+        if self.end is not None:
+            last = min(last, self.end)
+        return (first, last) if first <= last else None
+
+    def overlap(self):
+        """The most files that a lazy merge has open at once
+
+        Returns:
+         int: the most files whose packets overlap in the window
+        """
+        events = []
+        for reader in self.readers:
+            span = self.span(reader)
+            if span is not None:
+                events.extend(((span[0], 0), (span[1], 1)))
+        most = opened = 0
+        for _, closing in sorted(events):
+            opened += -1 if closing else 1
+            most = max(most, opened)
+        return most
+
+    def lazy(self, writer):
+        """Merges the files, opening each one only when it's needed
+
+        A file is opened when the merge reaches its first packet (or the
+        start of the window) and closed once its last packet in the window
+        is written, so a long rotation only has the files whose times
+        overlap open at once
+
+        Args:
+         writer (PcapWriter): the writer the records are meant for
+
+        Yields:
+         Record: the merged records
+        """
+        pending = []
+        for index, reader in enumerate(self.readers):
+            first = reader.first
+            if first is None or (self.end is not None and first > self.end):
+                continue
+            if self.start is not None:
+                first = max(first, self.start)
+            pending.append((first, index, reader))
+        pending.sort(reverse=True)
+        heap, order = [], 0
+        while heap or pending:
+            while pending and (not heap or pending[-1][0] <= heap[0][0]):
+                _, _, reader = pending.pop()
+                records = self.trimmed(reader, writer)
+                record = next(records, None)
+                if record is not None:
+                    order += 1
+                    heapq.heappush(heap, (record.timestamp, order, record,
+                                          records))
+                    self.most_open = max(self.most_open, len(heap))
+            if not heap:
+                continue
+            _, _, record, records = heap[0]
+            yield record
+            record = next(records, None)
+            if record is None:
+                heapq.heappop(heap)
+            else:
+                order += 1
+                heapq.heapreplace(heap, (record.timestamp, order, record,
+                                         records))
+        return
+
+    def records(self, writer):
+        """Merges the records of all the files in time order
+
+        Args:
+         writer (PcapWriter): the writer the records are meant for
+
+        Returns:
+         iter: the merged records
+        """
+        if self.bounded:
+            return self.lazy(writer)
+        key = attrgetter("timestamp")
+        merged = [heapq.merge(*(self.trimmed(reader, writer)
+                                for reader in readers), key=key)
+                  for readers in self.groups]
+        if len(merged) == 1:
+            return merged[0]
+        return heapq.merge(*(ReadAhead(channel) for channel in merged),
+                           key=key)
+
+    def __call__(self, stream):
+        """Writes the merged packets
+
+        Args:
+         stream: binary file-object for the output
+
+        Returns:
+         PcapWriter: the writer (with its packet and byte counts)
+        """
+        writer = self.writer(stream)
+        writer.write_header()
+        records = self.records(writer)
+        if self.deduplicator is not None:
+            records = self.deduplicator(records, self.linktypes)
+        for record in records:
+            writer.write(record)
+        self.logger.debug("Merged %d packets (%d bytes) from %d files",
+                          writer.packets, writer.bytes, len(self.files))
+        if self.bounded:
+            self.logger.debug("At most %d files were open at once",
+                              self.most_open)
+        return writer
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        return
+
+
+def merge_group(files, target, start=None, end=None, index=False,
+                native=True, buffer_size=None):
+    """Merges a group of files into one (run in a worker process)
+
+    Args:
+     files (list): paths to the capture files
+     target (str): path for the merged file
+     start (int): epoch nanoseconds of the earliest packet (None for all)
+     end (int): epoch nanoseconds of the latest packet (None for all)
+     index (bool): seek to the start with the files' seek-indices
+     native (bool): try the native merge before mergecap
+     buffer_size (int): read through buffers this big (opens them lazily)
+
+    Returns:
+     str: the target
+    """
+    engine = MergeEngine(files, start=start, end=end, index=index,
+                         buffer_size=buffer_size)
+    if native:
+        try:
+            engine.validate()
+        except CaptureFormatError:
+            native = False
+    if native:
+        with open(target, "wb") as stream:
+            engine(stream)
+    else:
+        subprocess.run(["mergecap", "-w", target] + list(files),
+                       stdout=subprocess.DEVNULL, check=True)
+    return target
+
+
+class TreeMerge(AlpacaBase):
+    """Merges many files in levels of small groups on worker processes
+
+    Each level merges groups of at most ``fan_in`` files into intermediate
+    files (so no worker has more than ``fan_in`` captures open, and no
+    mergecap command line has more than ``fan_in`` names), until there are
+    few enough files left for one final merge. The groups are neighbours in
+    name-order, so the files of a rotation are merged with the ones next to
+    them in time. The window is trimmed by the first level, the rest only
+    merge what's left.
+
+    Args:
+     files (list): paths to the capture files
+     directory (str): where to put the intermediate files
+     fan_in (int): most files merged together
+     workers (int): number of worker processes
+     start (int): epoch nanoseconds of the earliest packet (None for all)
+     end (int): epoch nanoseconds of the latest packet (None for all)
+     index (bool): seek to the start with the files' seek-indices
+     native (bool): try the native merge before mergecap
+     channels (dict): channel names keyed by path (groups don't mix them)
+     buffer_size (int): read through buffers this big (opens them lazily)
+    """
+    def __init__(self, files, directory, fan_in, workers=1, start=None,
+                 end=None, index=False, native=True, channels=None,
+                 buffer_size=None, *args, **kwargs):
+        super(TreeMerge, self).__init__(*args, **kwargs)
+        self.files = files
+        self.directory = directory
+        self.fan_in = fan_in
+        self.workers = workers
+        self.start = start
+        self.end = end
+        self.index = index
+        self.native = native
+        self.channels = channels or {}
+        self.buffer_size = buffer_size
+        self.intermediates = 0
+        return
+
+    def groups(self, files):
+        """Splits files into groups to merge
+
+        Args:
+         files (list): paths of the files
+
+        Returns:
+         list: (channel, paths) for each group
+        """
+        channels = {}
+        for path in sorted(files):
+            channels.setdefault(self.channels.get(path), []).append(path)
+        return [(channel, paths[offset:offset + self.fan_in])
+                for channel, paths in channels.items()
+                for offset in range(0, len(paths), self.fan_in)]
+
+    def target(self):
+        """Names the next intermediate file
+
+        Returns:
+         str: path in the directory
+        """
+        self.intermediates += 1
+        return os.path.join(self.directory,
+                            "level-{:06d}.pcap".format(self.intermediates))
+
+    def level(self, pool, files, first):
+        """Merges one level of groups
+
+        Args:
+         pool (ProcessPoolExecutor): the worker processes
+         files (list): paths of the files to merge
+         first (bool): the files are the captures (seek into them)
+
+        Returns:
+         list: paths of the merged files (lone files are passed along)
+        """
+        jobs, merged = [], []
+        for channel, group in self.groups(files):
+            if len(group) == 1:
+                merged.append(group[0])
+                continue
+            target = self.target()
+            self.channels[target] = channel
+            jobs.append(pool.submit(merge_group, group, target,
+                                    start=self.start, end=self.end,
+                                    index=self.index and first,
+                                    native=self.native,
+                                    buffer_size=self.buffer_size))
+        merged.extend(job.result() for job in jobs)
+        for path in set(files) - set(merged):
+            if os.path.dirname(path) == self.directory:
+                os.remove(path)
+        return merged
+
+    def __call__(self):
+        """Merges levels until the rest can be merged at once
+
+        Returns:
+         list: paths of the files for the final merge
+        """
+        files, first = list(self.files), True
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while len(files) > self.fan_in:
+                merged = self.level(pool, files, first)
+                self.logger.info("Merged %d files into %d", len(files),
+                                 len(merged))
+                if len(merged) == len(files):
+                    break
+                files, first = merged, False
+        return files
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.fan_in > 1
+        return
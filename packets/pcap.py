@@ -0,0 +1,650 @@
+"""Native reader for libpcap capture files"""
+# python standard library
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import (
+    datetime,
+    timedelta,
+    )
+import gzip
+import mmap
+import os
+import struct
+import time
+
+# this project
+from .base import AlpacaBase
+from .errors import CaptureFormatError
+
+
+class PcapFormat:
+    """Constants for the libpcap file format"""
+    microseconds = 0xa1b2c3d4
+    nanoseconds = 0xa1b23c4d
+    pcapng = 0x0a0d0d0a
+    gzip = b"\x1f\x8b"
+    chunk_size = 2**20
+    header_size = 24
+    record_size = 16
+    tail_window = 2**16
+    max_snaplen = 2**18
+    release_size = 2**22
+    check_size = 2**16
+    settle = 5
+
+
+GlobalHeader = namedtuple("GlobalHeader",
+                          ["byte_order", "nanoseconds", "version_major",
+                           "version_minor", "snaplen", "linktype", "raw"])
+
+Interface = namedtuple("Interface", ["name", "linktype", "snaplen"])
+
+Record = namedtuple("Record", ["timestamp", "original", "header", "data",
+                               "interface"], defaults=(None,))
+
+
+def global_header(linktype, snaplen=PcapFormat.max_snaplen, nanoseconds=False,
+                  byte_order="<"):
+    """Builds a global header for a new capture file
+
+    Args:
+     linktype (int): the data-link type of the packets
+     snaplen (int): the maximum bytes per packet
+     nanoseconds (bool): use nanosecond time-stamps
+     byte_order (str): struct byte-order character
+
+    Returns:
+     GlobalHeader: the header (including its raw bytes)
+    """
+    magic = PcapFormat.nanoseconds if nanoseconds else PcapFormat.microseconds
+    raw = struct.pack(byte_order + "IHHiIII", magic, 2, 4, 0, 0, snaplen,
+                      linktype)
+    return GlobalHeader(byte_order=byte_order, nanoseconds=nanoseconds,
+                        version_major=2, version_minor=4, snaplen=snaplen,
+                        linktype=linktype, raw=raw)
+
+
+def to_datetime(timestamp):
+    """Converts epoch nanoseconds to a (naive, local) datetime
+
+    This matches what ``capinfos`` prints, so the two are interchangeable
+
+    Args:
+     timestamp (int): nanoseconds since the epoch
+
+    Returns:
+     datetime: the timestamp to microsecond precision
+    """
+    seconds, nanoseconds = divmod(timestamp, 10**9)
+    return (datetime.fromtimestamp(seconds)
+            + timedelta(microseconds=nanoseconds // 1000))
+
+
+def to_nanoseconds(timestamp):
+    """Converts a datetime to epoch nanoseconds
+
+    Args:
+     timestamp (datetime): naive datetimes are taken to be local time
+
+    Returns:
+     int: nanoseconds since the epoch
+    """
+    return (int(timestamp.replace(microsecond=0).timestamp()) * 10**9
+            + timestamp.microsecond * 1000)
+
+
+class PcapReader(AlpacaBase):
+    """Reads the records of a libpcap file
+
+    Args:
+     path (str): path to the capture file
+
+    Raises:
+     CaptureFormatError: (when read) the file isn't a libpcap file
+    """
+    def __init__(self, path, *args, **kwargs):
+        super(PcapReader, self).__init__(*args, **kwargs)
+        self.path = path
+        self._header = None
+        self._record_struct = None
+        self._first = None
+        self._last = None
+        self._compressed = None
+        return
+
+    @property
+    def compressed(self):
+        """True if the file is gzipped (checked with the magic bytes)"""
+        if self._compressed is None:
+            with open(self.path, "rb") as stream:
+                self._compressed = stream.read(2) == PcapFormat.gzip
+        return self._compressed
+
+    @contextmanager
+    def open(self, buffer_size=-1):
+        """Opens the capture file
+
+        Gzipped files are decompressed as they are read, so they never need
+        to be decompressed to disk (or held in memory)
+
+        Args:
+         buffer_size (int): bytes of the file to buffer (-1 for the default)
+
+        Yields:
+         file: binary file-object positioned at the start of the file
+        """
+        with open(self.path, "rb", buffering=buffer_size) as stream:
+            if not self.compressed:
+                yield stream
+                return
+            with gzip.GzipFile(fileobj=stream, mode="rb") as decompressed:
+                yield decompressed
+        return
+
+    def read(self, stream, size):
+        """Reads bytes from the stream
+
+        A gzip stream that stops before its end-of-stream marker (it's still
+        being compressed) is treated as the end of the file
+
+        Args:
+         stream: binary file-object
+         size (int): number of bytes to read
+
+        Returns:
+         bytes: what could be read
+        """
+        try:
+            return stream.read(size)
+        except EOFError:
+            return b""
+
+    @property
+    def header(self):
+        """The global header of the capture file"""
+        if self._header is None:
+            with self.open() as stream:
+                self.read_header(stream)
+        return self._header
+
+    @property
+    def data_offset(self):
+        """Offset of the first record (where a walk of the file starts)"""
+        return PcapFormat.header_size
+
+    @property
+    def interfaces(self):
+        """The file's one (unnamed) interface, as a list like pcapng's"""
+        return [Interface(None, self.header.linktype, self.header.snaplen)]
+
+    @property
+    def record_struct(self):
+        """struct to unpack the per-packet record headers"""
+        if self._record_struct is None:
+            self._record_struct = struct.Struct(
+                "{}IIII".format(self.header.byte_order))
+        return self._record_struct
+
+    def read_header(self, stream):
+        """Reads and validates the global header
+
+        Args:
+         stream: binary file-object at the start of the capture
+
+        Returns:
+         GlobalHeader: the parsed header
+
+        Raises:
+         CaptureFormatError: the magic number isn't a libpcap one
+        """
+        raw = self.read(stream, PcapFormat.header_size)
+        if len(raw) < PcapFormat.header_size:
+            raise CaptureFormatError(
+                "Too short to be a pcap file: {}".format(self.path))
+        for byte_order in "<>":
+            magic, = struct.unpack(byte_order + "I", raw[:4])
+            if magic in (PcapFormat.microseconds, PcapFormat.nanoseconds):
+                break
+        else:
+            raise CaptureFormatError(
+                "Not a libpcap file: {}".format(self.path))
+        (major, minor, zone, sigfigs,
+         snaplen, linktype) = struct.unpack(byte_order + "HHiIII", raw[4:])
+        self._header = GlobalHeader(byte_order=byte_order,
+                                    nanoseconds=magic == PcapFormat.nanoseconds,
+                                    version_major=major,
+                                    version_minor=minor,
+                                    snaplen=snaplen,
+                                    linktype=linktype,
+                                    raw=raw)
+        return self._header
+
+    def timestamp(self, seconds, fraction):
+        """Converts the record header time-fields to epoch nanoseconds
+
+        Args:
+         seconds (int): seconds since the epoch
+         fraction (int): micro- or nano-seconds (depending on the magic)
+
+        Returns:
+         int: nanoseconds since the epoch
+        """
+        if self.header.nanoseconds:
+            return seconds * 10**9 + fraction
+        return seconds * 10**9 + fraction * 1000
+
+    def records(self, offset=None, buffer_size=None):
+        """Generates the packet records in file order
+
+        A truncated final record (e.g. tcpdump was killed) is dropped.
+        Uncompressed files are memory-mapped so the header and data of each
+        record are ``memoryview`` slices of the map instead of copies,
+        unless a buffer size is given or the file is still being written
+        (see ``settled``)
+
+        Args:
+         offset (int): offset of the record to start at (e.g. from an index)
+         buffer_size (int): read through a buffer this big instead of a map
+
+        Yields:
+         Record: timestamp (epoch nanoseconds), original length,
+           record-header and packet bytes
+        """
+        if self.compressed or buffer_size is not None or not self.settled:
+            return self.streamed_records(offset, buffer_size)
+        return self.mapped_records(offset)
+
+    @property
+    def settled(self):
+        """True if the file hasn't been written to for a while
+
+        A file that's still being written (or re-written by a ``-W`` ring)
+        can be truncated, and reading a truncated part of a map kills the
+        process (SIGBUS), so only settled files are mapped
+        """
+        return (time.time() - os.stat(self.path).st_mtime
+                >= PcapFormat.settle)
+
+    def streamed_records(self, offset=None, buffer_size=None):
+        """Generates the records by reading them from a (gzip) stream
+
+        The file is closed as soon as its last record has been read
+
+        Args:
+         offset (int): offset of the record to start at
+         buffer_size (int): bytes of the file to buffer (None for default)
+
+        Yields:
+         Record: the records with their header and data as bytes
+        """
+        with self.open(-1 if buffer_size is None else buffer_size) as stream:
+            self.read_header(stream)
+            if offset is not None:
+                stream.seek(offset)
+            unpack = self.record_struct.unpack
+            size = PcapFormat.record_size
+            while True:
+                header = self.read(stream, size)
+                if len(header) < size:
+                    return
+                seconds, fraction, included, original = unpack(header)
+                data = self.read(stream, included)
+                if len(data) < included:
+                    return
+                yield Record(self.timestamp(seconds, fraction), original,
+                             header, data)
+        return
+
+    def mapped_records(self, offset=None):
+        """Generates the records from a memory-map of the file
+
+        The map is only as long as the file was when it was opened, so
+        packets tcpdump adds afterwards aren't seen. Every ``release_size``
+        bytes the pages that have been read are dropped (MADV_DONTNEED), so
+        the merge's resident memory doesn't grow with the file (a record
+        that's still held is paged back in from the file if it's used). The
+        file's size is checked every ``check_size`` bytes and the records
+        stop if it shrank, instead of reading past the end of the file.
+
+        Args:
+         offset (int): offset of the record to start at
+
+        Yields:
+         Record: the records with their header and data as memoryviews
+        """
+        with open(self.path, "rb") as stream:
+            self.read_header(stream)
+            if os.fstat(stream.fileno()).st_size <= PcapFormat.header_size:
+                return
+            memory = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            descriptor = os.dup(stream.fileno())
+        view = memoryview(memory)
+        try:
+            advise = hasattr(memory, "madvise")
+            if advise:
+                memory.madvise(mmap.MADV_SEQUENTIAL)
+            unpack_from = self.record_struct.unpack_from
+            size = PcapFormat.record_size
+            position = PcapFormat.header_size if offset is None else offset
+            end = len(view)
+            released = position - position % mmap.PAGESIZE
+            checked = position
+            while position + size <= end:
+                if position >= checked:
+                    if os.fstat(descriptor).st_size < end:
+                        self.logger.warning("%s shrank while it was read",
+                                            self.path)
+                        return
+                    checked = position + PcapFormat.check_size
+                    reached = position - position % mmap.PAGESIZE
+                    if (advise and reached - released
+                            >= PcapFormat.release_size):
+                        memory.madvise(mmap.MADV_DONTNEED, released,
+                                       reached - released)
+                        released = reached
+                seconds, fraction, included, original = unpack_from(view,
+                                                                    position)
+                data = position + size
+                following = data + included
+                if following > end:
+                    return
+                yield Record(self.timestamp(seconds, fraction), original,
+                             view[position:data], view[data:following])
+                position = following
+        finally:
+            os.close(descriptor)
+            view.release()
+            try:
+                memory.close()
+            except BufferError:
+                # records that are still held keep the map until they're gone
+                pass
+        return
+
+    def walk(self, stream):
+        """Generates record positions and times from the record headers
+
+        The file is read in large chunks and only the record headers are
+        unpacked, so this works the same way for compressed streams (a
+        truncated final record isn't generated)
+
+        Args:
+         stream: binary file-object positioned at the start of a record
+
+        Yields:
+         tuple: offset of the record, offset just past it, epoch nanoseconds
+           and the packet's original length
+        """
+        timestamp = self.timestamp
+        unpack_from = self.record_struct.unpack_from
+        record_size = PcapFormat.record_size
+        offset = stream.tell()
+        buffer, position = b"", 0
+        while True:
+            chunk = self.read(stream, PcapFormat.chunk_size)
+            if not chunk:
+                return
+            buffer = buffer[position:] + chunk
+            offset += position
+            position = 0
+            while position + record_size <= len(buffer):
+                seconds, fraction, included, original = unpack_from(buffer,
+                                                                    position)
+                end = position + record_size + included
+                if end > len(buffer):
+                    break
+                yield (offset + position, offset + end,
+                       timestamp(seconds, fraction), original)
+                position = end
+        return
+
+    def scan(self, offset=PcapFormat.header_size, rollup=None):
+        """Walks the record headers from an offset to the end of the file
+
+        Args:
+         offset (int): where to start (must be the start of a record)
+         rollup (Rollup): adds up each packet's time and length as it's walked
+
+        Returns:
+         tuple: packets walked, epoch nanoseconds of the last one (or None)
+           and the offset just past the last complete record
+        """
+        packets, last, end = 0, None, offset
+        with self.open() as stream:
+            self.read_header(stream)
+            stream.seek(offset)
+            for _, end, last, original in self.walk(stream):
+                packets += 1
+                if rollup is not None:
+                    rollup.add(last, original)
+        return packets, last, end
+
+    @property
+    def first(self):
+        """Epoch nanoseconds of the first packet (None if there are none)"""
+        if self._first is None:
+            with self.open() as stream:
+                self.read_header(stream)
+                header = self.read(stream, PcapFormat.record_size)
+            if len(header) == PcapFormat.record_size:
+                seconds, fraction, _, _ = self.record_struct.unpack(header)
+                self._first = self.timestamp(seconds, fraction)
+        return self._first
+
+    @property
+    def last(self):
+        """Epoch nanoseconds of the last packet (None if there are none)
+
+        This reads backwards from the end of the file instead of walking
+        every record (falling back to the walk if the tail is ambiguous).
+        Compressed files can't be read backwards so their record headers are
+        walked in a single decompressing pass.
+        """
+        if self._last is None and self.first is not None and self.compressed:
+            self._last = self.scan()[1]
+        if self._last is None and self.first is not None:
+            with self.open() as stream:
+                self.read_header(stream)
+                self._last = self.tail_timestamp(stream)
+        return self._last
+
+    def plausible(self, seconds, fraction, included, original):
+        """Checks if a record header could be a real one
+
+        Args:
+         seconds, fraction, included, original: the unpacked record header
+
+        Returns:
+         bool: True if the fields are self-consistent
+        """
+        limit = 10**9 if self.header.nanoseconds else 10**6
+        snaplen = self.header.snaplen or PcapFormat.max_snaplen
+        return (fraction < limit
+                and included <= original
+                and included <= max(snaplen, PcapFormat.max_snaplen)
+                and seconds * 10**9 >= self.first - 10**9)
+
+    def last_record(self, buffer):
+        """Finds the offset of the last complete record in the tail of a file
+
+        Every offset is tried as a record header until a chain of plausible
+        headers lands exactly on the end of the buffer, offsets on chains
+        that already failed aren't followed again
+
+        Args:
+         buffer (bytes): the tail of the file
+
+        Returns:
+         int: offset in the buffer of the last record (None if not found)
+        """
+        unpack_from = self.record_struct.unpack_from
+        size = PcapFormat.record_size
+        end = len(buffer)
+        dead = set()
+        for start in range(end - size + 1):
+            offset, visited = start, []
+            while offset + size <= end and offset not in dead:
+                fields = unpack_from(buffer, offset)
+                if not self.plausible(*fields):
+                    break
+                visited.append(offset)
+                offset += size + fields[2]
+            if offset == end and visited:
+                return visited[-1]
+            dead.update(visited)
+            dead.add(start)
+        return self.truncated_record(buffer)
+
+    def truncated_record(self, buffer):
+        """Finds the last complete record when the final one was cut short
+
+        This builds the chains of plausible headers backwards from the end
+        of the buffer and picks the longest one
+
+        Args:
+         buffer (bytes): the tail of the file
+
+        Returns:
+         int: offset of the last complete record (None if not found)
+        """
+        unpack_from = self.record_struct.unpack_from
+        size = PcapFormat.record_size
+        end = len(buffer)
+        chains = {}
+        best = (0, None)
+        for offset in range(end - size, -1, -1):
+            fields = unpack_from(buffer, offset)
+            if not self.plausible(*fields):
+                continue
+            following = offset + size + fields[2]
+            if following > end:
+                chains[offset] = (1, None)
+            elif following + size > end:
+                chains[offset] = (1, offset)
+            elif following in chains:
+                length, last = chains[following]
+                chains[offset] = (length + 1,
+                                  offset if last is None else last)
+            else:
+                continue
+            if chains[offset][1] is not None and chains[offset][0] > best[0]:
+                best = chains[offset]
+        length, last = best
+        return last if length > 1 else None
+
+    def tail_timestamp(self, stream):
+        """Finds the timestamp of the last record
+
+        Args:
+         stream: binary file-object just after the global header
+
+        Returns:
+         int: epoch nanoseconds of the last record
+        """
+        size = os.fstat(stream.fileno()).st_size
+        limit = 2 * (max(self.header.snaplen, PcapFormat.max_snaplen)
+                     + PcapFormat.record_size)
+        window = PcapFormat.tail_window
+        while size - window > PcapFormat.header_size:
+            stream.seek(size - window)
+            tail = stream.read(window)
+            last = self.last_record(tail)
+            if last is not None:
+                seconds, fraction, _, _ = self.record_struct.unpack_from(
+                    tail, last)
+                return self.timestamp(seconds, fraction)
+            if window >= limit:
+                break
+            window *= 2
+        self.logger.debug("Walking the records of %s", self.path)
+        stream.seek(PcapFormat.header_size)
+        last = None
+        for _, _, last, _ in self.walk(stream):
+            pass
+        return self.first if last is None else last
+
+    def check_rep(self):
+        """Checks the path
+
+        Raises:
+         AssertionError: path isn't set
+        """
+        assert self.path is not None
+        return
+
+
+class PcapWriter(AlpacaBase):
+    """Writes packet records to a libpcap stream
+
+    Args:
+     stream: binary file-object to write to
+     header (GlobalHeader): the global header for the output
+    """
+    def __init__(self, stream, header, *args, **kwargs):
+        super(PcapWriter, self).__init__(*args, **kwargs)
+        self.stream = stream
+        self.header = header
+        self.record_struct = struct.Struct("{}IIII".format(header.byte_order))
+        self.packets = 0
+        self.bytes = 0
+        return
+
+    def write_header(self):
+        """Writes the global header"""
+        self.stream.write(self.header.raw)
+        self.bytes += len(self.header.raw)
+        return
+
+    def accepts(self, header):
+        """Checks if records from a file can be written without converting
+
+        Args:
+         header (GlobalHeader): the file's header
+
+        Returns:
+         bool: True if the record headers are already in this format (never
+           for a pcapng file, its records have no pcap headers)
+        """
+        return (header.raw is not None
+                and header.byte_order == self.header.byte_order
+                and header.nanoseconds == self.header.nanoseconds)
+
+    def convert(self, record):
+        """Re-packs a record header for this writer's format
+
+        Args:
+         record (Record): record from a file with a different format
+
+        Returns:
+         Record: the record with the header in this writer's format
+        """
+        seconds, nanoseconds = divmod(record.timestamp, 10**9)
+        fraction = (nanoseconds if self.header.nanoseconds
+                    else nanoseconds // 1000)
+        header = self.record_struct.pack(seconds, fraction, len(record.data),
+                                         record.original)
+        return record._replace(header=header)
+
+    def write(self, record):
+        """Writes a record (whose header must be in this writer's format)
+
+        The header and data can be ``memoryview`` slices of a memory-mapped
+        input, they're handed to the stream as they are, without copying
+
+        Args:
+         record (Record): the packet to write
+        """
+        self.stream.write(record.header)
+        self.stream.write(record.data)
+        self.packets += 1
+        self.bytes += len(record.header) + len(record.data)
+        return
+
+    def check_rep(self):
+        """Checks the stream
+
+        Raises:
+         AssertionError: there's no stream
+        """
+        assert self.stream is not None
+        return
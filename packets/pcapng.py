@@ -0,0 +1,665 @@
+"""Native reader and writer for pcapng capture files"""
+# python standard library
+from collections import namedtuple
+import os
+import struct
+
+# this project
+from .base import AlpacaBase
+from .errors import CaptureFormatError
+from .pcap import (
+    GlobalHeader,
+    Interface,
+    PcapFormat,
+    PcapReader,
+    Record,
+    )
+
+
+class PcapngFormat:
+    """Constants for the pcapng file format"""
+    section_header = 0x0a0d0d0a
+    interface_description = 0x00000001
+    packet = 0x00000002
+    simple_packet = 0x00000003
+    enhanced_packet = 0x00000006
+    byte_order_magic = 0x1a2b3c4d
+    version_major = 1
+    version_minor = 0
+    end_of_options = 0
+    if_name = 2
+    if_tsresol = 9
+    if_tsoffset = 14
+    nanoseconds = 9
+    microseconds = 6
+    block_size = 8
+    alignment = 4
+    min_block_size = 12
+    section_size = 28
+    max_block_size = 2**24
+    magic = b"\x0a\x0d\x0d\x0a"
+
+
+Block = namedtuple("Block", ["type", "body"])
+
+Clock = namedtuple("Clock", ["multiplier", "divisor", "offset"])
+
+Description = namedtuple("Description", ["interface", "clock"])
+
+
+def padding(length):
+    """The zero bytes that pad a field to a 32-bit boundary
+
+    Args:
+     length (int): bytes in the field
+
+    Returns:
+     bytes: the padding (possibly empty)
+    """
+    return bytes(-length % PcapngFormat.alignment)
+
+
+def option(code, value, byte_order="<"):
+    """Packs a block option
+
+    Args:
+     code (int): the option's code
+     value (bytes): the option's value
+     byte_order (str): struct byte-order character
+
+    Returns:
+     bytes: the option with its padding
+    """
+    return (struct.pack(byte_order + "HH", code, len(value)) + value
+            + padding(len(value)))
+
+
+def clock(resolution=PcapngFormat.microseconds, offset=0):
+    """Builds the conversion from an interface's time-stamps to nanoseconds
+
+    Args:
+     resolution (int): the if_tsresol value (a negative power of 10, or of 2
+       if the high bit is set)
+     offset (int): the if_tsoffset seconds added to every time-stamp
+
+    Returns:
+     Clock: time-stamp * multiplier // divisor + offset is epoch nanoseconds
+    """
+    if resolution & 0x80:
+        rate = 2**(resolution & 0x7f)
+    else:
+        rate = 10**resolution
+    if 10**9 % rate == 0:
+        return Clock(10**9 // rate, 1, offset * 10**9)
+    return Clock(10**9, rate, offset * 10**9)
+
+
+def options(body, byte_order="<"):
+    """Generates the options at the end of a block
+
+    Args:
+     body (bytes): the options (starting with the first one's code)
+     byte_order (str): struct byte-order character
+
+    Yields:
+     tuple: the code and value of each option
+    """
+    unpack_from = struct.Struct(byte_order + "HH").unpack_from
+    position = 0
+    while position + 4 <= len(body):
+        code, length = unpack_from(body, position)
+        if code == PcapngFormat.end_of_options:
+            return
+        position += 4
+        yield code, bytes(body[position:position + length])
+        position += length + len(padding(length))
+    return
+
+
+def byte_order(magic):
+    """Works out a section's byte order from its byte-order magic
+
+    Args:
+     magic (bytes): the four bytes after the section header's length
+
+    Returns:
+     str: struct byte-order character (None if it isn't the magic)
+    """
+    for order in "<>":
+        if (struct.unpack(order + "I", magic)[0]
+                == PcapngFormat.byte_order_magic):
+            return order
+    return None
+
+
+def blocks(stream):
+    """Generates the blocks of a pcapng stream
+
+    Args:
+     stream: binary file-object at the start of a section
+
+    Yields:
+     Block: the type and body (without the lengths) of each block
+    """
+    byte_order = "<"
+    section = struct.pack("<I", PcapngFormat.section_header)
+    while True:
+        head = stream.read(PcapngFormat.block_size)
+        if len(head) < PcapngFormat.block_size:
+            return
+        if head[:4] == section:
+            body = stream.read(4)
+            byte_order = ("<" if body == struct.pack(
+                "<I", PcapngFormat.byte_order_magic) else ">")
+            block_type = PcapngFormat.section_header
+            length, = struct.unpack(byte_order + "I", head[4:])
+            body += stream.read(length - 16)
+        else:
+            block_type, length = struct.unpack(byte_order + "II", head)
+            body = stream.read(length - 12)
+        trailer = stream.read(4)
+        if len(body) < length - 12 or len(trailer) < 4:
+            return
+        yield Block(block_type, body)
+    return
+
+
+class PcapngReader(PcapReader):
+    """Reads the packets of a pcapng file (e.g. what dumpcap writes)
+
+    The blocks are parsed as they are read: a section header sets the byte
+    order, each interface description adds an interface (with its own
+    link-type and time-stamp resolution and offset) and the enhanced, simple
+    and (obsolete) packet blocks become Records. Their timestamps are epoch
+    nanoseconds, their header is None (a pcap writer re-packs them) and
+    their interface is the interface's place in the file, counting across
+    sections. The other blocks (name resolution, statistics, ...) are
+    skipped. Simple packet blocks have no time-stamp of their own so they're
+    given the one of the packet before them.
+
+    The interfaces are the ones described before the first packet (where
+    dumpcap puts them), packets on an interface described after that are
+    counted when walking the file but left out of its records.
+
+    Args:
+     path (str): path to the capture file
+
+    Raises:
+     CaptureFormatError: (when read) the file isn't a pcapng file
+    """
+    def __init__(self, path, *args, **kwargs):
+        super(PcapngReader, self).__init__(path, *args, **kwargs)
+        self._descriptions = None
+        self._base = 0
+        self._structs = {order: (struct.Struct(order + "II"),
+                                 struct.Struct(order + "IIIII"),
+                                 struct.Struct(order + "HHIIII"),
+                                 struct.Struct(order + "I"))
+                         for order in "<>"}
+        return
+
+    @property
+    def data_offset(self):
+        """Offset to walk the file from (its blocks are all read again)"""
+        return 0
+
+    @property
+    def descriptions(self):
+        """The Descriptions of the interfaces before the first packet"""
+        if self._descriptions is None:
+            self.header
+        return self._descriptions
+
+    @property
+    def interfaces(self):
+        """The Interfaces described before the first packet"""
+        return [description.interface for description in self.descriptions]
+
+    def describe(self, body, order):
+        """Parses an interface description block
+
+        Args:
+         body (bytes): the block (without its type and lengths)
+         order (str): the section's struct byte-order character
+
+        Returns:
+         Description: the interface and its clock
+        """
+        linktype, _, snaplen = struct.unpack_from(order + "HHI", body)
+        name, resolution, offset = None, PcapngFormat.microseconds, 0
+        for code, value in options(body[8:], order):
+            if code == PcapngFormat.if_name:
+                name = value.rstrip(b"\0").decode("utf-8", "replace")
+            elif code == PcapngFormat.if_tsresol and value:
+                resolution = value[0]
+            elif code == PcapngFormat.if_tsoffset and len(value) == 8:
+                offset, = struct.unpack(order + "q", value)
+        return Description(Interface(name, linktype, snaplen),
+                           clock(resolution, offset))
+
+    def blocks(self, stream, offset=0):
+        """Generates the blocks from an offset
+
+        A truncated (or garbled) final block ends the blocks, it's probably
+        still being written
+
+        Args:
+         stream: binary file-object positioned at the offset
+         offset (int): the offset of a block (0 for the start of the file)
+
+        Yields:
+         tuple: the block's offset, the offset just past it, its type, its
+           body (without the type and lengths) and its section's byte order
+
+        Raises:
+         CaptureFormatError: the file doesn't start with a section header
+        """
+        order = None if offset == 0 else self.header.byte_order
+        size = PcapngFormat.block_size
+        while True:
+            head = self.read(stream, size)
+            if len(head) < size:
+                return
+            magic = b""
+            if head[:4] == PcapngFormat.magic:
+                magic = self.read(stream, 4)
+                order = byte_order(magic) if len(magic) == 4 else None
+                if order is None and offset == 0:
+                    raise CaptureFormatError(
+                        "Bad byte-order magic: {}".format(self.path))
+            elif order is None:
+                raise CaptureFormatError(
+                    "Not a pcapng file: {}".format(self.path))
+            if order is None:
+                return
+            block_type, length = self._structs[order][0].unpack(head)
+            if (length < PcapngFormat.min_block_size or length % 4
+                    or length > PcapngFormat.max_block_size):
+                if offset == 0:
+                    raise CaptureFormatError(
+                        "Bad block length {} in {}".format(length,
+                                                           self.path))
+                self.logger.debug("Stopped at a bad block in %s at %d",
+                                  self.path, offset)
+                return
+            rest = self.read(stream, length - size - len(magic))
+            if (len(rest) < length - size - len(magic)
+                    or self._structs[order][3].unpack_from(
+                        rest, len(rest) - 4)[0] != length):
+                return
+            body = magic + rest[:-4] if magic else rest[:-4]
+            yield offset, offset + length, block_type, body, order
+            offset += length
+        return
+
+    def read_header(self, stream):
+        """Reads the section header and the interface descriptions
+
+        The blocks are read up to the first packet
+
+        Args:
+         stream: binary file-object at the start of the capture
+
+        Returns:
+         GlobalHeader: a summary of the file for a pcap output (no raw
+           bytes, the first interface's link-type, the largest snaplen)
+
+        Raises:
+         CaptureFormatError: it isn't a pcapng file (or has no interfaces)
+        """
+        descriptions, base, section = [], 0, None
+        for _, _, block_type, body, order in self.blocks(stream):
+            if block_type == PcapngFormat.section_header:
+                base = len(descriptions)
+                if section is None:
+                    section = (order,) + struct.unpack_from(order + "HH",
+                                                            body, 4)
+            elif block_type == PcapngFormat.interface_description:
+                descriptions.append(self.describe(body, order))
+            elif block_type in (PcapngFormat.enhanced_packet,
+                                PcapngFormat.simple_packet,
+                                PcapngFormat.packet):
+                break
+        if section is None:
+            raise CaptureFormatError(
+                "Too short to be a pcapng file: {}".format(self.path))
+        order, major, minor = section
+        if major != PcapngFormat.version_major:
+            raise CaptureFormatError("Unsupported pcapng version {}.{}: "
+                                     "{}".format(major, minor, self.path))
+        if not descriptions:
+            raise CaptureFormatError(
+                "No interfaces described in {}".format(self.path))
+        self._descriptions, self._base = descriptions, base
+        self._header = GlobalHeader(
+            byte_order=order,
+            nanoseconds=any(
+                description.clock.divisor * 10**3
+                > description.clock.multiplier
+                for description in descriptions),
+            version_major=major,
+            version_minor=minor,
+            snaplen=max(description.interface.snaplen
+                        or PcapFormat.max_snaplen
+                        for description in descriptions),
+            linktype=descriptions[0].interface.linktype,
+            raw=None)
+        return self._header
+
+    def packets(self, stream, offset=0):
+        """Generates the packets from an offset
+
+        Args:
+         stream: binary file-object positioned at the offset
+         offset (int): the offset of a block (0 for the start of the file)
+
+        Yields:
+         tuple: the packet block's offset, the offset just past it and the
+           packet's Record
+        """
+        if offset:
+            descriptions, base = list(self.descriptions), self._base
+        else:
+            descriptions, base = [], 0
+        timestamp = None
+        for start, end, block_type, body, order in self.blocks(stream,
+                                                               offset):
+            _, enhanced, obsolete, single = self._structs[order]
+            if block_type == PcapngFormat.enhanced_packet:
+                (interface, high, low,
+                 included, original) = enhanced.unpack_from(body)
+                data = body[20:20 + included]
+            elif block_type == PcapngFormat.packet:
+                (interface, _, high, low,
+                 included, original) = obsolete.unpack_from(body)
+                data = body[20:20 + included]
+            elif block_type == PcapngFormat.simple_packet:
+                if timestamp is None or base >= len(descriptions):
+                    continue
+                original, = single.unpack_from(body)
+                included = min(original, len(body) - 4,
+                               descriptions[base].interface.snaplen
+                               or original)
+                data = body[4:4 + included]
+                yield start, end, Record(timestamp, original, None, data,
+                                         base)
+                continue
+            elif block_type == PcapngFormat.interface_description:
+                descriptions.append(self.describe(body, order))
+                continue
+            elif block_type == PcapngFormat.section_header:
+                base = len(descriptions)
+                continue
+            else:
+                continue
+            interface += base
+            if interface >= len(descriptions):
+                continue
+            multiplier, divisor, shift = descriptions[interface].clock
+            timestamp = ((high << 32 | low) * multiplier // divisor
+                         + shift)
+            yield start, end, Record(timestamp, original, None, data,
+                                     interface)
+        return
+
+    def records(self, offset=None, buffer_size=None):
+        """Generates the packet records in file order
+
+        The file is always read through a buffer (the blocks' bodies have
+        to be parsed anyway), a truncated final block is dropped
+
+        Args:
+         offset (int): offset of the block to start at (e.g. from an index)
+         buffer_size (int): bytes of the file to buffer (None for default)
+
+        Yields:
+         Record: timestamp (epoch nanoseconds), original length, no header,
+           the packet bytes and the interface's place in the file
+        """
+        known = len(self.descriptions)
+        skipped = 0
+        with self.open(-1 if buffer_size is None else buffer_size) as stream:
+            offset = offset or 0
+            stream.seek(offset)
+            for _, _, record in self.packets(stream, offset):
+                if record.interface >= known:
+                    skipped += 1
+                    continue
+                yield record
+        if skipped:
+            self.logger.warning("Left out %d packets on interfaces described "
+                                "after the first packet in %s", skipped,
+                                self.path)
+        return
+
+    def walk(self, stream):
+        """Generates packet positions and times from the blocks
+
+        Args:
+         stream: binary file-object positioned at the start of a block
+
+        Yields:
+         tuple: offset of the packet's block, offset just past it, epoch
+           nanoseconds and the packet's original length
+        """
+        for start, end, record in self.packets(stream, stream.tell()):
+            yield start, end, record.timestamp, record.original
+        return
+
+    def scan(self, offset=0, rollup=None):
+        """Walks the packets from an offset to the end of the file
+
+        Args:
+         offset (int): where to start (must be the start of a block)
+         rollup (Rollup): adds up each packet's time and length as it's walked
+
+        Returns:
+         tuple: packets walked, epoch nanoseconds of the last one (or None)
+           and the offset just past the last complete packet block
+        """
+        packets, last, end = 0, None, offset
+        with self.open() as stream:
+            stream.seek(offset)
+            for _, end, last, original in self.walk(stream):
+                packets += 1
+                if rollup is not None:
+                    rollup.add(last, original)
+        return packets, last, end
+
+    @property
+    def first(self):
+        """Epoch nanoseconds of the first packet (None if there are none)"""
+        if self._first is None:
+            with self.open() as stream:
+                for _, _, record in self.packets(stream):
+                    self._first = record.timestamp
+                    break
+        return self._first
+
+    @property
+    def last(self):
+        """Epoch nanoseconds of the last packet (None if there are none)
+
+        Every block ends with its length, so an uncompressed file's blocks
+        are stepped over backwards from its end to the last packet. The
+        packets are walked instead if the file is compressed or its end
+        isn't a whole block.
+        """
+        if self._last is None and self.first is not None:
+            if not self.compressed:
+                self._last = self.tail_timestamp()
+            if self._last is None:
+                self._last = self.scan()[1]
+        return self._last
+
+    def tail_timestamp(self):
+        """Finds the last packet's timestamp by reading the blocks backwards
+
+        The last packet is taken to be in the last section that was read
+        for the header (as it is in dumpcap's files)
+
+        Returns:
+         int: epoch nanoseconds (None if it wasn't found)
+        """
+        descriptions, base = self.descriptions, self._base
+        head, enhanced, obsolete, trailer = self._structs[
+            self.header.byte_order]
+        with open(self.path, "rb") as stream:
+            end = os.fstat(stream.fileno()).st_size
+            while end >= PcapngFormat.section_size:
+                stream.seek(end - 4)
+                length, = trailer.unpack(stream.read(4))
+                if (length < PcapngFormat.min_block_size or length % 4
+                        or length > end):
+                    return None
+                stream.seek(end - length)
+                block = stream.read(min(length, 32))
+                block_type, leading = head.unpack_from(block)
+                if leading != length or block_type in (
+                        PcapngFormat.section_header,
+                        PcapngFormat.interface_description,
+                        PcapngFormat.simple_packet):
+                    return None
+                if block_type == PcapngFormat.enhanced_packet:
+                    interface, high, low, _, _ = enhanced.unpack_from(block, 8)
+                elif block_type == PcapngFormat.packet:
+                    interface, _, high, low, _, _ = obsolete.unpack_from(
+                        block, 8)
+                else:
+                    end -= length
+                    continue
+                interface += base
+                if interface >= len(descriptions):
+                    return None
+                multiplier, divisor, shift = descriptions[interface].clock
+                return (high << 32 | low) * multiplier // divisor + shift
+        return None
+
+
+def capture_reader(path):
+    """Picks the reader for a capture file from its magic number
+
+    Args:
+     path (str): path to the capture file (it can be gzipped)
+
+    Returns:
+     PcapReader: the reader (a PcapngReader for a pcapng file)
+    """
+    reader = PcapReader(path)
+    try:
+        with reader.open() as stream:
+            magic = reader.read(stream, 4)
+    except OSError:
+        return reader
+    if magic == PcapngFormat.magic:
+        return PcapngReader(path)
+    return reader
+
+
+class PcapngWriter(AlpacaBase):
+    """Writes packet records to a pcapng stream
+
+    Each interface gets a description block naming it, and every packet
+    refers to its interface, so the packets keep track of where they came
+    from (Wireshark shows it as the frame's interface). The interfaces can
+    have different link-types.
+
+    Args:
+     stream: binary file-object to write to
+     interfaces (list): the Interfaces (their place is their id)
+     nanoseconds (bool): write nanosecond (instead of microsecond) times
+    """
+    def __init__(self, stream, interfaces, nanoseconds=False,
+                 *args, **kwargs):
+        super(PcapngWriter, self).__init__(*args, **kwargs)
+        self.stream = stream
+        self.interfaces = interfaces
+        self.nanoseconds = nanoseconds
+        self.packet_struct = struct.Struct("<IIIIIII")
+        self.packets = 0
+        self.bytes = 0
+        return
+
+    def accepts(self, header):
+        """Checks if records from a pcap file can be written as they are
+
+        Args:
+         header (GlobalHeader): the pcap file's header
+
+        Returns:
+         bool: always True, the packet blocks are built from the timestamp
+        """
+        return True
+
+    def section(self):
+        """Builds the section header block
+
+        Returns:
+         bytes: the block
+        """
+        length = 28
+        return struct.pack("<IIIHHqI", PcapngFormat.section_header, length,
+                           PcapngFormat.byte_order_magic,
+                           PcapngFormat.version_major,
+                           PcapngFormat.version_minor, -1, length)
+
+    def description(self, interface):
+        """Builds an interface description block
+
+        Args:
+         interface (Interface): the interface to describe
+
+        Returns:
+         bytes: the block
+        """
+        options = b""
+        if interface.name:
+            options += option(PcapngFormat.if_name,
+                              interface.name.encode("utf-8"))
+        if self.nanoseconds:
+            options += option(PcapngFormat.if_tsresol,
+                              bytes([PcapngFormat.nanoseconds]))
+        options += option(PcapngFormat.end_of_options, b"")
+        length = 20 + len(options)
+        return (struct.pack("<IIHHI", PcapngFormat.interface_description,
+                            length, interface.linktype, 0, interface.snaplen)
+                + options + struct.pack("<I", length))
+
+    def write_header(self):
+        """Writes the section header and the interface descriptions"""
+        header = self.section() + b"".join(
+            self.description(interface) for interface in self.interfaces)
+        self.stream.write(header)
+        self.bytes += len(header)
+        return
+
+    def write(self, record):
+        """Writes a record as an enhanced packet block
+
+        Args:
+         record (Record): the packet (its interface is the block's interface)
+        """
+        timestamp = (record.timestamp if self.nanoseconds
+                     else record.timestamp // 1000)
+        included = len(record.data)
+        tail = padding(included)
+        length = 32 + included + len(tail)
+        self.stream.write(self.packet_struct.pack(
+            PcapngFormat.enhanced_packet, length, record.interface or 0,
+            timestamp >> 32, timestamp & 0xffffffff, included,
+            record.original))
+        self.stream.write(record.data)
+        self.stream.write(tail + struct.pack("<I", length))
+        self.packets += 1
+        self.bytes += length
+        return
+
+    def check_rep(self):
+        """Checks the stream
+
+        Raises:
+         AssertionError: there's no stream or no interfaces
+        """
+        assert self.stream is not None
+        assert self.interfaces
+        return
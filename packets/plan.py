@@ -0,0 +1,220 @@
+"""Estimates what getting the packets will cost without merging them"""
+# python standard library
+from collections import namedtuple
+from pathlib import Path
+import os
+import shutil
+
+# this project
+from .base import AlpacaBase
+from .errors import CaptureFormatError
+from .index import SeekIndex
+from .pcap import (
+    PcapFormat,
+    to_datetime,
+    )
+
+
+FilePlan = namedtuple("FilePlan", ["path", "size", "packets", "first", "last",
+                                   "window_bytes", "window_packets",
+                                   "read_bytes", "source"])
+
+
+def human(count):
+    """Formats a byte-count with a binary prefix
+
+    Args:
+     count (int): bytes (or None)
+
+    Returns:
+     str: e.g. '1.5 MiB' ('?' for None)
+    """
+    if count is None:
+        return "?"
+    if count < 1024:
+        return "{} B".format(count)
+    for unit in ("KiB", "MiB", "GiB", "TiB"):
+        count /= 1024
+        if count < 1024:
+            break
+    return "{:.1f} {}".format(count, unit)
+
+
+class Planner(AlpacaBase):
+    """Estimates the size of a merge and the reading it will take
+
+    No packets are read, the sizes, times and packet-counts come from the
+    catalog (if it's being used), the times a merge would use otherwise and
+    the seek-indices that are already built and current. The estimates
+    assume the packets are spread evenly over each file's time-span, except
+    where a seek-index shows where the window starts and stops.
+
+    Args:
+     captures (list): CaptureInfo objects for the files the merge would use
+     start (int): epoch nanoseconds of the earliest packet (None for all)
+     end (int): epoch nanoseconds of the latest packet (None for all)
+     entries (dict): catalog Entries keyed by path
+     index (bool): the merge will seek with the seek-indices
+     target (str): where the output would go (to check its free space)
+    """
+    def __init__(self, captures, start=None, end=None, entries=None,
+                 index=False, target=None, *args, **kwargs):
+        super(Planner, self).__init__(*args, **kwargs)
+        self.captures = captures
+        self.start = start
+        self.end = end
+        self.entries = entries or {}
+        self.index = index
+        self.target = target
+        self._plans = None
+        return
+
+    def fraction(self, first, last, start, end):
+        """The share of a capture's time-span within some times
+
+        Args:
+         first (int): epoch nanoseconds of the capture's first packet
+         last (int): epoch nanoseconds of the capture's last packet
+         start (int): start of the times (None for no start)
+         end (int): end of the times (None for no end)
+
+        Returns:
+         float: between 0 and 1 (1 if the times aren't known)
+        """
+        if first is None or last is None:
+            return 1.0
+        start = first if start is None else max(first, start)
+        end = last if end is None else min(last, end)
+        if end < start:
+            return 0.0
+        if last == first:
+            return 1.0
+        return (end - start) / (last - first)
+
+    def plan(self, capture):
+        """Estimates the merge's share of one capture
+
+        Args:
+         capture (CaptureInfo): the capture
+
+        Returns:
+         FilePlan: the capture's numbers and estimates
+        """
+        path = capture.path
+        size = os.path.getsize(path)
+        entry = self.entries.get(path)
+        if entry is not None:
+            first, last, packets, source = (entry.first, entry.last,
+                                            entry.packets, "catalog")
+            data = (entry.end or size) - PcapFormat.header_size
+        else:
+            first, last, packets, source = (capture.first, capture.last,
+                                            None, "probe")
+            data = size - PcapFormat.header_size
+        try:
+            compressed = capture.reader.compressed
+        except OSError:
+            compressed = False
+        window = self.fraction(first, last, self.start, self.end)
+        window_bytes = int(data * window)
+        read_bytes = int(size * self.fraction(first, last, None, self.end))
+        index = SeekIndex(path)
+        if capture.native and index.cached():
+            begin, stop = index.span(self.start, self.end)
+            window_bytes = min(window_bytes, stop - begin)
+            if self.index and not compressed:
+                read_bytes = stop - begin
+            source += "+index"
+        window_packets = (round(packets * window_bytes / data)
+                          if packets is not None and data > 0 else None)
+        return FilePlan(path=path, size=size, packets=packets, first=first,
+                        last=last, window_bytes=window_bytes,
+                        window_packets=window_packets,
+                        read_bytes=read_bytes, source=source)
+
+    @property
+    def plans(self):
+        """The estimates for each capture"""
+        if self._plans is None:
+            self._plans = []
+            for capture in self.captures:
+                try:
+                    self._plans.append(self.plan(capture))
+                except (OSError, CaptureFormatError) as error:
+                    self.logger.warning("Can't plan for %s: %s",
+                                        capture.path, error)
+        return self._plans
+
+    @property
+    def output_bytes(self):
+        """Estimated size of the (uncompressed) output"""
+        return PcapFormat.header_size + sum(plan.window_bytes
+                                            for plan in self.plans)
+
+    @property
+    def free_bytes(self):
+        """Free space where the output would go (None for stdout)"""
+        if self.target is None or self.target == "-":
+            return None
+        directory = Path(self.target).absolute().parent
+        while not directory.exists():
+            directory = directory.parent
+        return shutil.disk_usage(str(directory)).free
+
+    def report(self):
+        """Describes the plan
+
+        Returns:
+         str: a table of the files followed by the totals
+        """
+        row = "{:>10} {:>10} {:>12} {:>12} {:>10}  {:<14} {}"
+        lines = [row.format("size", "packets", "window", "window pkts",
+                            "reads", "from", "file")]
+        for plan in self.plans:
+            lines.append(row.format(
+                human(plan.size),
+                "?" if plan.packets is None else plan.packets,
+                "~" + human(plan.window_bytes),
+                "?" if plan.window_packets is None
+                else "~{}".format(plan.window_packets),
+                "~" + human(plan.read_bytes), plan.source, plan.path))
+        counted = [plan for plan in self.plans if plan.packets is not None]
+        lines.append("")
+        if counted:
+            packets = "{} packets{}".format(
+                sum(plan.packets for plan in counted),
+                "" if len(counted) == len(self.plans)
+                else " (in the {} counted files)".format(len(counted)))
+        else:
+            packets = "packets not counted"
+        lines.append("{} files, {} on disk, {}".format(
+            len(self.plans), human(sum(plan.size for plan in self.plans)),
+            packets))
+        if self.plans:
+            firsts = [plan.first for plan in self.plans
+                      if plan.first is not None]
+            lasts = [plan.last for plan in self.plans
+                     if plan.last is not None]
+            if firsts and lasts:
+                lines.append("packets from {} to {}".format(
+                    to_datetime(min(firsts)), to_datetime(max(lasts))))
+        lines.append("estimated output: ~{} ({} packets), ~{} to read".format(
+            human(self.output_bytes),
+            "~{}".format(sum(plan.window_packets for plan in counted))
+            if counted else "?",
+            human(sum(plan.read_bytes for plan in self.plans))))
+        free = self.free_bytes
+        if free is not None:
+            lines.append("{} free for {}{}".format(
+                human(free), self.target,
+                " - NOT ENOUGH FOR THE OUTPUT" if free < self.output_bytes
+                else ""))
+        return "\n".join(lines)
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        return
@@ -0,0 +1,170 @@
+"""Binary search over a tcpdump file-rotation"""
+# python standard library
+import os
+import re
+
+# this project
+from .base import AlpacaBase
+
+
+class RotationDefaults:
+    """Default values for the rotation"""
+    sequence = re.compile(r"(?P<sequence>\d*)(?P<compressed>\.gz)?$")
+
+
+class Rotation(AlpacaBase):
+    """A set of files written by tcpdump's ``-C`` (and ``-W``) rotation
+
+    tcpdump numbers the files in the order it writes them, wrapping back to
+    the first number when ``-W`` is used, so once the wrap is found the
+    files are in time order and the ones for a time-span can be found with
+    a binary search on the first packet of each file, probing O(log n)
+    files instead of all of them.
+
+    Args:
+     captures (iter): CaptureInfo objects for the rotation's files
+    """
+    def __init__(self, captures, *args, **kwargs):
+        super(Rotation, self).__init__(*args, **kwargs)
+        self.captures = captures
+        self._ordered = None
+        self._firsts = {}
+        return
+
+    @classmethod
+    def sequence(cls, path):
+        """Gets the rotation number from a file name
+
+        The first file of a rotation without ``-W`` has no number, so it's 0
+
+        Args:
+         path (str): path to the file
+
+        Returns:
+         int: the file's place in the rotation
+        """
+        match = RotationDefaults.sequence.search(os.path.basename(path))
+        return int(match.group("sequence") or 0)
+
+    @property
+    def by_sequence(self):
+        """The captures sorted by their rotation number
+
+        If a file is there both gzipped and not (gzip hasn't finished)
+        the uncompressed one is used
+        """
+        captures = {}
+        for capture in self.captures:
+            number = self.sequence(capture.path)
+            if (number not in captures
+                    or captures[number].path.endswith(".gz")):
+                captures[number] = capture
+        return [captures[number] for number in sorted(captures)]
+
+    def first(self, index):
+        """The first packet time of a capture (probed once)
+
+        Args:
+         index (int): index of the capture in ``ordered``
+
+        Returns:
+         int: epoch nanoseconds of the first packet or None if there are none
+        """
+        if index not in self._firsts:
+            self._firsts[index] = self._ordered[index].first
+        return self._firsts[index]
+
+    def later(self, index, other):
+        """Checks if a capture starts after another
+
+        Empty files (tcpdump has just opened them) count as the latest
+
+        Args:
+         index (int): index of the capture to check
+         other (int): index of the capture to compare to
+
+        Returns:
+         bool: True if the capture at ``index`` starts after ``other``
+        """
+        first, other = self.first(index), self.first(other)
+        if first is None:
+            return other is not None
+        return other is not None and first > other
+
+    def starts_after(self, index, timestamp):
+        """Checks if a capture's first packet is after a time
+
+        Args:
+         index (int): index of the capture
+         timestamp (int): epoch nanoseconds to compare to
+
+        Returns:
+         bool: True if the capture has no packets or starts after the time
+        """
+        first = self.first(index)
+        return first is None or first > timestamp
+
+    @property
+    def ordered(self):
+        """The captures in time order
+
+        The wrap-around is the oldest file, which is found with a binary
+        search for the smallest first-packet time
+        """
+        if self._ordered is None:
+            self._ordered = self.by_sequence
+            low, high = 0, len(self._ordered) - 1
+            while low < high:
+                middle = (low + high) // 2
+                if self.later(middle, high):
+                    low = middle + 1
+                else:
+                    high = middle
+            self._ordered = self._ordered[low:] + self._ordered[:low]
+            shift = len(self._ordered) - low
+            self._firsts = {(index + shift) % len(self._ordered): first
+                            for index, first in self._firsts.items()}
+        return self._ordered
+
+    def search(self, timestamp):
+        """Finds the last capture that starts at or before a time
+
+        Args:
+         timestamp (int): the time (epoch nanoseconds) to search for
+
+        Returns:
+         int: index of the capture (-1 if they all start after it)
+        """
+        low, high = 0, len(self.ordered)
+        while low < high:
+            middle = (low + high) // 2
+            if self.starts_after(middle, timestamp):
+                high = middle
+            else:
+                low = middle + 1
+        return low - 1
+
+    def between(self, start=None, end=None):
+        """Gets the captures that could have packets in the time-span
+
+        Args:
+         start (int): start of the span (None for the oldest)
+         end (int): end of the span (None for the newest)
+
+        Returns:
+         list: paths of the captures in time order
+        """
+        ordered = self.ordered
+        first = 0 if start is None else max(self.search(start), 0)
+        last = len(ordered) - 1 if end is None else self.search(end)
+        self.logger.debug("Probed %d of %d files in the rotation",
+                          len(self._firsts), len(ordered))
+        return [capture.path for capture in ordered[first:last + 1]]
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        return
@@ -0,0 +1,215 @@
+"""A long-running server that streams merged packets for time-windows"""
+# python standard library
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+    )
+from urllib.parse import (
+    parse_qs,
+    urlsplit,
+    )
+import os
+import socketserver
+import threading
+
+# this project
+from .base import AlpacaBase
+from .catalog import Catalog
+from .defaults import (
+    GetDefaults,
+    ServeDefaults,
+    )
+from .errors import (
+    CaptureFormatError,
+    ConfigurationError,
+    )
+from .get import FileFilterer
+from .merge import MergeEngine
+from .timestamps import parse_user_timestamp
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    """An HTTP server on a Unix socket (one thread per client)"""
+    daemon_threads = True
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Answers ``GET /packets?start=...&end=...&glob=...``
+
+    The merged pcap is streamed back as it's merged, the start and end
+    take the same times as ``packets get``
+    """
+    server_version = "packets"
+    wbufsize = ServeDefaults.buffer_size
+
+    def address_string(self):
+        """The client's address (Unix socket clients don't have one)"""
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format, *args):
+        """Logs the requests with the server's logger"""
+        self.server.packets.logger.info("%s %s", self.address_string(),
+                                        format % args)
+        return
+
+    def do_GET(self):
+        """Streams the packets for a query"""
+        url = urlsplit(self.path)
+        if url.path != ServeDefaults.path:
+            self.send_error(404, "Query {} for packets".format(
+                ServeDefaults.path))
+            return
+        packets = self.server.packets
+        try:
+            start, end, glob = packets.parse(parse_qs(url.query))
+            files = packets.files(start, end, glob)
+        except ConfigurationError as error:
+            self.send_error(400, str(error))
+            return
+        if not files:
+            self.send_error(404, "No packet files in the time-window")
+            return
+        engine = MergeEngine(files, start=start, end=end, index=packets.index)
+        try:
+            engine.header
+        except CaptureFormatError as error:
+            self.send_error(415, str(error))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ServeDefaults.content_type)
+        self.end_headers()
+        try:
+            writer = engine(self.wfile)
+        except (BrokenPipeError, ConnectionResetError) as error:
+            packets.logger.info("Client went away: %s", error)
+            return
+        packets.logger.debug("Sent %d packets (%d bytes) from %d files",
+                             writer.packets, writer.bytes, len(files))
+        return
+
+
+class PacketServer(AlpacaBase):
+    """Serves merged packets from a directory until it's stopped
+
+    The process (and its imports) stay up between queries, and so does the
+    catalog's connection, so a query only pays for probing the files that
+    changed since the last one (nothing at all while the catalog is being
+    watched) and for the merge itself. Each client gets its own thread, the
+    catalog look-ups take turns but the merges run at the same time.
+
+    Args:
+     source (str): the directory with the captures
+     socket (str): path for a Unix socket (None to listen on localhost)
+     port (int): localhost port (when there's no socket)
+     catalog (bool): look the times up in the directory's catalog
+     workers (int): files to probe at the same time
+     index (bool): seek into the files with their seek-indices
+    """
+    def __init__(self, source, socket=None, port=ServeDefaults.port,
+                 catalog=GetDefaults.catalog, workers=GetDefaults.workers,
+                 index=GetDefaults.index, *args, **kwargs):
+        super(PacketServer, self).__init__(*args, **kwargs)
+        self.source = source
+        self.socket = socket
+        self.port = port
+        self.use_catalog = catalog
+        self.workers = workers
+        self.index = index
+        self.lock = threading.Lock()
+        self._catalog = None
+        self._server = None
+        return
+
+    @property
+    def catalog(self):
+        """The directory's catalog (shared by the client threads)"""
+        if self._catalog is None and self.use_catalog:
+            self._catalog = Catalog(self.source, workers=self.workers,
+                                    shared=True)
+        return self._catalog
+
+    @property
+    def server(self):
+        """The HTTP server (bound when first used)"""
+        if self._server is None:
+            if self.socket is not None:
+                if os.path.exists(self.socket):
+                    os.remove(self.socket)
+                self._server = UnixHTTPServer(self.socket, QueryHandler)
+            else:
+                self._server = ThreadingHTTPServer(
+                    (ServeDefaults.host, self.port), QueryHandler)
+            self._server.packets = self
+        return self._server
+
+    def parse(self, query):
+        """Gets the time-window and glob from a query
+
+        Args:
+         query (dict): lists of values keyed by name (from parse_qs)
+
+        Returns:
+         tuple: start and end (epoch nanoseconds) and the file-glob
+
+        Raises:
+         ConfigurationError: a time can't be parsed or the glob leaves the
+           directory
+        """
+        times = []
+        for key, default in (("start", GetDefaults.start),
+                             ("end", GetDefaults.end)):
+            text = query.get(key, [default])[-1]
+            timestamp = parse_user_timestamp(text)
+            if timestamp is None:
+                raise ConfigurationError(
+                    "Un-parseable {} time: {}".format(key, text))
+            times.append(timestamp)
+        glob = query.get("glob", [GetDefaults.glob])[-1]
+        if "/" in glob or ".." in glob:
+            raise ConfigurationError(
+                "The glob can't leave the source directory: {}".format(glob))
+        return times[0], times[1], glob
+
+    def files(self, start, end, glob):
+        """Gets the files with packets in the time-window
+
+        Args:
+         start (int): epoch nanoseconds of the earliest packet
+         end (int): epoch nanoseconds of the latest packet
+         glob (str): file-glob for the captures
+
+        Returns:
+         list: paths of the files to merge
+        """
+        with self.lock:
+            return FileFilterer(self.source, glob, start, end,
+                                catalog=self.catalog,
+                                workers=self.workers).file_names
+
+    def shutdown(self):
+        """Stops serving (call it from another thread)"""
+        self.server.shutdown()
+        return
+
+    def __call__(self):
+        """Serves until shutdown is called (or the process is interrupted)"""
+        self.logger.info("Serving %s on %s", self.source,
+                         self.socket or "{}:{}".format(
+                             *self.server.server_address))
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if self.socket is not None and os.path.exists(self.socket):
+                os.remove(self.socket)
+            if self._catalog is not None:
+                self._catalog.close()
+        return
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        return
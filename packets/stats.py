@@ -0,0 +1,364 @@
+"""Statistics for the packets in a time-window (read from the record headers)"""
+# python standard library
+from collections import namedtuple
+from itertools import islice
+import math
+import struct
+
+# from pypi
+import numpy
+
+# this project
+from .base import AlpacaBase
+from .defaults import StatsDefaults
+from .errors import CaptureFormatError
+from .index import SeekIndex
+from .pcap import (
+    PcapFormat,
+    to_datetime,
+    )
+from .pcapng import (
+    PcapngReader,
+    capture_reader,
+    )
+from .plan import human
+
+
+Gap = namedtuple("Gap", ["start", "end"])
+
+Summary = namedtuple("Summary", ["files", "packets", "bytes", "captured",
+                                 "first", "last", "sizes", "histogram",
+                                 "rates", "gaps"])
+
+
+def bits(count):
+    """Formats a bit-rate with a decimal prefix
+
+    Args:
+     count (float): bits
+
+    Returns:
+     str: e.g. '1.5 Mbit'
+    """
+    for unit in ("bit", "kbit", "Mbit", "Gbit"):
+        if count < 1000:
+            break
+        count /= 1000
+    return "{:.1f} {}".format(count, unit)
+
+
+class CaptureStats(AlpacaBase):
+    """Works out the rates, sizes and gaps of the packets in a window
+
+    Only the record headers are read (nothing is written). Each file is
+    read in large chunks, the records are found by walking their lengths
+    and then all the headers in a chunk are unpacked into NumPy arrays at
+    once, so everything after the walk is done with array operations (a
+    pcapng file's blocks are parsed by its reader and its packets are put
+    into the arrays in batches instead):
+
+     - the sizes are counted into one bin per byte (so the percentiles are
+       exact without keeping every packet)
+     - the packets and bytes are summed per second, for the rates
+     - each file's runs of packets (no more than ``gap`` apart) are kept
+       and the gaps are the spaces left between all the files' runs
+
+    Args:
+     files (list): paths of the capture files
+     start (int): epoch nanoseconds of the earliest packet (None for all)
+     end (int): epoch nanoseconds of the latest packet (None for all)
+     gap (float): seconds without packets that count as a gap
+     index (bool): seek to the start with the files' seek-indices
+     chunk_size (int): bytes of a file to read at a time
+    """
+    def __init__(self, files, start=None, end=None, gap=StatsDefaults.gap,
+                 index=False, chunk_size=StatsDefaults.chunk_size,
+                 *args, **kwargs):
+        super(CaptureStats, self).__init__(*args, **kwargs)
+        self.files = files
+        self.start = start
+        self.end = end
+        self.gap = gap
+        self.index = index
+        self.chunk_size = chunk_size
+        self._summary = None
+        return
+
+    def offset(self, reader):
+        """Where to start reading a file
+
+        Args:
+         reader (PcapReader): reader for the file
+
+        Returns:
+         int: offset from the file's seek-index (None to read it all)
+        """
+        if not self.index or self.start is None:
+            return None
+        if reader.first is not None and reader.first >= self.start:
+            return None
+        return SeekIndex(reader.path).seek(self.start)
+
+    def headers(self, reader):
+        """Generates a file's record headers a chunk at a time
+
+        A truncated final record is left out
+
+        Args:
+         reader (PcapReader): reader for the file
+
+        Yields:
+         numpy.ndarray: structured array of the headers in a chunk
+        """
+        byte_order = reader.header.byte_order
+        dtype = numpy.dtype([("seconds", byte_order + "u4"),
+                             ("fraction", byte_order + "u4"),
+                             ("included", byte_order + "u4"),
+                             ("original", byte_order + "u4")])
+        size = PcapFormat.record_size
+        fields = numpy.arange(size)
+        included_from = struct.Struct(byte_order + "I").unpack_from
+        with reader.open() as stream:
+            reader.read_header(stream)
+            offset = self.offset(reader)
+            if offset is not None:
+                stream.seek(offset)
+            buffer, position = b"", 0
+            while True:
+                chunk = reader.read(stream, self.chunk_size)
+                if not chunk:
+                    return
+                buffer = buffer[position:] + chunk
+                positions, position = [], 0
+                last = len(buffer) - size
+                while position <= last:
+                    following = (position + size
+                                 + included_from(buffer, position + 8)[0])
+                    if following > len(buffer):
+                        break
+                    positions.append(position)
+                    position = following
+                if positions:
+                    raw = numpy.frombuffer(buffer, numpy.uint8)
+                    picked = raw[numpy.array(positions)[:, None] + fields]
+                    yield picked.view(dtype).reshape(-1)
+        return
+
+    def columns(self, reader):
+        """Generates the timestamps and lengths of a file's packets
+
+        Args:
+         reader (PcapReader): reader for the file
+
+        Yields:
+         tuple: arrays of the timestamps (epoch nanoseconds), captured
+           lengths and original lengths of a chunk's (or batch's) packets
+        """
+        if isinstance(reader, PcapngReader):
+            records = reader.records(self.offset(reader))
+            while True:
+                batch = list(islice(records, StatsDefaults.records))
+                if not batch:
+                    return
+                yield (numpy.array([record.timestamp for record in batch],
+                                   dtype=numpy.int64),
+                       numpy.array([len(record.data) for record in batch],
+                                   dtype=numpy.int64),
+                       numpy.array([record.original for record in batch],
+                                   dtype=numpy.int64))
+        scale = 1 if reader.header.nanoseconds else 1000
+        for headers in self.headers(reader):
+            yield ((headers["seconds"].astype(numpy.int64) * 10**9
+                    + headers["fraction"].astype(numpy.int64) * scale),
+                   headers["included"].astype(numpy.int64),
+                   headers["original"].astype(numpy.int64))
+        return
+
+    def batches(self, reader):
+        """Generates the timestamps and lengths of a file's packets
+
+        Args:
+         reader (PcapReader): reader for the file
+
+        Yields:
+         tuple: arrays of the timestamps (epoch nanoseconds), captured
+           lengths and original lengths of the packets in the window
+        """
+        for timestamps, included, original in self.columns(reader):
+            keep = numpy.ones(len(timestamps), dtype=bool)
+            if self.start is not None:
+                keep &= timestamps >= self.start
+            past = (numpy.flatnonzero(timestamps > self.end)
+                    if self.end is not None else ())
+            if len(past):
+                keep[past[0]:] = False
+            yield timestamps[keep], included[keep], original[keep]
+            if len(past):
+                return
+        return
+
+    def percentile(self, cumulative, percent):
+        """Finds a percentile in cumulative counts
+
+        Args:
+         cumulative (numpy.ndarray): cumulative counts per value
+         percent (float): the percentile (0 to 100)
+
+        Returns:
+         int: the smallest value with at least percent of the counts
+        """
+        rank = max(1, math.ceil(percent / 100 * cumulative[-1]))
+        return int(numpy.searchsorted(cumulative, rank))
+
+    def gaps(self, starts, ends):
+        """Finds the gaps between the runs of packets
+
+        Args:
+         starts (numpy.ndarray): first timestamps of the runs
+         ends (numpy.ndarray): last timestamps of the runs
+
+        Returns:
+         list: the Gaps longer than ``gap`` seconds
+        """
+        order = numpy.argsort(starts, kind="stable")
+        starts = starts[order]
+        reached = numpy.maximum.accumulate(ends[order])
+        found = numpy.flatnonzero(starts[1:] - reached[:-1]
+                                  > self.gap * 10**9)
+        return [Gap(int(reached[index]), int(starts[index + 1]))
+                for index in found]
+
+    @property
+    def summary(self):
+        """The statistics (worked out in one pass when first used)"""
+        if self._summary is None:
+            self._summary = self.summarize()
+        return self._summary
+
+    def summarize(self):
+        """Reads the files and works out the statistics
+
+        Returns:
+         Summary: the counts, percentiles, histogram, rates and gaps
+        """
+        largest = PcapFormat.max_snaplen
+        sizes = numpy.zeros(largest + 1, dtype=numpy.int64)
+        seconds, per_second, bytes_per_second = [], [], []
+        starts, ends = [], []
+        packets = total = captured = files = 0
+        gap = self.gap * 10**9
+        for path in self.files:
+            try:
+                reader = capture_reader(path)
+                reader.header
+            except (OSError, CaptureFormatError) as error:
+                self.logger.warning("Skipping %s: %s", path, error)
+                continue
+            files += 1
+            for timestamps, included, original in self.batches(reader):
+                if not len(timestamps):
+                    continue
+                packets += len(timestamps)
+                total += int(original.sum())
+                captured += int(included.sum())
+                sizes += numpy.bincount(numpy.minimum(original, largest),
+                                        minlength=largest + 1)
+                second, inverse = numpy.unique(timestamps // 10**9,
+                                               return_inverse=True)
+                seconds.append(second)
+                per_second.append(numpy.bincount(inverse))
+                bytes_per_second.append(numpy.bincount(inverse,
+                                                       weights=original))
+                breaks = numpy.flatnonzero(numpy.diff(timestamps) > gap)
+                starts.append(timestamps[numpy.concatenate(([0],
+                                                            breaks + 1))])
+                ends.append(timestamps[numpy.append(breaks, -1)])
+        if not packets:
+            return Summary(files=files, packets=0, bytes=0, captured=0,
+                           first=None, last=None, sizes={}, histogram=[],
+                           rates={}, gaps=[])
+        starts, ends = numpy.concatenate(starts), numpy.concatenate(ends)
+        cumulative = numpy.cumsum(sizes)
+        percentiles = {percent: self.percentile(cumulative, percent)
+                       for percent in StatsDefaults.percentiles}
+        edges = StatsDefaults.size_bins
+        counts = numpy.add.reduceat(sizes, edges)
+        labels = ["{}-{}".format(low, high - 1)
+                  for low, high in zip(edges, edges[1:])]
+        labels.append("{}+".format(edges[-1]))
+        seconds = numpy.concatenate(seconds)
+        base = int(seconds.min())
+        span = int(seconds.max()) - base + 1
+        dense = numpy.bincount(seconds - base,
+                               weights=numpy.concatenate(per_second),
+                               minlength=span)
+        dense_bytes = numpy.bincount(seconds - base,
+                                     weights=numpy.concatenate(
+                                         bytes_per_second),
+                                     minlength=span)
+        first, last = int(starts.min()), int(ends.max())
+        duration = max(last - first, 1) / 10**9
+        rates = dict(
+            packets=packets / duration,
+            bits=total * 8 / duration,
+            peak_packets=int(dense.max()),
+            peak_bits=int(dense_bytes.max()) * 8,
+            percentiles={percent: float(numpy.percentile(dense, percent))
+                         for percent in StatsDefaults.percentiles})
+        return Summary(files=files, packets=packets, bytes=total,
+                       captured=captured, first=first, last=last,
+                       sizes=percentiles,
+                       histogram=list(zip(labels, counts.tolist())),
+                       rates=rates, gaps=self.gaps(starts, ends))
+
+    def report(self):
+        """Describes the statistics
+
+        Returns:
+         str: the totals, rates, sizes and gaps
+        """
+        summary = self.summary
+        lines = ["{} packets ({}, {} captured) in {} files".format(
+            summary.packets, human(summary.bytes), human(summary.captured),
+            summary.files)]
+        if not summary.packets:
+            return "\n".join(lines)
+        lines.append("from {} to {}".format(to_datetime(summary.first),
+                                            to_datetime(summary.last)))
+        rates = summary.rates
+        lines.append("")
+        lines.append("rates: {:.1f} packets/s ({}/s), peak {} packets/s "
+                     "({}/s)".format(rates["packets"],
+                                     bits(rates["bits"]),
+                                     rates["peak_packets"],
+                                     bits(rates["peak_bits"])))
+        lines.append("packets per second: " + ", ".join(
+            "p{:g} {:g}".format(percent, value)
+            for percent, value in rates["percentiles"].items()))
+        lines.append("")
+        lines.append("packet sizes: " + ", ".join(
+            "p{:g} {}".format(percent, value)
+            for percent, value in summary.sizes.items()))
+        width = max(count for _, count in summary.histogram) or 1
+        for label, count in summary.histogram:
+            lines.append("{:>10} {:>10} {}".format(
+                label, count, "#" * round(40 * count / width)))
+        lines.append("")
+        lines.append("{} gaps longer than {:g} seconds".format(
+            len(summary.gaps), self.gap))
+        for gap in summary.gaps:
+            lines.append("  {} to {} ({:.3f} seconds)".format(
+                to_datetime(gap.start), to_datetime(gap.end),
+                (gap.end - gap.start) / 10**9))
+        return "\n".join(lines)
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.gap > 0
+        assert self.chunk_size >= PcapFormat.record_size
+        return
+
@@ -0,0 +1,104 @@
+"""How busy the captures were over time (from the catalog's rollups)"""
+# this project
+from .base import AlpacaBase
+from .catalog import (
+    Catalog,
+    CatalogDefaults,
+    )
+from .defaults import (
+    GetDefaults,
+    TimelineDefaults,
+    )
+from .errors import ConfigurationError
+from .get import FileFilterer
+from .pcap import to_datetime
+from .plan import human
+from .timestamps import parse_user_timestamp
+
+
+class Timeline(AlpacaBase):
+    """Counts the packets in a directory per bucket of minutes
+
+    The counts come from the per-minute rollups the catalog keeps, so only
+    the captures that changed since the catalog was last updated are read
+
+    Args:
+     source (str): the directory with the captures
+     glob (str): file-glob for the captures
+     start (str): date/time of the earliest minute
+     end (str): date/time of the latest minute
+     minutes (int): minutes per bucket
+     workers (int): files to probe at the same time
+
+    Raises:
+     ConfigurationError: a time can't be parsed
+    """
+    def __init__(self, source, glob=GetDefaults.glob, start=GetDefaults.start,
+                 end=GetDefaults.end, minutes=TimelineDefaults.minutes,
+                 workers=GetDefaults.workers, *args, **kwargs):
+        super(Timeline, self).__init__(*args, **kwargs)
+        self.source = source
+        self.glob = glob
+        self.start = self.parse("start", start)
+        self.end = self.parse("end", end)
+        self.minutes = minutes
+        self.workers = workers
+        self._buckets = None
+        return
+
+    def parse(self, name, timestamp):
+        """Converts a user's time to epoch nanoseconds
+
+        Args:
+         name (str): which time it is (for the error)
+         timestamp (str): the time
+
+        Returns:
+         int: epoch nanoseconds
+
+        Raises:
+         ConfigurationError: the time can't be parsed
+        """
+        parsed = parse_user_timestamp(timestamp)
+        if parsed is None:
+            message = "Un-parseable {} time: {}".format(name, timestamp)
+            self.logger.error(message)
+            raise ConfigurationError(message)
+        return parsed
+
+    @property
+    def buckets(self):
+        """The catalog's Buckets for the times"""
+        if self._buckets is None:
+            catalog = Catalog(self.source, workers=self.workers)
+            try:
+                self._buckets = catalog.timeline(
+                    FileFilterer(self.source, self.glob).all_files,
+                    self.start, self.end,
+                    self.minutes * CatalogDefaults.minute)
+            finally:
+                catalog.close()
+        return self._buckets
+
+    def report(self):
+        """Describes the timeline
+
+        Returns:
+         str: a row for each bucket with packets
+        """
+        row = "{:<26} {:>12} {:>12} {:>12}"
+        lines = [row.format("from", "packets", "bytes", "peak pkts/s")]
+        for bucket in self.buckets:
+            lines.append(row.format(str(to_datetime(bucket.start)),
+                                    bucket.packets, human(bucket.bytes),
+                                    bucket.peak))
+        return "\n".join(lines)
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.minutes > 0
+        return
@@ -0,0 +1,187 @@
+"""Fast parsing of timestamps into epoch nanoseconds"""
+# python standard library
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+    )
+import re
+
+# this project
+from .pcap import to_nanoseconds
+
+
+class TimestampFormat:
+    """The formats that can be parsed without dateparser"""
+    iso = re.compile(
+        r"(?P<year>\d{4})"
+        r"(?:-(?P<month>\d{2})"
+        r"(?:-(?P<day>\d{2})"
+        r"(?:[T ](?P<hour>\d{2}):(?P<minute>\d{2})"
+        r"(?::(?P<second>\d{2})(?:[.,](?P<fraction>\d{1,9}))?)?"
+        r"\s*(?P<zone>Z|[+-]\d{2}:?\d{2})?)?)?)?")
+    capinfos = re.compile(
+        r"(?P<month>[A-Z][a-z]{2}) +(?P<day>\d{1,2}), (?P<year>\d{4}) "
+        r"(?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2})"
+        r"(?:\.(?P<fraction>\d{1,9}))?(?: [A-Z]{2,5})?")
+    ctime = re.compile(
+        r"[A-Z][a-z]{2} (?P<month>[A-Z][a-z]{2}) +(?P<day>\d{1,2}) "
+        r"(?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2})"
+        r"(?:\.(?P<fraction>\d{1,9}))? (?P<year>\d{4})")
+    epoch = re.compile(r"(?P<seconds>\d+)(?:\.(?P<fraction>\d{1,9}))?")
+    months = {name: number for number, name in enumerate(
+        "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split(), start=1)}
+    missing = "n/a"
+
+
+def nanoseconds(fraction):
+    """Converts the digits after the decimal point to nanoseconds
+
+    Args:
+     fraction (str): up to nine digits (or None)
+
+    Returns:
+     int: nanoseconds
+    """
+    return int(fraction.ljust(9, "0")) if fraction else 0
+
+
+def zone(offset):
+    """Converts an ISO-8601 zone designator to a timezone
+
+    Args:
+     offset (str): 'Z', '+hh:mm', '-hhmm' or None
+
+    Returns:
+     timezone: the zone (None for local time)
+    """
+    if offset is None:
+        return None
+    if offset == "Z":
+        return timezone.utc
+    sign = -1 if offset[0] == "-" else 1
+    digits = offset[1:].replace(":", "")
+    return timezone(sign * timedelta(hours=int(digits[:2]),
+                                     minutes=int(digits[2:])))
+
+
+def from_fields(fields, month=None):
+    """Builds epoch nanoseconds from a regular expression's groups
+
+    Args:
+     fields (dict): the named groups of a match
+     month (int): the month (if the groups have it as a name)
+
+    Returns:
+     int: nanoseconds since the epoch (naive times are local, None if the
+       fields aren't a real date)
+    """
+    try:
+        moment = datetime(int(fields["year"]),
+                          month or int(fields["month"] or 1),
+                          int(fields["day"] or 1),
+                          int(fields["hour"] or 0),
+                          int(fields["minute"] or 0),
+                          int(fields["second"] or 0),
+                          tzinfo=zone(fields.get("zone")))
+    except ValueError:
+        return None
+    return (int(moment.timestamp()) * 10**9
+            + nanoseconds(fields["fraction"]))
+
+
+def parse_iso(text):
+    """Parses an ISO-8601 date (or date and time)
+
+    A lone four-digit number is a year (so '9999' is the far future)
+
+    Args:
+     text (str): the timestamp
+
+    Returns:
+     int: epoch nanoseconds (None if it isn't ISO-8601)
+    """
+    match = TimestampFormat.iso.fullmatch(text)
+    return from_fields(match.groupdict()) if match else None
+
+
+def parse_capinfos(text):
+    """Parses the times that capinfos prints
+
+    Besides ISO-8601, capinfos uses 'Jun 16, 2018 16:32:42.322949000' or
+    (older versions) 'Sat Jun 16 16:32:42 2018'
+
+    Args:
+     text (str): the timestamp
+
+    Returns:
+     int: epoch nanoseconds (None if it isn't a capinfos time)
+    """
+    for expression in (TimestampFormat.capinfos, TimestampFormat.ctime):
+        match = expression.fullmatch(text)
+        if match and match.group("month") in TimestampFormat.months:
+            return from_fields(match.groupdict(),
+                               TimestampFormat.months[match.group("month")])
+    return parse_iso(text)
+
+
+def parse_epoch(text):
+    """Parses seconds since the epoch (with an optional fraction)
+
+    Args:
+     text (str): the timestamp
+
+    Returns:
+     int: epoch nanoseconds (None if it isn't a number)
+    """
+    match = TimestampFormat.epoch.fullmatch(text)
+    if match is None:
+        return None
+    return (int(match.group("seconds")) * 10**9
+            + nanoseconds(match.group("fraction")))
+
+
+def parse_timestamp(text):
+    """Parses a timestamp in one of the strict formats
+
+    Args:
+     text (str): capinfos output, ISO-8601 or epoch seconds
+
+    Returns:
+     int: epoch nanoseconds (None if it isn't in a known format)
+
+    Raises:
+     TypeError: the timestamp isn't a string
+    """
+    if not isinstance(text, str):
+        raise TypeError("Timestamp isn't a string: {!r}".format(text))
+    text = text.strip()
+    for parse in (parse_capinfos, parse_epoch):
+        timestamp = parse(text)
+        if timestamp is not None:
+            return timestamp
+    return None
+
+
+def parse_user_timestamp(text):
+    """Parses a timestamp given by the user
+
+    The strict formats are tried first and dateparser (which is slow to
+    import and slow to run) is only used for free-form times like
+    'yesterday'
+
+    Args:
+     text (str): the timestamp from the command line
+
+    Returns:
+     int: epoch nanoseconds (None if it can't be parsed)
+
+    Raises:
+     TypeError: the timestamp isn't a string
+    """
+    timestamp = parse_timestamp(text)
+    if timestamp is not None:
+        return timestamp
+    import dateparser
+    moment = dateparser.parse(text)
+    return to_nanoseconds(moment) if moment is not None else None
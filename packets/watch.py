@@ -0,0 +1,325 @@
+"""Keeps the catalog (and seek-indices) current as the captures change"""
+# python standard library
+from fnmatch import fnmatch
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+# this project
+from .base import AlpacaBase
+from .catalog import Catalog
+from .defaults import (
+    IndexDefaults,
+    WatchDefaults,
+    )
+from .get import CaptureInfo
+from .index import (
+    Indexer,
+    SeekIndex,
+    )
+
+
+class Inotify:
+    """A minimal (ctypes) binding to linux's inotify
+
+    Args:
+     directory (str): the directory to watch
+
+    Raises:
+     OSError: inotify isn't available (or the watch couldn't be added)
+    """
+    modify = 0x2
+    close_write = 0x8
+    moved_from = 0x40
+    moved_to = 0x80
+    create = 0x100
+    delete = 0x200
+    overflow = 0x4000
+    mask = modify | close_write | moved_from | moved_to | create | delete
+    event_struct = struct.Struct("iIII")
+
+    def __init__(self, directory):
+        name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify isn't available")
+        self.descriptor = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.descriptor < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        watch = libc.inotify_add_watch(self.descriptor,
+                                       os.fsencode(directory), self.mask)
+        if watch < 0:
+            error = ctypes.get_errno()
+            os.close(self.descriptor)
+            raise OSError(error, "inotify_add_watch failed", directory)
+        return
+
+    def read(self, timeout):
+        """Waits for events
+
+        Args:
+         timeout (float): most seconds to wait
+
+        Returns:
+         set: names of the files that had events (None if the kernel's
+           queue overflowed and some events were lost)
+        """
+        readable, _, _ = select.select([self.descriptor], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.descriptor, WatchDefaults.buffer_size)
+        except BlockingIOError:
+            return set()
+        names, offset, lost = set(), 0, False
+        while offset + self.event_struct.size <= len(data):
+            _, mask, _, length = self.event_struct.unpack_from(data, offset)
+            offset += self.event_struct.size
+            lost = lost or bool(mask & self.overflow)
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return None if lost else names
+
+    def close(self):
+        """Stops watching"""
+        os.close(self.descriptor)
+        return
+
+
+class Watcher(AlpacaBase):
+    """Keeps a directory's catalog and seek-indices current
+
+    Everything is indexed once, after that only the files that inotify (or,
+    where it isn't available, polling the directory's stats) says were
+    created, written, moved or deleted are re-probed. The changes are
+    gathered for an interval so a file tcpdump is writing is only
+    re-probed once per interval (and only from where the last probe
+    stopped).
+
+    Args:
+     directory (str): the directory with the captures
+     glob (str): file-glob for the captures
+     packets (int): most packets between seek-index entries
+     seconds (float): most seconds between seek-index entries
+     workers (int): files to probe at the same time
+     interval (float): seconds to gather changes for
+     polling (bool): poll even if inotify is available
+    """
+    def __init__(self, directory, glob="*", packets=IndexDefaults.packets,
+                 seconds=IndexDefaults.seconds, workers=1,
+                 interval=WatchDefaults.interval, polling=False,
+                 *args, **kwargs):
+        super(Watcher, self).__init__(*args, **kwargs)
+        self.directory = directory
+        self.glob = glob
+        self.packets = packets
+        self.seconds = seconds
+        self.workers = workers
+        self.interval = interval
+        self.polling = polling
+        self._catalog = None
+        return
+
+    @property
+    def catalog(self):
+        """The directory's catalog"""
+        if self._catalog is None:
+            self._catalog = Catalog(self.directory, workers=self.workers)
+        return self._catalog
+
+    def matches(self, name):
+        """Checks if a file is a capture to keep track of
+
+        Args:
+         name (str): the file's name
+
+        Returns:
+         bool: True if it matches the glob and isn't ours
+        """
+        return (fnmatch(name, self.glob) and not Catalog.is_catalog(name)
+                and not SeekIndex.is_index(name))
+
+    def snapshot(self):
+        """The size and mtime of every capture (for polling)
+
+        Returns:
+         dict: (size, mtime) keyed by file name
+        """
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and self.matches(entry.name):
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def polled(self, previous, stop):
+        """Generates the names that changed by polling the directory
+
+        Args:
+         previous (dict): the snapshot to compare the first poll to
+         stop (threading.Event): set to stop watching
+
+        Yields:
+         set: names of the files that changed in the interval
+        """
+        while not stop.wait(self.interval):
+            current = self.snapshot()
+            yield set(name for name in set(previous) | set(current)
+                      if previous.get(name) != current.get(name))
+            previous = current
+        return
+
+    def notified(self, inotify, stop):
+        """Generates the names inotify reported
+
+        Args:
+         inotify (Inotify): the watch on the directory
+         stop (threading.Event): set to stop watching
+
+        Yields:
+         set: names of the files that had events in the interval (None if
+           events were lost and everything has to be rescanned)
+        """
+        try:
+            while not stop.is_set():
+                deadline = time.monotonic() + self.interval
+                names, lost = set(), False
+                remaining = self.interval
+                while remaining > 0 and not stop.is_set():
+                    events = inotify.read(remaining)
+                    if events is None:
+                        lost = True
+                    else:
+                        names |= events
+                    remaining = deadline - time.monotonic()
+                yield (None if lost
+                       else set(name for name in names if self.matches(name)))
+        finally:
+            inotify.close()
+        return
+
+    def changes(self, stop):
+        """Generates the changed names (using inotify when it's there)
+
+        Args:
+         stop (threading.Event): set to stop watching
+
+        Returns:
+         iter: sets of changed file names (None to rescan everything)
+        """
+        if not self.polling:
+            try:
+                return self.notified(Inotify(self.directory), stop)
+            except OSError as error:
+                self.logger.warning("Polling %s (no inotify: %s)",
+                                    self.directory, error)
+        return self.polled(self.snapshot(), stop)
+
+    def refresh(self, names):
+        """Updates the catalog and seek-indices for some files
+
+        Args:
+         names (set): names of the files that changed
+        """
+        paths = [os.path.join(self.directory, name) for name in sorted(names)]
+        present = [path for path in paths if os.path.isfile(path)]
+        gone = [os.path.basename(path) for path in paths
+                if path not in present]
+        self.catalog.refresh((CaptureInfo(path) for path in present), gone)
+        Indexer(present, packets=self.packets, seconds=self.seconds,
+                workers=self.workers)()
+        for name in gone:
+            try:
+                os.remove(SeekIndex(os.path.join(self.directory,
+                                                 name)).path)
+            except OSError:
+                pass
+        self.logger.info("Refreshed %d files, dropped %d", len(present),
+                         len(gone))
+        return
+
+    def refreshed(self, names):
+        """Refreshes some files, one at a time if the batch fails
+
+        Args:
+         names (set): names of the files that changed
+
+        Returns:
+         set: names of the files that couldn't be refreshed (to retry)
+        """
+        try:
+            self.refresh(names)
+            return set()
+        except OSError as error:
+            # a file went away (or was cut short) while it was probed, so
+            # the others are refreshed on their own
+            self.logger.warning("Couldn't refresh the batch: %s", error)
+        failed = set()
+        for name in sorted(names):
+            try:
+                self.refresh({name})
+            except OSError as error:
+                self.logger.warning("Couldn't refresh %s: %s", name, error)
+                failed.add(name)
+        return failed
+
+    def rescan(self):
+        """Indexes every capture in the directory
+
+        Returns:
+         set: names of the files to refresh with the next batch (all of
+           them if something went wrong)
+        """
+        names = set(self.snapshot())
+        try:
+            self.catalog.update(CaptureInfo(os.path.join(self.directory,
+                                                         name))
+                                for name in names)
+            Indexer([os.path.join(self.directory, name) for name in names],
+                    packets=self.packets, seconds=self.seconds,
+                    workers=self.workers)()
+        except OSError as error:
+            # a file went away while it was probed, everything is
+            # refreshed with the next batch of changes instead
+            self.logger.warning("Couldn't index everything: %s", error)
+            return names
+        return set()
+
+    def __call__(self, stop=None):
+        """Indexes everything, then keeps up with the changes until stopped
+
+        Args:
+         stop (threading.Event): set to stop watching (None to run forever)
+        """
+        stop = threading.Event() if stop is None else stop
+        changes = self.changes(stop)
+        retry = self.rescan()
+        self.catalog.beat()
+        for names in changes:
+            if names is None:
+                self.logger.warning("Events were lost, rescanning %s",
+                                    self.directory)
+                retry = self.rescan()
+            else:
+                names, retry = names | retry, set()
+                if names:
+                    retry = self.refreshed(names)
+            self.catalog.beat()
+        self.catalog.close()
+        return
+
+    def check_rep(self):
+        """Checks the arguments
+
+        Raises:
+         AssertionError: some argument was wrong
+        """
+        assert self.interval > 0
+        return
@@ -19,6 +19,7 @@ setup(name='packets',
       url='https://github.com/necromuralist/alpaca',
       author_email="necromuralist@protonmail.com",
       packages=find_packages(),
+      extras_require={"stats": ["numpy"]},
       entry_points="""
       [console_scripts]
       packets=packets.main:main
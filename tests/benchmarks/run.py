@@ -0,0 +1,218 @@
+"""Benchmarks for probing, filtering and merging capture directories
+
+Run it from the top of the repository::
+
+    python -m tests.benchmarks.run --files 10 --files 1000 --output out.json
+
+Each case is generated, then measured in a fresh worker process so its
+peak memory (the maximum resident set size) isn't inflated by the cases
+before it, once with the captures memory-mapped and once with them read
+through buffers (to compare their speed and memory). The results are
+written as JSON.
+"""
+# python standard library
+from itertools import product
+from multiprocessing import Pool
+from pathlib import Path
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# from pypi
+import click
+
+# software under test
+from packets.catalog import Catalog
+from packets.defaults import GetDefaults
+from packets.get import (
+    FileFilterer,
+    Merger,
+    )
+
+# for testing
+from .synthetic import SyntheticCaptures
+
+
+class BenchmarkDefaults:
+    """Default values for the benchmarks"""
+    files = [10, 1000, 10000]
+    sizes = [64, 1500]
+    packets = 200000
+    minimum_packets = 10
+    glob = "*"
+    target = "merged.pcap"
+    readings = ("mapped", "buffered")
+    buffer_size = 2**20
+    settled = 3600
+
+
+def timed(function, *args, **kwargs):
+    """Calls a function and times it
+
+    Args:
+     function: the thing to call
+
+    Returns:
+     tuple: seconds it took, what it returned
+    """
+    started = time.perf_counter()
+    outcome = function(*args, **kwargs)
+    return time.perf_counter() - started, outcome
+
+
+def peak_memory():
+    """The most memory this process has had resident (in kilobytes)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(case):
+    """Measures one generated directory (run in a worker process)
+
+    Args:
+     case (dict): the case's settings (with the directory and window)
+
+    Returns:
+     dict: the case with its measurements added
+    """
+    directory, workers = case["directory"], case["workers"]
+    start, end = case["window"]
+    buffer_size = (None if case["reading"] == "mapped"
+                   else BenchmarkDefaults.buffer_size)
+    results = dict(case, baseline_rss_kb=peak_memory())
+
+    def filterer(catalog=None):
+        return FileFilterer(directory, BenchmarkDefaults.glob, start=start,
+                            end=end, catalog=catalog, workers=workers)
+
+    def probe():
+        probing = filterer()
+        return [probing.probe(capture) for capture in probing.probed_files]
+
+    results["probe_seconds"], _ = timed(probe)
+    results["filter_seconds"], files = timed(lambda: filterer().file_names)
+    for run in ("cold", "warm"):
+        catalog = Catalog(directory, workers=workers)
+        results["catalog_{}_seconds".format(run)], _ = timed(
+            lambda: filterer(catalog).file_names)
+        catalog.close()
+    results["files_merged"] = len(files)
+    target = Path(directory)/BenchmarkDefaults.target
+    seconds, writer = timed(Merger(files, str(target), start=start, end=end,
+                                   workers=workers, buffer_size=buffer_size))
+    results["merge_seconds"] = seconds
+    results["merge_packets"] = writer.packets
+    results["merge_bytes"] = writer.bytes
+    results["merge_mb_per_second"] = writer.bytes / 10**6 / seconds
+    results["merge_packets_per_second"] = writer.packets / seconds
+    target.unlink()
+    results["peak_rss_kb"] = peak_memory()
+    return results
+
+
+def cases(files, sizes, packets, workers, directory):
+    """Generates the capture directories for every combination
+
+    Args:
+     files (list): numbers of files
+     sizes (list): bytes per packet
+     packets (int): total packets per directory
+     workers (int): threads for probing and compressing
+     directory (Path): where to put the generated directories
+
+    Yields:
+     dict: settings for a case (its directory has been written)
+    """
+    for count, size, compressed, overlapping in product(
+            files, sizes, (False, True), (False, True)):
+        name = "{}-files-{}-bytes-{}-{}".format(
+            count, size, "gzip" if compressed else "raw",
+            "overlapping" if overlapping else "sequential")
+        captures = SyntheticCaptures(
+            directory/name, count,
+            max(packets // count, BenchmarkDefaults.minimum_packets),
+            size, compressed=compressed, overlapping=overlapping)
+        seconds, _ = timed(captures)
+        # only captures that aren't being written are mapped
+        settled = time.time() - BenchmarkDefaults.settled
+        for path in captures.paths:
+            os.utime(str(path), (settled, settled))
+        yield dict(name=name, files=count, packet_size=size,
+                   packets_per_file=captures.packets,
+                   compressed=compressed, overlapping=overlapping,
+                   workers=workers, directory=str(captures.directory),
+                   window=captures.window, generate_seconds=seconds,
+                   bytes_on_disk=sum(path.stat().st_size
+                                     for path in captures.paths))
+    return
+
+
+def environment():
+    """Describes what the benchmarks ran on (to compare releases)"""
+    try:
+        revision = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            cwd=str(Path(__file__).parent)).stdout.strip()
+    except OSError:
+        revision = None
+    return dict(revision=revision or None,
+                python=sys.version.split()[0],
+                platform=platform.platform(),
+                cpus=os.cpu_count(),
+                started=datetime.datetime.now().isoformat())
+
+
+@click.command()
+@click.option("--files", multiple=True, type=click.IntRange(min=1),
+              default=BenchmarkDefaults.files, show_default=True,
+              help="Numbers of files (repeat for several).")
+@click.option("--sizes", multiple=True, type=click.IntRange(min=1),
+              default=BenchmarkDefaults.sizes, show_default=True,
+              help="Bytes per packet (repeat for several).")
+@click.option("--packets", type=click.IntRange(min=1),
+              default=BenchmarkDefaults.packets, show_default=True,
+              help="Total packets per generated directory.")
+@click.option("--workers", type=click.IntRange(min=1),
+              default=GetDefaults.workers, show_default=True,
+              help="Threads for probing and compressing.")
+@click.option("--directory", type=click.Path(file_okay=False),
+              help="Where to generate the captures (kept if given).")
+@click.option("--output", type=click.File("w"), default="-",
+              help="File for the JSON results (default is stdout).")
+def main(files, sizes, packets, workers, directory, output):
+    """Generates capture directories and measures the packets code"""
+    keep = directory is not None
+    directory = Path(directory or tempfile.mkdtemp(prefix="packets-bench-"))
+    results = []
+    try:
+        with Pool(processes=1, maxtasksperchild=1) as pool:
+            for case in cases(files, sizes, packets, workers, directory):
+                for reading in BenchmarkDefaults.readings:
+                    result = pool.apply(measure,
+                                        (dict(case, reading=reading),))
+                    click.echo("{name} ({reading}): merged "
+                               "{merge_mb_per_second:.1f} MB/s, "
+                               "peak {peak_rss_kb} KB".format(**result),
+                               err=True)
+                    results.append(result)
+                if not keep:
+                    shutil.rmtree(case["directory"])
+    finally:
+        if not keep:
+            shutil.rmtree(str(directory), ignore_errors=True)
+    json.dump(dict(environment=environment(), results=results), output,
+              indent=2)
+    output.write("\n")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Synthetic capture directories for the benchmarks"""
+# python standard library
+from pathlib import Path
+import gzip
+import random
+import struct
+
+# software under test
+from packets.pcap import global_header
+
+
+class SyntheticDefaults:
+    """Default values for the synthetic captures"""
+    epoch = 1529191962 * 10**9
+    interval = 10**6
+    linktype = 1
+    seed = 6
+    name = "channel_6.pcap{:05d}"
+    gzip_level = 6
+
+
+class SyntheticCaptures:
+    """A directory of generated libpcap files
+
+    Every file gets the same number of packets, one every ``interval``
+    nanoseconds. Sequential files follow each other (like a tcpdump
+    rotation), overlapping files interleave their packets so each one spans
+    the whole time-range (like several capture interfaces).
+
+    The packet data is a random block per file, so the data doesn't
+    compress to nothing but gzip still has something to find
+
+    Args:
+     directory (Path): where to write the files (created if missing)
+     files (int): number of files
+     packets (int): packets per file
+     size (int): bytes per packet
+     compressed (bool): gzip the files
+     overlapping (bool): give every file the whole time-range
+    """
+    def __init__(self, directory, files, packets, size, compressed=False,
+                 overlapping=False):
+        self.directory = Path(directory)
+        self.files = files
+        self.packets = packets
+        self.size = size
+        self.compressed = compressed
+        self.overlapping = overlapping
+        self.paths = []
+        return
+
+    @property
+    def total(self):
+        """Number of packets in all the files"""
+        return self.files * self.packets
+
+    @property
+    def span(self):
+        """Epoch nanoseconds of the first and last packets"""
+        return (SyntheticDefaults.epoch,
+                SyntheticDefaults.epoch
+                + (self.total - 1) * SyntheticDefaults.interval)
+
+    @property
+    def window(self):
+        """The middle half of the span (to filter and merge)"""
+        first, last = self.span
+        quarter = (last - first) // 4
+        return first + quarter, last - quarter
+
+    def timestamps(self, index):
+        """The packet times for a file
+
+        Args:
+         index (int): the file's place in the directory
+
+        Returns:
+         range: epoch nanoseconds of the file's packets
+        """
+        interval = SyntheticDefaults.interval
+        if self.overlapping:
+            return range(SyntheticDefaults.epoch + index * interval,
+                         SyntheticDefaults.epoch + self.total * interval,
+                         self.files * interval)
+        start = SyntheticDefaults.epoch + index * self.packets * interval
+        return range(start, start + self.packets * interval, interval)
+
+    def contents(self, index):
+        """Builds the bytes of a capture file
+
+        Args:
+         index (int): the file's place in the directory
+
+        Returns:
+         bytes: the global header and the records
+        """
+        data = random.Random(SyntheticDefaults.seed + index).getrandbits(
+            8 * self.size).to_bytes(self.size, "little")
+        record = struct.Struct("<IIII")
+        parts = [global_header(SyntheticDefaults.linktype,
+                               snaplen=max(self.size, 65535)).raw]
+        for timestamp in self.timestamps(index):
+            seconds, nanoseconds = divmod(timestamp, 10**9)
+            parts.append(record.pack(seconds, nanoseconds // 1000,
+                                     self.size, self.size))
+            parts.append(data)
+        return b"".join(parts)
+
+    def write(self, index):
+        """Writes one capture file
+
+        Args:
+         index (int): the file's place in the directory
+
+        Returns:
+         Path: the file
+        """
+        path = self.directory/SyntheticDefaults.name.format(index)
+        contents = self.contents(index)
+        if self.compressed:
+            path = path.with_name(path.name + ".gz")
+            contents = gzip.compress(contents,
+                                     compresslevel=SyntheticDefaults.gzip_level)
+        path.write_bytes(contents)
+        return path
+
+    def __call__(self):
+        """Writes all the files
+
+        Returns:
+         SyntheticCaptures: this object (with the paths set)
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.paths = [self.write(index) for index in range(self.files)]
+        return self
@@ -0,0 +1,22 @@
+Feature: An asyncio backend for the external tools
+
+Scenario: capinfos runs on the event loop for a file that isn't libpcap
+  Given a capture that the native reader can't read
+  When it's probed on the event loop
+  Then its times come from the tool's output
+
+Scenario: The tools run under a concurrency limit
+  Given several captures that the native reader can't read
+  When they're probed on the event loop with a limit
+  Then no more tools ran at once than the limit
+
+Scenario: mergecap's output is passed on as it comes
+  Given capture files that need mergecap
+  When they're merged on the event loop
+  Then the target has mergecap's output
+  And the output was written in chunks
+
+Scenario: GetPackets merges without blocking the event loop
+  Given a source directory with interleaved packets
+  When the packets are gotten on the event loop
+  Then the target has all the packets in time order
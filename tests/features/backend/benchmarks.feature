@@ -0,0 +1,6 @@
+Feature: The benchmark suite
+
+Scenario: The benchmarks run on a small directory
+  Given a cli runner for the benchmarks
+  When the benchmarks are run for two small files
+  Then the results are JSON with every combination measured
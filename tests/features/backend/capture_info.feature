@@ -14,3 +14,13 @@ Scenario: The last timestamp is grabbed
   Given The CaptureInfo is built
   When the last timestamp is grabbed
   Then it is the correct timestamp
+
+Scenario: The timestamps are read from the file
+  Given a CaptureInfo for a pcap file
+  When the timestamps are grabbed
+  Then they are the packet times without running the command
+
+Scenario: The file isn't one the reader can handle
+  Given a CaptureInfo for a file the reader can't handle
+  When the timestamps are grabbed
+  Then they are the times the command output
@@ -0,0 +1,62 @@
+Feature: A persistent capture catalog
+
+Scenario: The catalog probes new files
+  Given a directory of capture files
+  When the catalog is updated
+  Then it has an entry for each file
+
+Scenario: The catalog doesn't re-probe unchanged files
+  Given a directory of capture files
+  When the catalog is updated
+  And the catalog is updated again
+  Then none of the files are probed the second time
+
+Scenario: The catalog walks a growing file from where it stopped
+  Given a directory of capture files
+  When the catalog is updated
+  And packets are appended to a file
+  And the catalog is updated again
+  Then the grown file's entry has all the packets
+
+Scenario: The catalog drops deleted files
+  Given a directory of capture files
+  When the catalog is updated
+  And a file is deleted
+  And the catalog is updated again
+  Then the deleted file has no entry
+
+Scenario: The filterer looks up the times in the catalog
+  Given a directory of capture files
+  When the filterer uses the catalog with a time window
+  Then it gets the files inside the window
+
+Scenario: The filterer uses the catalog with the default times
+  Given a directory of capture files
+  When the filterer uses the catalog with the default times
+  Then it gets all the files
+
+Scenario: The catalog rolls the packets up per minute
+  Given a directory of busy capture files
+  When the catalog is updated
+  Then the timeline has the packets, bytes and peak for each minute
+  And the timeline adds up the minutes in buckets
+
+Scenario: A growing file's rollups carry on from where they stopped
+  Given a directory of busy capture files
+  When the catalog is updated
+  And packets in the same second are appended to a file
+  And the catalog is updated again
+  Then the rollups match a catalog that walked the whole file
+
+Scenario: A rewritten file's rollups are replaced
+  Given a directory of busy capture files
+  When the catalog is updated
+  And a file is rewritten with fewer packets
+  And the catalog is updated again
+  Then the timeline only has the rewritten file's packets
+
+Scenario: A catalog from before the rollups is probed again
+  Given a directory of busy capture files
+  When the catalog is updated
+  And the catalog is marked as an old one
+  Then re-opening it probes every file again
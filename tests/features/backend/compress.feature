@@ -0,0 +1,22 @@
+Feature: Multi-threaded output compression
+
+Scenario: The gzip compressor writes a single gzip file
+  Given data that spans many blocks
+  When it is written to the gzip compressor
+  Then gzip decompresses it to the original data
+
+Scenario: The bz2 compressor writes a bzip2 file
+  Given data that spans many blocks
+  When it is written to the bz2 compressor
+  Then bz2 decompresses it to the original data
+
+Scenario: The zip compressor writes a zip archive
+  Given data that spans many blocks
+  When it is written to the zip compressor
+  Then the zip archive has the original data
+
+Scenario: The Merger compresses its output
+  Given a capture file and a compression
+  When the Merger is called with the compression
+  Then the target has the compression's suffix
+  And it decompresses to the merged packets
@@ -22,3 +22,9 @@ Scenario: The user passes in a non-string source
   When the user builds the bad FileFilterer object
   Then a ConfigurationError is raised
 
+
+Scenario: The files are probed by a pool of workers
+  Given a directory of captures and several workers
+  When the file filterer is built with a time window
+  And the file-names are retrieved
+  Then the files in the window are in a stable order
@@ -50,3 +50,9 @@ Scenario: The user passes in a target directory
   Given arguments with a target
   When the user builds the GetPackets object
   Then the GetPackets object has the expected values
+
+Scenario: The user merges several sources with their packets tagged
+  Given channel directories with interleaved packets
+  When the user gets the packets from all of them with tags
+  Then the output has an interface named after each channel
+  And the packets are in time order with their channel's interface
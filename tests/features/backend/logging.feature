@@ -0,0 +1,17 @@
+Feature: Process-wide logging
+
+Scenario: Logging is configured once per process
+  Given the root logger's handlers
+  When logging is configured twice
+  Then there is one more handler
+  And the level is the last one configured
+
+Scenario: The objects don't configure logging
+  Given the root logger's handlers
+  When many captures log debug messages
+  Then the handlers haven't changed
+
+Scenario: Disabled debug messages cost little per file
+  Given logging configured to show warnings
+  When the per-file logging overhead is measured
+  Then it is within the budget
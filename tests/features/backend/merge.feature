@@ -0,0 +1,99 @@
+Feature: A native packet merger
+
+Scenario: The packets from several files are merged in time order
+  Given capture files with interleaved packets
+  When the files are merged
+  Then the output has all the packets in time order
+
+Scenario: Packets outside of the window are dropped
+  Given capture files with interleaved packets
+  When the files are merged with a time window
+  Then the output only has the packets in the window
+
+Scenario: Microsecond and nanosecond files are merged
+  Given a microsecond and a nanosecond capture file
+  When the files are merged
+  Then the output has all the packets in time order
+
+Scenario: The Merger falls back to mergecap
+  Given a capture file the native reader can't read
+  When the Merger is called
+  Then it runs mergecap
+
+Scenario: Gzipped captures are merged
+  Given gzipped capture files with interleaved packets
+  When the files are merged
+  Then the output has all the packets in time order
+
+Scenario: The Merger streams to stdout in bounded chunks
+  Given capture files with interleaved packets
+  When the Merger is called with '-' as the target
+  Then stdout has all the packets in time order
+  And stdout was written in bounded chunks
+
+Scenario: The Merger stops quietly when the reader closes stdout
+  Given capture files with interleaved packets
+  When the Merger streams to a closed pipe
+  Then the merge stops without an error
+
+Scenario: Channels are merged on their own threads
+  Given capture files with interleaved packets
+  When the files are merged as separate channels
+  Then the output has all the packets in time order
+
+Scenario: A channel's read errors reach the merge
+  Given a channel whose reader fails
+  When its records are read ahead
+  Then the reader's error is raised
+
+Scenario: Many files are merged in levels
+  Given many capture files with interleaved packets
+  When the Merger is called with a small fan-in and a time window
+  Then the output only has the packets in the window
+  And the intermediate files are gone
+
+Scenario: The merge groups are bounded by the fan-in
+  Given many capture files with interleaved packets
+  When the files are grouped for a tree-merge
+  Then no group has more files than the fan-in
+  And the groups don't mix channels
+
+Scenario: A long rotation is merged with few files open
+  Given a long rotation of capture files
+  When the files are merged with small buffers
+  Then the output has all the packets in time order
+  And no more than one file was open at a time
+
+Scenario: Too many overlapping files are merged in levels
+  Given many capture files with interleaved packets
+  When the Merger is called with a limit on the open files
+  Then the output has all the packets in time order
+  And the files were merged in levels
+
+Scenario: The memory budget decides how many files are open
+  Given a long rotation of capture files
+  When the memory budget is worked out
+  Then the files and their buffers fit in the budget
+  And a budget too small for two files is an error
+
+Scenario: Duplicate frames from neighbouring channels are dropped
+  Given two channels that caught some of the same frames
+  When the channels are merged with dedupe
+  Then only the first copy of each frame is kept
+  And the removed bytes are counted
+
+Scenario: Copies outside of the dedupe window are kept
+  Given frames that repeat after longer than the window
+  When the frames are deduplicated with a small memory
+  Then the repeats the window forgot are kept
+
+Scenario: pcap and pcapng files are merged into one pcap
+  Given a pcap file and a pcapng file with the same link-type
+  When the files are merged
+  Then the output has all the packets in time order
+
+Scenario: Files with different link-types are merged into pcapng
+  Given a pcap file and a pcapng file with two link-types
+  When the files are merged
+  Then the output is pcapng with an interface for each link-type
+  And the pcapng output has all the packets in time order
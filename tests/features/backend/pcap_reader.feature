@@ -0,0 +1,58 @@
+Feature: A native pcap reader
+
+Scenario: The reader gets the first and last timestamps
+  Given a pcap file with many packets
+  When the reader gets the timestamps
+  Then they are the first and last packet times
+
+Scenario: The reader handles big-endian nanosecond files
+  Given a big-endian nanosecond pcap file
+  When the reader gets the timestamps
+  Then they are the first and last packet times
+
+Scenario: The reader handles a truncated last packet
+  Given a pcap file with a truncated last packet
+  When the reader gets the timestamps
+  Then they are the first and last packet times
+
+Scenario: The reader handles an empty capture
+  Given a pcap file with no packets
+  When the reader gets the timestamps
+  Then there are no timestamps
+
+Scenario: The reader is given something that isn't a pcap file
+  Given a file that isn't a pcap file
+  When the reader reads the bad file
+  Then a CaptureFormatError is raised
+
+Scenario: The reader gets all the records
+  Given a pcap file with many packets
+  When the reader gets the records
+  Then the records have the packet times
+
+Scenario: The reader handles gzipped captures
+  Given a gzipped pcap file
+  When the reader gets the timestamps
+  Then they are the first and last packet times
+
+Scenario: The reader handles a gzipped capture that is still being compressed
+  Given a gzipped pcap file that stops part-way through
+  When the reader gets the timestamps
+  Then the last timestamp is the last complete packet
+
+Scenario: The reader maps uncompressed captures without copying the packets
+  Given a pcap file with many packets that hasn't changed for a while
+  When the records are written straight out
+  Then the records are views of the file
+  And the output is the same as the file
+
+Scenario: The reader doesn't map a capture that's still being written
+  Given a pcap file with many packets
+  When the records are written straight out
+  Then the records are copies
+  And the output is the same as the file
+
+Scenario: The reader stops when a mapped capture shrinks
+  Given a pcap file with many packets that hasn't changed for a while
+  When the file is truncated while its records are read
+  Then the records stop without reading past the end of the file
@@ -0,0 +1,42 @@
+Feature: A native pcapng reader
+
+Scenario: The reader gets the first and last timestamps of a pcapng file
+  Given a pcapng file with two interfaces
+  When the pcapng reader gets the timestamps
+  Then they are the first and last packet times
+
+Scenario: The reader converts each interface's time-stamp resolution
+  Given a pcapng file with two interfaces
+  When the pcapng reader gets the records
+  Then the records have the packet times and interfaces
+  And the interfaces have their names and link-types
+
+Scenario: The reader handles big-endian files with binary resolutions
+  Given a big-endian pcapng file with a binary time-stamp resolution
+  When the pcapng reader gets the records
+  Then the records have the packet times and interfaces
+
+Scenario: The reader skips the blocks that aren't packets
+  Given a pcapng file with other blocks between the packets
+  When the pcapng reader gets the records
+  Then the records have the packet times and interfaces
+
+Scenario: The reader handles a truncated last block
+  Given a pcapng file with a truncated last block
+  When the pcapng reader gets the timestamps
+  Then they are the first and last packet times
+
+Scenario: The reader handles gzipped pcapng files
+  Given a gzipped pcapng file
+  When the pcapng reader gets the timestamps
+  Then they are the first and last packet times
+
+Scenario: The reader is given something that isn't a pcapng file
+  Given a file with the pcapng magic but no byte-order magic
+  When the pcapng reader reads the bad file
+  Then a CaptureFormatError is raised
+
+Scenario: The right reader is picked for a capture
+  Given a pcap file and a pcapng file
+  When the readers are picked
+  Then each file gets the reader for its format
@@ -0,0 +1,19 @@
+Feature: A merge planner
+
+Scenario: The plan uses the catalog's packet counts
+  Given a catalogued capture directory
+  When the merge is planned for a window
+  Then the plan has the files the merge would use
+  And the estimates are close to the real merge
+
+Scenario: The plan uses the seek-indices to estimate the reads
+  Given a catalogued capture directory
+  And the files have seek-indices
+  When the merge is planned for a window with seeking
+  Then the plan reads less than the files hold
+  And the estimates are close to the real merge
+
+Scenario: The plan warns when the output won't fit
+  Given a catalogued capture directory
+  When the merge is planned for a disk without space
+  Then the report says there isn't enough space
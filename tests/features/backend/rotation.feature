@@ -0,0 +1,22 @@
+Feature: A binary-searched tcpdump rotation
+
+Scenario: The files of a wrapped rotation are put in time order
+  Given a rotation that has wrapped around
+  When the rotation is ordered
+  Then the files are in time order
+
+Scenario: The files for a time-span are found without probing them all
+  Given a rotation that has wrapped around
+  When the rotation is searched for a time-span
+  Then it gets the files that overlap the span
+  And only a few files were probed
+
+Scenario: A file that is still being gzipped is only used once
+  Given a rotation with a file that is being gzipped
+  When the rotation is ordered
+  Then the uncompressed file is used
+
+Scenario: The filterer binary-searches a rotation
+  Given a rotation that has wrapped around
+  When the filterer searches the rotation for a time-span
+  Then it gets the files that overlap the span
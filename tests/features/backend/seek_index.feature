@@ -0,0 +1,28 @@
+Feature: A sparse seek-index for capture files
+
+Scenario: The index seeks close to the start time
+  Given a capture file with many packets
+  When the index is asked for a time in the middle
+  Then it gives an offset shortly before the time's packet
+
+Scenario: The index is kept in a sidecar file
+  Given a capture file with many packets
+  When the index is updated twice
+  Then the second index is loaded from the sidecar
+
+Scenario: The index never skips out-of-order packets
+  Given a capture file with an out-of-order packet
+  When the index is asked for the out-of-order packet's time
+  Then the out-of-order packet is after the offset
+
+Scenario: The merge seeks with the index
+  Given a capture file with many packets
+  When the file is merged with and without the index
+  Then the outputs are the same
+
+Scenario: A damaged sidecar is rebuilt
+  Given a capture file with many packets
+  And a sidecar that was cut short while it was written
+  When the index is asked for a time in the middle
+  Then it gives an offset shortly before the time's packet
+  And the sidecar is whole again
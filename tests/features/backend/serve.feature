@@ -0,0 +1,16 @@
+Feature: A query server for time-windows
+
+Scenario: Several clients query the server at once
+  Given a packet server on localhost
+  When several clients query different time-windows at once
+  Then each client gets the packets in its window
+
+Scenario: The server listens on a Unix socket
+  Given a packet server on a Unix socket
+  When a client queries a time-window over the socket
+  Then the client gets the packets in its window
+
+Scenario: The server rejects a glob that leaves the directory
+  Given a packet server on localhost
+  When a client queries with a glob outside the directory
+  Then the client gets a bad request
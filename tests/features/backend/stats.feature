@@ -0,0 +1,23 @@
+Feature: Capture statistics
+
+Scenario: The statistics count the packets in a window
+  Given capture files with different packet sizes
+  When the statistics are worked out for a window
+  Then they count the packets and bytes in the window
+  And the size percentiles and histogram match the packets
+  And the rates match the packets
+
+Scenario: The gaps are where no file has packets
+  Given capture files that cover each other's gaps
+  When the statistics are worked out for everything
+  Then only the gap in all of the files is found
+
+Scenario: Compressed and nanosecond files are read a chunk at a time
+  Given a gzipped big-endian nanosecond capture file
+  When the statistics are worked out with small chunks
+  Then every packet is counted once
+
+Scenario: The statistics come from the files the getter picks
+  Given capture files with different packet sizes
+  When the getter works out the statistics for a window
+  Then they count the packets and bytes in the window
@@ -0,0 +1,17 @@
+Feature: Fast timestamp parsing
+
+Scenario: The strict formats are parsed without dateparser
+  Given timestamps in the capinfos, ISO-8601 and epoch formats
+  When the timestamps are parsed
+  Then they are the expected epoch nanoseconds
+  And dateparser isn't used
+
+Scenario: The default times are the epoch and the year 9999
+  Given the default start and end times
+  When the timestamps are parsed
+  Then they are the expected epoch nanoseconds
+
+Scenario: Free-form times fall back to dateparser
+  Given a free-form timestamp
+  When the user timestamp is parsed
+  Then dateparser is used
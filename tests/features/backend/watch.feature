@@ -0,0 +1,29 @@
+Feature: Watching the captures to keep the catalog current
+
+Scenario: The watcher keeps up with new and deleted files (inotify)
+  Given a watcher on a directory of capture files
+  When files are added and deleted while it watches
+  Then the catalog has the new file and not the deleted one
+  And only the new file was probed after the first pass
+
+Scenario: The watcher keeps up with new and deleted files (polling)
+  Given a polling watcher on a directory of capture files
+  When files are added and deleted while it watches
+  Then the catalog has the new file and not the deleted one
+  And only the new file was probed after the first pass
+
+Scenario: The filterer trusts a watched catalog
+  Given a catalog with a recent heartbeat
+  When the filterer uses the watched catalog
+  Then the files aren't checked
+
+Scenario: A file that can't be probed doesn't hold up the others
+  Given a watcher on a directory of capture files
+  When a new file and one that can't be probed change together
+  Then the catalog has the new file and not the broken one
+  And the broken file was tried again
+
+Scenario: The watcher rescans everything when inotify loses events
+  Given a watcher whose inotify queue overflows
+  When files are added and deleted while it watches
+  Then the catalog has the new file and not the deleted one
@@ -36,3 +36,23 @@ Scenario: The user calls the subcommand with start, end, and compression
   Then it returns an okay status
   And the GetPackets object is built with the expected arguments
   And the GetPackets object is run
+
+Scenario: The user calls the get subcommand with several sources
+  Given a cli runner
+  When the user calls the get subcommand with several sources and a tag
+  Then it returns an okay status
+  And the GetPackets object is built with the expected arguments
+  And the GetPackets object is run
+
+Scenario: The user asks for a plan instead of the packets
+  Given a cli runner
+  When the user calls the get subcommand with the plan option
+  Then it returns an okay status
+  And the plan's report is output instead of merging
+
+Scenario: The user asks for the duplicate frames to be dropped
+  Given a cli runner
+  When the user calls the get subcommand with the dedupe options
+  Then it returns an okay status
+  And the GetPackets object is built to drop the duplicates
+  And the removed duplicates are reported
@@ -0,0 +1,20 @@
+Feature: The index sub-command
+
+Scenario: The user calls the index subcommand with the help option
+  Given a cli runner
+  When the user calls the index subcommand with the help option
+  Then it returns an okay status
+  And it outputs the help message
+
+Scenario: The user calls the index subcommand with a source
+  Given a cli runner
+  When the user calls the index subcommand with a source
+  Then it returns an okay status
+  And the Indexer is built with the source files
+  And the Indexer is run
+
+Scenario: The user calls the index subcommand with the watch option
+  Given a cli runner
+  When the user calls the index subcommand with the watch option
+  Then it returns an okay status
+  And the Watcher is built and run
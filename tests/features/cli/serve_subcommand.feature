@@ -0,0 +1,7 @@
+Feature: The serve sub-command
+
+Scenario: The user calls the serve subcommand with a socket
+  Given a cli runner
+  When the user calls the serve subcommand with a socket
+  Then it returns an okay status
+  And the PacketServer is built and run
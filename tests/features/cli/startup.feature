@@ -0,0 +1,13 @@
+Feature: Fast command-line start-up
+
+Scenario: The help starts within the budget
+  Given the startup budget
+  When the user calls packets with the help option (timed)
+  Then it starts within the budget
+  And it doesn't import the heavy modules
+
+Scenario: A trivial get starts within the budget
+  Given the startup budget
+  When the user gets packets from an empty directory (timed)
+  Then it starts within the budget
+  And it doesn't import dateparser
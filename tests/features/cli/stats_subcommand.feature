@@ -0,0 +1,20 @@
+Feature: The stats sub-command
+
+Scenario: The user calls the stats subcommand with the help option
+  Given a cli runner
+  When the user calls the stats subcommand with the help option
+  Then it returns an okay status
+  And it outputs the help message
+
+Scenario: The user calls the stats subcommand with sources
+  Given a cli runner
+  When the user calls the stats subcommand with sources and a window
+  Then it returns an okay status
+  And the GetPackets object is built with the sources and window
+  And the statistics' report is output
+
+Scenario: The user calls the stats subcommand without NumPy
+  Given a cli runner
+  When the user calls the stats subcommand without NumPy installed
+  Then it returns the failure status
+  And it says NumPy is needed
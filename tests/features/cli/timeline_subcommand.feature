@@ -0,0 +1,20 @@
+Feature: The timeline sub-command
+
+Scenario: The user calls the timeline subcommand with the help option
+  Given a cli runner
+  When the user calls the timeline subcommand with the help option
+  Then it returns an okay status
+  And it outputs the help message
+
+Scenario: The user calls the timeline subcommand with a source
+  Given a cli runner
+  When the user calls the timeline subcommand with a source and buckets
+  Then it returns an okay status
+  And the Timeline is built with the source and buckets
+  And the timeline's report is output
+
+Scenario: The timeline is counted from a directory's catalog
+  Given a directory with a capture file
+  When the user calls the timeline subcommand on the directory
+  Then it returns an okay status
+  And the output has a row for each minute with packets
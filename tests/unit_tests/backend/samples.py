@@ -1,3 +1,6 @@
+# python standard library
+import struct
+
 OUTPUT = """File name:           /home/erysichthon/usbstick/packets/channel_6.pcap0
 First packet time:   2018-06-16 16:32:42.322949
 Last packet time:    2018-06-17 17:05:17.160418"""
@@ -5,3 +8,188 @@ Last packet time:    2018-06-17 17:05:17.160418"""
 FILE_NAME = "/home/erysichthon/usbstick/packets/channel_6.pcap0"
 FIRST_TIME = "2018-06-16 16:32:42.322949"
 LAST_TIME = "2018-06-17 17:05:17.160418"
+
+MICROSECONDS_MAGIC = 0xa1b2c3d4
+NANOSECONDS_MAGIC = 0xa1b23c4d
+SNAPLEN = 262144
+LINKTYPE = 127
+
+
+def pcap_header(byte_order="<", magic=MICROSECONDS_MAGIC, snaplen=SNAPLEN,
+                linktype=LINKTYPE):
+    """Builds a pcap global header
+
+    Args:
+     byte_order (str): struct byte-order character
+     magic (int): the magic number (micro or nano-seconds)
+     snaplen (int): maximum bytes per packet
+     linktype (int): data-link type
+
+    Returns:
+     bytes: the global header
+    """
+    return struct.pack(byte_order + "IHHiIII", magic, 2, 4, 0, 0,
+                       snaplen, linktype)
+
+
+def pcap_record(timestamp, data, byte_order="<", nanoseconds=False):
+    """Builds a single pcap record
+
+    Args:
+     timestamp (int): epoch nanoseconds
+     data (bytes): the packet
+     byte_order (str): struct byte-order character
+     nanoseconds (bool): use nanosecond instead of microsecond fractions
+
+    Returns:
+     bytes: record header followed by the packet
+    """
+    seconds, fraction = divmod(timestamp, 10**9)
+    if not nanoseconds:
+        fraction //= 1000
+    return struct.pack(byte_order + "IIII", seconds, fraction,
+                       len(data), len(data)) + data
+
+
+def pcap_bytes(timestamps, size=64, byte_order="<", nanoseconds=False,
+               linktype=LINKTYPE):
+    """Builds a whole pcap file
+
+    Args:
+     timestamps (list): epoch nanosecond timestamps for the packets
+     size (int): bytes in each packet
+     byte_order (str): struct byte-order character
+     nanoseconds (bool): use the nanosecond format
+     linktype (int): data-link type
+
+    Returns:
+     bytes: the contents of a pcap file
+    """
+    magic = NANOSECONDS_MAGIC if nanoseconds else MICROSECONDS_MAGIC
+    records = (pcap_record(timestamp,
+                           bytes((index + offset) % 256
+                                 for offset in range(size)),
+                           byte_order, nanoseconds)
+               for index, timestamp in enumerate(timestamps))
+    return pcap_header(byte_order, magic, linktype=linktype) + b"".join(records)
+
+
+def write_pcap(path, timestamps, **kwargs):
+    """Writes a pcap file
+
+    Args:
+     path (Path): where to write the file
+     timestamps (list): epoch nanoseconds for the packets
+     kwargs: passed to pcap_bytes
+
+    Returns:
+     Path: the path to the file
+    """
+    path.write_bytes(pcap_bytes(timestamps, **kwargs))
+    return path
+
+EPOCH = 1529191962322949000
+
+
+SECTION_HEADER = 0x0a0d0d0a
+INTERFACE_DESCRIPTION = 1
+ENHANCED_PACKET = 6
+BYTE_ORDER_MAGIC = 0x1a2b3c4d
+
+
+def pcapng_block(block_type, body, byte_order="<"):
+    """Builds a pcapng block
+
+    Args:
+     block_type (int): the block's type
+     body (bytes): the block (without its type and lengths)
+     byte_order (str): struct byte-order character
+
+    Returns:
+     bytes: the padded block with its lengths
+    """
+    body += bytes(-len(body) % 4)
+    length = len(body) + 12
+    return (struct.pack(byte_order + "II", block_type, length) + body
+            + struct.pack(byte_order + "I", length))
+
+
+def pcapng_section(byte_order="<"):
+    """Builds a pcapng section header block
+
+    Args:
+     byte_order (str): struct byte-order character
+
+    Returns:
+     bytes: the block
+    """
+    return pcapng_block(SECTION_HEADER,
+                        struct.pack(byte_order + "IHHq", BYTE_ORDER_MAGIC,
+                                    1, 0, -1),
+                        byte_order)
+
+
+def pcapng_interface(linktype=LINKTYPE, name=None, resolution=None,
+                     snaplen=SNAPLEN, byte_order="<"):
+    """Builds a pcapng interface description block
+
+    Args:
+     linktype (int): data-link type
+     name (str): the interface's name (if_name)
+     resolution (int): the if_tsresol value (None for microseconds)
+     snaplen (int): maximum bytes per packet
+     byte_order (str): struct byte-order character
+
+    Returns:
+     bytes: the block
+    """
+    options = []
+    if name is not None:
+        options.append((2, name.encode("utf-8")))
+    if resolution is not None:
+        options.append((9, bytes([resolution])))
+    body = struct.pack(byte_order + "HHI", linktype, 0, snaplen)
+    for code, value in options:
+        body += (struct.pack(byte_order + "HH", code, len(value)) + value
+                 + bytes(-len(value) % 4))
+    if options:
+        body += bytes(4)
+    return pcapng_block(INTERFACE_DESCRIPTION, body, byte_order)
+
+
+def ticks(timestamp, resolution=None):
+    """Converts epoch nanoseconds to an interface's time-stamp units
+
+    Args:
+     timestamp (int): epoch nanoseconds
+     resolution (int): the if_tsresol value (None for microseconds)
+
+    Returns:
+     int: the time-stamp
+    """
+    resolution = 6 if resolution is None else resolution
+    rate = (2**(resolution & 0x7f) if resolution & 0x80
+            else 10**resolution)
+    return timestamp * rate // 10**9
+
+
+def pcapng_packet(timestamp, data, interface=0, resolution=None,
+                  byte_order="<"):
+    """Builds a pcapng enhanced packet block
+
+    Args:
+     timestamp (int): epoch nanoseconds
+     data (bytes): the packet
+     interface (int): the interface's id in its section
+     resolution (int): the interface's if_tsresol (None for microseconds)
+     byte_order (str): struct byte-order character
+
+    Returns:
+     bytes: the block
+    """
+    stamp = ticks(timestamp, resolution)
+    return pcapng_block(ENHANCED_PACKET,
+                        struct.pack(byte_order + "IIIII", interface,
+                                    stamp >> 32, stamp & 0xffffffff,
+                                    len(data), len(data)) + data,
+                        byte_order)
@@ -0,0 +1,258 @@
+# coding=utf-8
+"""An asyncio backend for the external tools feature tests."""
+# python standard library
+from functools import partial
+import asyncio
+import sys
+
+# from pypi
+from expects import (
+    be_above,
+    be_below_or_equal,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    OUTPUT,
+    write_pcap,
+)
+
+# software under test
+from packets.aio import AsyncTools
+from packets.get import (
+    CaptureInfo,
+    GetPackets,
+    Merger,
+)
+from packets.pcap import PcapReader
+from packets.timestamps import parse_timestamp
+
+and_also = then
+scenario = partial(pytest_bdd.scenario, "../../features/backend/aio.feature")
+
+SECOND = 10**9
+FAKE_CAPINFOS = """import sys
+print({!r})
+""".format(OUTPUT)
+FAKE_MERGECAP = """import sys
+for name in sys.argv[3:]:
+    with open(name, "rb") as stream:
+        sys.stdout.buffer.write(stream.read())
+"""
+
+
+def fake_tool(directory, name, source):
+    """Writes a python script to stand in for a tool
+
+    Args:
+     directory (Path): where to put the script
+     name (str): name for the script
+     source (str): the script's code
+
+    Returns:
+     str: command to run the script
+    """
+    path = directory/name
+    path.write_text(source)
+    return "{} {}".format(sys.executable, path)
+
+# ******************** capinfos ******************** #
+
+
+@scenario("capinfos runs on the event loop for a file that isn't libpcap")
+def test_capinfos():
+    return
+
+
+@given("a capture that the native reader can't read")
+def not_libpcap(katamari, tmp_path):
+    path = tmp_path/"channel_6.pcapng"
+    path.write_bytes(b"\x0a\x0d\x0d\x0a" + bytes(60))
+    katamari.captures = [CaptureInfo(
+        str(path), command=fake_tool(tmp_path, "capinfos.py",
+                                     FAKE_CAPINFOS))]
+    return
+
+
+@when("it's probed on the event loop")
+def probe(katamari):
+    tools = AsyncTools(limit=2)
+    asyncio.run(tools.probe(katamari.captures[0]))
+    return
+
+
+@then("its times come from the tool's output")
+def check_times(katamari):
+    capture = katamari.captures[0]
+    expect(capture.native).to(equal(False))
+    expect(capture.first).to(equal(parse_timestamp(
+        "2018-06-16 16:32:42.322949")))
+    expect(capture.last).to(equal(parse_timestamp(
+        "2018-06-17 17:05:17.160418")))
+    return
+
+# ******************** limit ******************** #
+
+
+@scenario("The tools run under a concurrency limit")
+def test_limit():
+    return
+
+
+@given("several captures that the native reader can't read")
+def several_not_libpcap(katamari, tmp_path):
+    katamari.captures = []
+    for index in range(6):
+        path = tmp_path/"channel_6.pcapng{}".format(index)
+        path.write_bytes(bytes(64))
+        katamari.captures.append(CaptureInfo(str(path), command="capinfos"))
+    return
+
+
+@when("they're probed on the event loop with a limit")
+def probe_with_limit(katamari, mocker):
+    katamari.limit = 2
+    katamari.running = katamari.most = 0
+
+    class Process:
+        returncode = 0
+
+        def __init__(self):
+            self.stdout = self.lines()
+
+        async def lines(self):
+            katamari.running += 1
+            katamari.most = max(katamari.most, katamari.running)
+            await asyncio.sleep(0.01)
+            katamari.running -= 1
+            yield OUTPUT.encode()
+
+        async def wait(self):
+            return 0
+
+    async def create_subprocess_exec(*command, **kwargs):
+        return Process()
+
+    mocker.patch("packets.aio.asyncio.create_subprocess_exec",
+                 create_subprocess_exec)
+    tools = AsyncTools(limit=katamari.limit)
+
+    async def probe_all():
+        await asyncio.gather(*(tools.probe(capture)
+                               for capture in katamari.captures))
+    asyncio.run(probe_all())
+    return
+
+
+@then("no more tools ran at once than the limit")
+def check_limit(katamari):
+    expect(katamari.most).to(equal(katamari.limit))
+    for capture in katamari.captures:
+        expect(capture.output).to(equal(OUTPUT))
+    return
+
+# ******************** mergecap ******************** #
+
+
+@scenario("mergecap's output is passed on as it comes")
+def test_mergecap():
+    return
+
+
+@given("capture files that need mergecap")
+def mergecap_files(katamari, tmp_path, mocker):
+    katamari.files = [str(write_pcap(tmp_path/"channel_{}.pcap".format(index),
+                                     [EPOCH + index * SECOND] * 50))
+                      for index in range(3)]
+    katamari.target = tmp_path/"merged.pcapng"
+    mocker.patch("packets.aio.AsyncDefaults.merge_command",
+                 fake_tool(tmp_path, "mergecap.py", FAKE_MERGECAP)
+                 + " -w -")
+    return
+
+
+@when("they're merged on the event loop")
+def merge_with_mergecap(katamari, mocker):
+    merger = Merger(katamari.files, str(katamari.target), native=False)
+    katamari.chunk_size = 1024
+    katamari.writes = []
+    opened = merger.open
+
+    def spied_open():
+        stream = opened()
+        write = stream.write
+
+        def counted(chunk):
+            katamari.writes.append(len(chunk))
+            return write(chunk)
+        stream.write = counted
+        return stream
+    mocker.patch.object(merger, "open", spied_open)
+    tools = AsyncTools(chunk_size=katamari.chunk_size)
+    asyncio.run(tools.merge(merger))
+    return
+
+
+@then("the target has mergecap's output")
+def check_mergecap_output(katamari):
+    expected = b"".join(open(name, "rb").read() for name in katamari.files)
+    expect(katamari.target.read_bytes()).to(equal(expected))
+    return
+
+
+@then("the output was written in chunks")
+def check_mergecap_chunks(katamari):
+    expect(len(katamari.writes)).to(be_above(1))
+    for size in katamari.writes:
+        expect(size).to(be_below_or_equal(katamari.chunk_size))
+    return
+
+# ******************** GetPackets ******************** #
+
+
+@scenario("GetPackets merges without blocking the event loop")
+def test_get_packets():
+    return
+
+
+@given("a source directory with interleaved packets")
+def source_directory(katamari, tmp_path):
+    katamari.source = tmp_path/"channel_6"
+    katamari.source.mkdir()
+    katamari.target = tmp_path/"merged.pcap"
+    katamari.timestamps = []
+    for index in range(3):
+        timestamps = [EPOCH + (packet * 3 + index) * SECOND
+                      for packet in range(20)]
+        katamari.timestamps.extend(timestamps)
+        write_pcap(katamari.source/"channel_6.pcap{}".format(index),
+                   timestamps)
+    katamari.timestamps.sort()
+    return
+
+
+@when("the packets are gotten on the event loop")
+def get_on_loop(katamari):
+    getter = GetPackets(source=str(katamari.source),
+                        target=str(katamari.target), start=None, end=None)
+    katamari.writer = asyncio.run(getter.run_async(limit=2))
+    return
+
+
+@then("the target has all the packets in time order")
+def check_get_on_loop(katamari):
+    timestamps = [record.timestamp for record in
+                  PcapReader(str(katamari.target)).records()]
+    expect(timestamps).to(equal(katamari.timestamps))
+    expect(katamari.writer.packets).to(equal(len(katamari.timestamps)))
+    return
@@ -0,0 +1,63 @@
+# coding=utf-8
+"""The benchmark suite feature tests."""
+# python standard library
+from functools import partial
+import json
+
+# from pypi
+from click.testing import CliRunner
+from expects import (
+    contain,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from ...benchmarks.run import main
+
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/benchmarks.feature')
+
+MEASUREMENTS = ("probe_seconds", "filter_seconds", "catalog_cold_seconds",
+                "catalog_warm_seconds", "merge_mb_per_second",
+                "merge_packets_per_second", "peak_rss_kb")
+
+
+@scenario("The benchmarks run on a small directory")
+def test_benchmarks():
+    return
+
+
+@given("a cli runner for the benchmarks")
+def a_cli_runner(katamari):
+    katamari.runner = CliRunner()
+    return
+
+
+@when("the benchmarks are run for two small files")
+def run_benchmarks(katamari, tmp_path):
+    katamari.result = katamari.runner.invoke(
+        main, ["--files", "2", "--sizes", "64", "--packets", "100",
+               "--workers", "1", "--directory", str(tmp_path)])
+    return
+
+
+@then("the results are JSON with every combination measured")
+def check_results(katamari):
+    expect(katamari.result.exit_code).to(equal(0))
+    output = katamari.result.output
+    results = json.loads(output[output.index("{"):])["results"]
+    expect(len(results)).to(equal(8))
+    expect(sorted(result["reading"] for result in results)).to(equal(
+        ["buffered"] * 4 + ["mapped"] * 4))
+    for result in results:
+        expect(list(result)).to(contain(*MEASUREMENTS))
+        expect(result["merge_packets"]).to(equal(50))
+    return
@@ -20,13 +20,16 @@ import dateparser
 from ..fixtures import katamari
 
 from .samples import (
+    EPOCH,
     OUTPUT,
     FIRST_TIME,
     LAST_TIME,
+    write_pcap,
 )
 
 # software under test
 from packets.get import CaptureInfo
+from packets.pcap import to_nanoseconds
 
 scenario = partial(pytest_bdd.scenario, '../../features/backend/capture_info.feature')
 
@@ -79,9 +82,10 @@ def test_first_timestamp():
 
 @when("the first timestamp is grabbed")
 def get_first_timestamp(katamari):
+    katamari.info.native = False
     katamari.info._output = OUTPUT
     katamari.actual = katamari.info.first
-    katamari.expected = dateparser.parse(FIRST_TIME)
+    katamari.expected = to_nanoseconds(dateparser.parse(FIRST_TIME))
     return
 
 
@@ -101,8 +105,67 @@ def test_last_timestamp():
 
 @when("the last timestamp is grabbed")
 def get_last_timestamp(katamari):
+    katamari.info.native = False
     katamari.info._output = OUTPUT
     katamari.actual = katamari.info.last
-    katamari.expected = dateparser.parse(LAST_TIME)
+    katamari.expected = to_nanoseconds(dateparser.parse(LAST_TIME))
     return
 #  Then it is the correct timestamp
+
+# ******************** native ******************** #
+
+
+@scenario("The timestamps are read from the file")
+def test_native_timestamps():
+    return
+
+
+@given("a CaptureInfo for a pcap file")
+def native_capture_info(katamari, tmp_path, mocker):
+    katamari.timestamps = [EPOCH + index * 10**6 for index in range(100)]
+    path = write_pcap(tmp_path/"channel_6.pcap00", katamari.timestamps)
+    katamari.subprocess = mocker.patch("packets.get.subprocess")
+    katamari.info = CaptureInfo(str(path))
+    return
+
+
+@when("the timestamps are grabbed")
+def grab_timestamps(katamari):
+    katamari.actual = (katamari.info.first, katamari.info.last)
+    return
+
+
+@then("they are the packet times without running the command")
+def check_native_timestamps(katamari):
+    expect(katamari.actual).to(equal((katamari.timestamps[0],
+                                      katamari.timestamps[-1])))
+    expect(katamari.subprocess.run.called).to(equal(False))
+    return
+
+# ******************** fallback ******************** #
+
+
+@scenario("The file isn't one the reader can handle")
+def test_fallback():
+    return
+
+
+@given("a CaptureInfo for a file the reader can't handle")
+def fallback_capture_info(katamari, tmp_path, mocker):
+    path = tmp_path/"channel_6.pcapng"
+    path.write_bytes(b"\x0a\x0d\x0d\x0a" + bytes(60))
+    katamari.subprocess = mocker.patch("packets.get.subprocess")
+    katamari.subprocess.run.return_value.stdout = OUTPUT
+    katamari.info = CaptureInfo(str(path))
+    return
+
+#  When the timestamps are grabbed
+
+
+@then("they are the times the command output")
+def check_fallback_timestamps(katamari):
+    expect(katamari.actual).to(equal(
+        (to_nanoseconds(dateparser.parse(FIRST_TIME)),
+         to_nanoseconds(dateparser.parse(LAST_TIME)))))
+    expect(katamari.subprocess.run.call_count).to(equal(1))
+    return
@@ -0,0 +1,349 @@
+# coding=utf-8
+"""A persistent capture catalog feature tests."""
+# python standard library
+from functools import partial
+
+# from pypi
+from expects import (
+    be_empty,
+    be_none,
+    contain,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    pcap_bytes,
+    write_pcap,
+)
+
+# software under test
+from packets.catalog import (
+    Bucket,
+    Catalog,
+)
+from packets.defaults import GetDefaults
+from packets.get import (
+    CaptureInfo,
+    FileFilterer,
+)
+from packets.timestamps import parse_user_timestamp
+
+And = when
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/catalog.feature')
+
+SECOND = 10**9
+PACKETS = 10
+
+
+def captures(directory):
+    """Builds the CaptureInfo objects for the directory
+
+    Args:
+     directory (Path): the capture directory
+
+    Returns:
+     list: CaptureInfo for each pcap file
+    """
+    return [CaptureInfo(str(path))
+            for path in sorted(directory.glob("*.pcap*"))]
+
+# ******************** new files ******************** #
+
+
+@scenario("The catalog probes new files")
+def test_new_files():
+    return
+
+
+@given("a directory of capture files")
+def capture_directory(katamari, tmp_path):
+    katamari.directory = tmp_path
+    katamari.starts = [EPOCH + index * 60 * SECOND for index in range(3)]
+    for index, start in enumerate(katamari.starts):
+        write_pcap(tmp_path/"channel_6.pcap{:02}".format(index),
+                   [start + packet * SECOND for packet in range(PACKETS)])
+    katamari.catalog = Catalog(str(tmp_path))
+    return
+
+
+@when("the catalog is updated")
+def update_catalog(katamari):
+    katamari.catalog.update(captures(katamari.directory))
+    return
+
+
+@then("it has an entry for each file")
+def check_entries(katamari):
+    entries = katamari.catalog.entries
+    expect(sorted(entries)).to(equal(["channel_6.pcap00", "channel_6.pcap01",
+                                      "channel_6.pcap02"]))
+    for index, start in enumerate(katamari.starts):
+        entry = entries["channel_6.pcap{:02}".format(index)]
+        expect(entry.first).to(equal(start))
+        expect(entry.last).to(equal(start + (PACKETS - 1) * SECOND))
+        expect(entry.packets).to(equal(PACKETS))
+    return
+
+# ******************** unchanged ******************** #
+
+
+@scenario("The catalog doesn't re-probe unchanged files")
+def test_unchanged():
+    return
+
+
+@And("the catalog is updated again")
+def update_again(katamari, mocker):
+    katamari.probe = mocker.spy(katamari.catalog, "probe")
+    katamari.catalog.update(captures(katamari.directory))
+    return
+
+
+@then("none of the files are probed the second time")
+def check_not_probed(katamari):
+    expect(katamari.probe.call_count).to(equal(0))
+    return
+
+# ******************** grown ******************** #
+
+
+@scenario("The catalog walks a growing file from where it stopped")
+def test_grown():
+    return
+
+
+@And("packets are appended to a file")
+def append_packets(katamari):
+    path = katamari.directory/"channel_6.pcap02"
+    katamari.last = katamari.starts[-1] + 2 * PACKETS * SECOND
+    more = pcap_bytes([katamari.starts[-1] + PACKETS * SECOND, katamari.last])
+    with path.open("ab") as writer:
+        writer.write(more[24:])
+    return
+
+
+@then("the grown file's entry has all the packets")
+def check_grown(katamari):
+    expect(katamari.probe.call_count).to(equal(1))
+    entry = katamari.catalog.entries["channel_6.pcap02"]
+    expect(entry.packets).to(equal(PACKETS + 2))
+    expect(entry.last).to(equal(katamari.last))
+    return
+
+# ******************** deleted ******************** #
+
+
+@scenario("The catalog drops deleted files")
+def test_deleted():
+    return
+
+
+@And("a file is deleted")
+def delete_file(katamari):
+    (katamari.directory/"channel_6.pcap01").unlink()
+    return
+
+
+@then("the deleted file has no entry")
+def check_deleted(katamari):
+    expect(katamari.catalog.entries.get("channel_6.pcap01")).to(be_none)
+    expect(list(katamari.catalog.entries)).to(contain("channel_6.pcap00"))
+    return
+
+# ******************** filterer ******************** #
+
+
+@scenario("The filterer looks up the times in the catalog")
+def test_filterer():
+    return
+
+
+@when("the filterer uses the catalog with a time window")
+def filter_with_catalog(katamari):
+    filterer = FileFilterer(str(katamari.directory), "*",
+                            start=katamari.starts[1],
+                            end=katamari.starts[2] + PACKETS * SECOND,
+                            catalog=katamari.catalog)
+    katamari.actual = filterer.file_names
+    return
+
+
+@then("it gets the files inside the window")
+def check_filtered(katamari):
+    expect(katamari.actual).to(equal(
+        [str(katamari.directory/"channel_6.pcap01"),
+         str(katamari.directory/"channel_6.pcap02")]))
+    return
+
+
+@scenario("The filterer uses the catalog with the default times")
+def test_default_times():
+    return
+
+#  Given a directory of capture files
+
+
+@when("the filterer uses the catalog with the default times")
+def filter_default_times(katamari):
+    filterer = FileFilterer(str(katamari.directory), "*",
+                            start=parse_user_timestamp(GetDefaults.start),
+                            end=parse_user_timestamp(GetDefaults.end),
+                            catalog=katamari.catalog)
+    katamari.actual = filterer.file_names
+    return
+
+
+@then("it gets all the files")
+def check_all_files(katamari):
+    expect(katamari.actual).to(equal(
+        [str(katamari.directory/"channel_6.pcap{:02d}".format(index))
+         for index in range(3)]))
+    return
+
+# ******************** rollups ******************** #
+
+MINUTE = 60 * SECOND
+SIZE = 64
+
+
+@scenario("The catalog rolls the packets up per minute")
+def test_rollups():
+    return
+
+
+@given("a directory of busy capture files")
+def busy_directory(katamari, tmp_path):
+    """Two files, the first has one packet a second for a minute and a
+    burst of five in one second in the next minute, the second has two
+    packets a second in the minute after that"""
+    katamari.directory = tmp_path
+    katamari.base = EPOCH - EPOCH % MINUTE
+    first = ([katamari.base + second * SECOND for second in range(60)]
+             + [katamari.base + MINUTE + 10 * SECOND + packet * 1000
+                for packet in range(5)])
+    second = [katamari.base + 2 * MINUTE + tick * SECOND // 2
+              for tick in range(40)]
+    write_pcap(tmp_path/"channel_6.pcap00", first, size=SIZE)
+    write_pcap(tmp_path/"channel_6.pcap01", second, size=SIZE)
+    katamari.catalog = Catalog(str(tmp_path))
+    return
+
+#  When the catalog is updated
+
+
+@then("the timeline has the packets, bytes and peak for each minute")
+def check_timeline(katamari):
+    timeline = katamari.catalog.timeline(captures(katamari.directory))
+    base = katamari.base
+    expect(timeline).to(equal([
+        Bucket(base, 60, 60 * SIZE, 1),
+        Bucket(base + MINUTE, 5, 5 * SIZE, 5),
+        Bucket(base + 2 * MINUTE, 40, 40 * SIZE, 2)]))
+    return
+
+
+@then("the timeline adds up the minutes in buckets")
+def check_buckets(katamari):
+    timeline = katamari.catalog.timeline(captures(katamari.directory),
+                                         start=katamari.base + MINUTE + 1,
+                                         bucket=2 * MINUTE)
+    expect(timeline).to(equal([
+        Bucket(katamari.base, 5, 5 * SIZE, 5),
+        Bucket(katamari.base + 2 * MINUTE, 40, 40 * SIZE, 2)]))
+    return
+
+# ******************** growing rollups ******************** #
+
+
+@scenario("A growing file's rollups carry on from where they stopped")
+def test_growing_rollups():
+    return
+
+
+@And("packets in the same second are appended to a file")
+def append_same_second(katamari):
+    burst = katamari.base + MINUTE + 10 * SECOND
+    more = pcap_bytes([burst + 10000, burst + 20000,
+                       katamari.base + 3 * MINUTE], size=SIZE)
+    with (katamari.directory/"channel_6.pcap00").open("ab") as writer:
+        writer.write(more[24:])
+    return
+
+#  And the catalog is updated again
+
+
+@then("the rollups match a catalog that walked the whole file")
+def check_growing_rollups(katamari):
+    fresh = Catalog(str(katamari.directory),
+                    path=str(katamari.directory/"fresh.sqlite3"))
+    expected = fresh.timeline(captures(katamari.directory))
+    expect(katamari.probe.call_count).to(equal(1))
+    expect(katamari.catalog.timeline(captures(katamari.directory))).to(
+        equal(expected))
+    expect(expected[1]).to(equal(
+        Bucket(katamari.base + MINUTE, 7, 7 * SIZE, 7)))
+    return
+
+# ******************** rewritten ******************** #
+
+
+@scenario("A rewritten file's rollups are replaced")
+def test_rewritten():
+    return
+
+
+@And("a file is rewritten with fewer packets")
+def rewrite_file(katamari):
+    write_pcap(katamari.directory/"channel_6.pcap00",
+               [katamari.base + 5 * MINUTE], size=SIZE)
+    (katamari.directory/"channel_6.pcap01").unlink()
+    return
+
+#  And the catalog is updated again
+
+
+@then("the timeline only has the rewritten file's packets")
+def check_rewritten(katamari):
+    expect(katamari.catalog.timeline(captures(katamari.directory))).to(
+        equal([Bucket(katamari.base + 5 * MINUTE, 1, SIZE, 1)]))
+    rows = katamari.catalog.connection.execute(
+        "SELECT COUNT(*) FROM rollups").fetchone()
+    expect(rows).to(equal((1,)))
+    return
+
+# ******************** old catalog ******************** #
+
+
+@scenario("A catalog from before the rollups is probed again")
+def test_old_catalog():
+    return
+
+
+@And("the catalog is marked as an old one")
+def mark_old(katamari):
+    with katamari.catalog.connection as connection:
+        connection.execute("PRAGMA user_version = 0")
+    katamari.catalog.close()
+    return
+
+
+@then("re-opening it probes every file again")
+def check_reprobed(katamari, mocker):
+    catalog = Catalog(str(katamari.directory))
+    expect(catalog.entries).to(be_empty)
+    probe = mocker.spy(catalog, "probe")
+    catalog.update(captures(katamari.directory))
+    expect(probe.call_count).to(equal(2))
+    expect(len(catalog.timeline(captures(katamari.directory)))).to(equal(3))
+    return
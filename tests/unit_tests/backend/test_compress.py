@@ -0,0 +1,163 @@
+# coding=utf-8
+"""Multi-threaded output compression feature tests."""
+# python standard library
+from functools import partial
+import bz2
+import gzip
+import io
+import os
+import zipfile
+
+# from pypi
+from expects import (
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    write_pcap,
+)
+
+# software under test
+from packets.compress import (
+    Bz2Compressor,
+    GzipCompressor,
+    ZipCompressor,
+)
+from packets.get import Merger
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/compress.feature')
+
+BLOCK_SIZE = 2**12
+
+
+def compress(katamari, compressor):
+    """Writes the data to the compressor in pieces
+
+    Args:
+     katamari: object with the data
+     compressor: the compressor class to use
+    """
+    katamari.output = io.BytesIO()
+    with compressor(katamari.output, workers=4, block_size=BLOCK_SIZE,
+                    name="merged.pcap") as writer:
+        for start in range(0, len(katamari.data), 1000):
+            writer.write(katamari.data[start:start + 1000])
+    return
+
+# ******************** gzip ******************** #
+
+
+@scenario("The gzip compressor writes a single gzip file")
+def test_gzip():
+    return
+
+
+@given("data that spans many blocks")
+def many_blocks(katamari):
+    katamari.data = (os.urandom(10 * BLOCK_SIZE)
+                     + b"beacon" * (10 * BLOCK_SIZE) + os.urandom(100))
+    return
+
+
+@when("it is written to the gzip compressor")
+def gzip_it(katamari):
+    compress(katamari, GzipCompressor)
+    return
+
+
+@then("gzip decompresses it to the original data")
+def check_gzip(katamari):
+    output = katamari.output.getvalue()
+    expect(gzip.decompress(output)).to(equal(katamari.data))
+    expect(output.count(b"\x1f\x8b\x08")).to(equal(1))
+    return
+
+# ******************** bz2 ******************** #
+
+
+@scenario("The bz2 compressor writes a bzip2 file")
+def test_bz2():
+    return
+
+
+@when("it is written to the bz2 compressor")
+def bz2_it(katamari):
+    compress(katamari, Bz2Compressor)
+    return
+
+
+@then("bz2 decompresses it to the original data")
+def check_bz2(katamari):
+    expect(bz2.decompress(katamari.output.getvalue())).to(
+        equal(katamari.data))
+    return
+
+# ******************** zip ******************** #
+
+
+@scenario("The zip compressor writes a zip archive")
+def test_zip():
+    return
+
+
+@when("it is written to the zip compressor")
+def zip_it(katamari):
+    compress(katamari, ZipCompressor)
+    return
+
+
+@then("the zip archive has the original data")
+def check_zip(katamari):
+    archive = zipfile.ZipFile(io.BytesIO(katamari.output.getvalue()))
+    expect(archive.namelist()).to(equal(["merged.pcap"]))
+    expect(archive.testzip()).to(equal(None))
+    expect(archive.read("merged.pcap")).to(equal(katamari.data))
+    return
+
+# ******************** merger ******************** #
+
+
+@scenario("The Merger compresses its output")
+def test_merger():
+    return
+
+
+@given("a capture file and a compression")
+def capture_and_compression(katamari, tmp_path):
+    katamari.source = write_pcap(tmp_path/"channel_6.pcap00",
+                                 [EPOCH + index for index in range(1000)])
+    katamari.target = tmp_path/"output"/"merged.pcap"
+    return
+
+
+@when("the Merger is called with the compression")
+def call_compressed_merger(katamari):
+    katamari.merger = Merger([str(katamari.source)], str(katamari.target),
+                             compression="gzip", workers=2)
+    katamari.merger()
+    return
+
+
+@then("the target has the compression's suffix")
+def check_suffix(katamari):
+    expect(katamari.merger.target.name).to(equal("merged.pcap.gz"))
+    return
+
+
+@and_also("it decompresses to the merged packets")
+def check_decompressed(katamari):
+    expect(gzip.decompress(katamari.merger.target.read_bytes())).to(
+        equal(katamari.source.read_bytes()))
+    return
@@ -20,6 +20,10 @@ import pytest_bdd
 
 # testing help
 from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    write_pcap,
+)
 
 # software under test
 from packets.get import FileFilterer
@@ -173,3 +177,45 @@ def setup_non_string_source(katamari, mocker):
 
 #  When the user builds the bad GetPackets object
 #  Then a ConfigurationError is raised
+
+# ******************** workers ******************** #
+
+
+@scenario("The files are probed by a pool of workers")
+def test_workers():
+    return
+
+
+@given("a directory of captures and several workers")
+def setup_workers(katamari, tmp_path):
+    second = 10**9
+    katamari.arguments = build_arguments(
+        path=str(tmp_path),
+        start=EPOCH + 10 * second,
+        end=EPOCH + 70 * second)
+    katamari.arguments["workers"] = 4
+    katamari.expected = []
+    for index in range(10):
+        start = EPOCH + index * 10 * second
+        path = write_pcap(tmp_path/"channel_6.pcap{:02}".format(index),
+                          [start, start + 5 * second])
+        if 1 <= index <= 7:
+            katamari.expected.append(str(path))
+    return
+
+
+@when("the file filterer is built with a time window")
+def build_with_window(katamari):
+    katamari.filterer = FileFilterer(**katamari.arguments)
+    return
+
+#  And the file-names are retrieved
+
+
+@then("the files in the window are in a stable order")
+def check_stable_order(katamari):
+    expect(sorted(katamari.actual)).to(equal(katamari.expected))
+    expect(katamari.actual).to(equal(
+        [str(path) for path in katamari.filterer.path.glob("*")
+         if str(path) in katamari.expected]))
+    return
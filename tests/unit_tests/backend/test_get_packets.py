@@ -1,10 +1,11 @@
 # coding=utf-8
 """A packet retriever feature tests."""
 # python standard library
-from datetime import datetime
 from functools import partial
 from pathlib import Path
 import random
+import io
+import struct
 
 # from pypi
 import dateparser
@@ -24,10 +25,19 @@ import pytest_bdd
 
 # test-help
 from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    write_pcap,
+)
 
 # software under test
 from packets.get import GetPackets
 from packets.errors import ConfigurationError
+from packets.pcap import to_nanoseconds
+from packets.pcapng import (
+    PcapngFormat,
+    blocks,
+)
 
 And = when
 scenario = partial(pytest_bdd.scenario, '../../features/backend/get_packets.feature')
@@ -119,8 +129,8 @@ def set_start_time(katamari,faker):
 
 @then("the GetPackets object has the correct start time")
 def check_start_time(katamari):
-    expect(katamari.getter.start).to(be_a(datetime))
-    expect(katamari.getter.start).to(equal(katamari.start))
+    expect(katamari.getter.start).to(be_a(int))
+    expect(katamari.getter.start).to(equal(to_nanoseconds(katamari.start)))
     return
 
 # ********** bad start time ********** #
@@ -186,7 +196,7 @@ def set_end_time(katamari, faker):
 
 @then("the GetPackets object has the correct end time")
 def check_end_time(katamari):
-    expect(katamari.getter.end).to(equal(katamari.end))
+    expect(katamari.getter.end).to(equal(to_nanoseconds(katamari.end)))
     return
 
 # ********** un-parseable ********** #
@@ -243,3 +253,59 @@ def check_get_packets_values(katamari):
     for attribute, expected in katamari.expected.items():
         expect(getattr(katamari.getter, attribute)).to(equal(expected))
     return
+
+# ******************** several sources ******************** #
+
+
+@scenario("The user merges several sources with their packets tagged")
+def test_several_sources():
+    return
+
+
+@given("channel directories with interleaved packets")
+def channel_directories(katamari, tmp_path):
+    katamari.channels = ["channel_1", "channel_6", "channel_11"]
+    katamari.sources = []
+    katamari.expected = []
+    for index, channel in enumerate(katamari.channels):
+        source = tmp_path/channel
+        source.mkdir()
+        timestamps = [EPOCH + (packet * 3 + index) * 10**9
+                      for packet in range(10)]
+        write_pcap(source/"{}.pcap0".format(channel), timestamps[:5])
+        write_pcap(source/"{}.pcap1".format(channel), timestamps[5:])
+        katamari.sources.append(str(source))
+        katamari.expected.extend((timestamp, index)
+                                 for timestamp in timestamps)
+    katamari.expected.sort()
+    katamari.target = tmp_path/"merged.pcapng"
+    return
+
+
+@when("the user gets the packets from all of them with tags")
+def get_tagged(katamari):
+    GetPackets(source=katamari.sources, target=str(katamari.target),
+               start=None, end=None, catalog=False, tag=True)()
+    with katamari.target.open("rb") as stream:
+        katamari.blocks = list(blocks(stream))
+    return
+
+
+@then("the output has an interface named after each channel")
+def check_interfaces(katamari):
+    names = [block.body[12:12 + block.body[10]].decode()
+             for block in katamari.blocks
+             if block.type == PcapngFormat.interface_description]
+    expect(names).to(equal(katamari.channels))
+    return
+
+
+@then("the packets are in time order with their channel's interface")
+def check_tagged_packets(katamari):
+    packets = []
+    for block in katamari.blocks:
+        if block.type == PcapngFormat.enhanced_packet:
+            interface, high, low = struct.unpack("<III", block.body[:12])
+            packets.append((((high << 32) + low) * 1000, interface))
+    expect(packets).to(equal(katamari.expected))
+    return
@@ -0,0 +1,162 @@
+# coding=utf-8
+"""Process-wide logging feature tests."""
+# python standard library
+from functools import partial
+import logging
+import time
+
+# from pypi
+from expects import (
+    be_below,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import OUTPUT
+
+# software under test
+from packets.base import (
+    LoggingHandler,
+    configure_logging,
+)
+from packets.get import CaptureInfo
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/logging.feature')
+
+
+class LoggingBudget:
+    """Most microseconds of logging per file (when debug is off)"""
+    per_file = 20
+    files = 10000
+
+
+@pytest.fixture
+def root_logger():
+    """Puts the root logger back the way it was after the test"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    handler = LoggingHandler.handler
+    LoggingHandler.handler = None
+    yield root
+    root.handlers = handlers
+    root.setLevel(level)
+    LoggingHandler.handler = handler
+    return
+
+
+def log_probe(path):
+    """The logging that probing a capture with capinfos does
+
+    Args:
+     path (str): path for the capture
+
+    Returns:
+     CaptureInfo: the capture that logged
+    """
+    capture = CaptureInfo(path)
+    capture.logger.debug("Probing %s", path)
+    capture.logger.debug("Running: '%s'", capture.command)
+    capture.logger.debug("'%s' output:\n%s", capture.command, OUTPUT)
+    return capture
+
+# ******************** once ******************** #
+
+
+@scenario("Logging is configured once per process")
+def test_once():
+    return
+
+
+@given("the root logger's handlers")
+def root_handlers(katamari, root_logger):
+    katamari.root = root_logger
+    katamari.handlers = list(root_logger.handlers)
+    return
+
+
+@when("logging is configured twice")
+def configure_twice(katamari):
+    configure_logging("debug")
+    configure_logging("error")
+    return
+
+
+@then("there is one more handler")
+def check_one_handler(katamari):
+    expect(katamari.root.handlers).to(
+        equal(katamari.handlers + [LoggingHandler.handler]))
+    return
+
+
+@and_also("the level is the last one configured")
+def check_level(katamari):
+    expect(katamari.root.level).to(equal(logging.ERROR))
+    return
+
+# ******************** objects ******************** #
+
+
+@scenario("The objects don't configure logging")
+def test_objects():
+    return
+
+
+@when("many captures log debug messages")
+def many_captures(katamari):
+    for index in range(100):
+        log_probe("channel_{}.pcap".format(index))
+    return
+
+
+@then("the handlers haven't changed")
+def check_handlers(katamari):
+    expect(katamari.root.handlers).to(equal(katamari.handlers))
+    return
+
+# ******************** overhead ******************** #
+
+
+@scenario("Disabled debug messages cost little per file")
+def test_overhead():
+    return
+
+
+@given("logging configured to show warnings")
+def configure_warnings(katamari, root_logger):
+    configure_logging("warning")
+    return
+
+
+@when("the per-file logging overhead is measured")
+def measure_overhead(katamari):
+    paths = ["channel_{}.pcap".format(index)
+             for index in range(LoggingBudget.files)]
+    started = time.perf_counter()
+    for path in paths:
+        CaptureInfo(path)
+    baseline = time.perf_counter() - started
+    started = time.perf_counter()
+    for path in paths:
+        log_probe(path)
+    logged = time.perf_counter() - started
+    katamari.per_file = 10**6 * (logged - baseline) / LoggingBudget.files
+    print("Logging overhead: {:.2f} microseconds per file".format(
+        katamari.per_file))
+    return
+
+
+@then("it is within the budget")
+def check_overhead(katamari):
+    expect(katamari.per_file).to(be_below(LoggingBudget.per_file))
+    return
@@ -0,0 +1,736 @@
+# coding=utf-8
+"""A native packet merger feature tests."""
+# python standard library
+from functools import partial
+from pathlib import Path
+import gzip
+import io
+
+# from pypi
+from expects import (
+    be_above,
+    be_below_or_equal,
+    be_true,
+    be_none,
+    contain,
+    equal,
+    expect,
+    raise_error,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    pcap_header,
+    pcap_record,
+    pcapng_interface,
+    pcapng_packet,
+    pcapng_section,
+    write_pcap,
+)
+
+# software under test
+from packets.get import (
+    ChunkedOutput,
+    Merger,
+)
+from packets.errors import ConfigurationError
+from packets.merge import (
+    Deduplicator,
+    MemoryBudget,
+    MergeEngine,
+    ReadAhead,
+    TreeMerge,
+)
+from packets.pcap import (
+    Interface,
+    PcapReader,
+    Record,
+)
+from packets.pcapng import PcapngReader
+
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/merge.feature')
+
+SECOND = 10**9
+
+
+def merged_timestamps(katamari):
+    """Reads back the timestamps of the merged file
+
+    Args:
+     katamari: object with the output path
+
+    Returns:
+     list: timestamps of the merged packets
+    """
+    katamari.target.write_bytes(katamari.output.getvalue())
+    return [record.timestamp
+            for record in PcapReader(str(katamari.target)).records()]
+
+# ******************** time order ******************** #
+
+
+@scenario("The packets from several files are merged in time order")
+def test_time_order():
+    return
+
+
+@given("capture files with interleaved packets")
+def interleaved(katamari, tmp_path):
+    katamari.target = tmp_path/"merged.pcap"
+    katamari.files = []
+    katamari.timestamps = []
+    for index in range(3):
+        timestamps = [EPOCH + (packet * 3 + index) * SECOND
+                      for packet in range(10)]
+        katamari.timestamps.extend(timestamps)
+        katamari.files.append(str(write_pcap(
+            tmp_path/"channel_{}.pcap".format(index), timestamps)))
+    katamari.timestamps.sort()
+    return
+
+
+@when("the files are merged")
+def merge(katamari):
+    katamari.output = io.BytesIO()
+    MergeEngine(katamari.files)(katamari.output)
+    katamari.expected = katamari.timestamps
+    return
+
+
+@then("the output has all the packets in time order")
+def check_time_order(katamari):
+    expect(merged_timestamps(katamari)).to(equal(katamari.expected))
+    return
+
+# ******************** window ******************** #
+
+
+@scenario("Packets outside of the window are dropped")
+def test_window():
+    return
+
+
+@when("the files are merged with a time window")
+def merge_window(katamari):
+    start, end = EPOCH + 5 * SECOND, EPOCH + 20 * SECOND
+    katamari.output = io.BytesIO()
+    MergeEngine(katamari.files, start=start, end=end)(katamari.output)
+    katamari.expected = [timestamp for timestamp in katamari.timestamps
+                         if start <= timestamp <= end]
+    return
+
+
+@then("the output only has the packets in the window")
+def check_window(katamari):
+    expect(merged_timestamps(katamari)).to(equal(katamari.expected))
+    return
+
+# ******************** precision ******************** #
+
+
+@scenario("Microsecond and nanosecond files are merged")
+def test_precision():
+    return
+
+
+@given("a microsecond and a nanosecond capture file")
+def mixed_precision(katamari, tmp_path):
+    katamari.target = tmp_path/"merged.pcap"
+    microseconds = [EPOCH + index * SECOND for index in range(5)]
+    nanoseconds = [EPOCH + index * SECOND + 7 for index in range(5)]
+    katamari.files = [
+        str(write_pcap(tmp_path/"micro.pcap", microseconds)),
+        str(write_pcap(tmp_path/"nano.pcap", nanoseconds, byte_order=">",
+                       nanoseconds=True))]
+    katamari.timestamps = sorted(microseconds + nanoseconds)
+    return
+
+#  When the files are merged
+#  Then the output has all the packets in time order
+
+# ******************** fallback ******************** #
+
+
+@scenario("The Merger falls back to mergecap")
+def test_fallback():
+    return
+
+
+@given("a capture file the native reader can't read")
+def unreadable(katamari, tmp_path):
+    other = tmp_path/"channel_6.erf"
+    other.write_bytes(bytes(64))
+    katamari.files = [str(write_pcap(tmp_path/"wifi.pcap", [EPOCH])),
+                      str(other)]
+    katamari.target = tmp_path/"merged.pcap"
+    return
+
+
+@when("the Merger is called")
+def call_merger(katamari, mocker):
+    katamari.subprocess = mocker.patch("packets.get.subprocess")
+    Merger(katamari.files, str(katamari.target))()
+    return
+
+
+@then("it runs mergecap")
+def check_mergecap(katamari):
+    command = katamari.subprocess.run.call_args[0][0]
+    expect(command[0]).to(equal("mergecap"))
+    expect(command).to(contain(*katamari.files))
+    return
+
+# ******************** gzip ******************** #
+
+
+@scenario("Gzipped captures are merged")
+def test_gzip():
+    return
+
+
+@given("gzipped capture files with interleaved packets")
+def gzipped(katamari, tmp_path):
+    interleaved(katamari, tmp_path)
+    for name in katamari.files:
+        path = Path(name)
+        path.write_bytes(gzip.compress(path.read_bytes()))
+    return
+
+#  When the files are merged
+#  Then the output has all the packets in time order
+
+# ******************** stdout ******************** #
+
+
+@scenario("The Merger streams to stdout in bounded chunks")
+def test_stdout():
+    return
+
+
+@when("the Merger is called with '-' as the target")
+def merge_to_stdout(katamari, mocker):
+    katamari.stdout = io.BytesIO()
+    katamari.writes = mocker.spy(katamari.stdout, "write")
+    mocker.patch("packets.get.sys.stdout", mocker.MagicMock(
+        buffer=katamari.stdout))
+    katamari.chunk_size = 256
+    mocker.patch("packets.get.ChunkedOutput",
+                 partial(ChunkedOutput, chunk_size=katamari.chunk_size))
+    Merger(katamari.files, "-")()
+    katamari.output = katamari.stdout
+    katamari.expected = katamari.timestamps
+    return
+
+
+@then("stdout has all the packets in time order")
+def check_stdout(katamari):
+    check_time_order(katamari)
+    return
+
+
+@then("stdout was written in bounded chunks")
+def check_chunks(katamari):
+    sizes = [len(call.args[0]) for call in katamari.writes.call_args_list]
+    expect(len(sizes)).to(be_above(1))
+    for size in sizes:
+        expect(size).to(be_below_or_equal(2 * katamari.chunk_size))
+    return
+
+# ******************** broken pipe ******************** #
+
+
+@scenario("The Merger stops quietly when the reader closes stdout")
+def test_broken_pipe():
+    return
+
+
+@when("the Merger streams to a closed pipe")
+def merge_to_closed_pipe(katamari, mocker):
+    stdout = mocker.MagicMock()
+    stdout.buffer.write.side_effect = BrokenPipeError
+    mocker.patch("packets.get.sys.stdout", stdout)
+    katamari.stop = mocker.patch.object(Merger, "stop_streaming")
+    katamari.outcome = Merger(katamari.files, "-")()
+    return
+
+
+@then("the merge stops without an error")
+def check_stopped(katamari):
+    expect(katamari.outcome).to(be_none)
+    katamari.stop.assert_called_once_with()
+    return
+
+# ******************** channels ******************** #
+
+
+@scenario("Channels are merged on their own threads")
+def test_channels():
+    return
+
+#  Given capture files with interleaved packets
+
+
+@when("the files are merged as separate channels")
+def merge_channels(katamari):
+    katamari.output = io.BytesIO()
+    channels = {path: Path(path).stem for path in katamari.files}
+    MergeEngine(katamari.files, channels=channels)(katamari.output)
+    katamari.expected = katamari.timestamps
+    return
+
+#  Then the output has all the packets in time order
+
+# ******************** read-ahead errors ******************** #
+
+
+@scenario("A channel's read errors reach the merge")
+def test_read_ahead_error():
+    return
+
+
+@given("a channel whose reader fails")
+def failing_channel(katamari):
+    def records():
+        yield from range(1000)
+        raise OSError("the disk went away")
+    katamari.records = records()
+    return
+
+
+@when("its records are read ahead")
+def read_ahead(katamari):
+    katamari.read = lambda: list(ReadAhead(katamari.records, batch=10,
+                                           batches=2))
+    return
+
+
+@then("the reader's error is raised")
+def check_read_ahead_error(katamari):
+    expect(katamari.read).to(raise_error(OSError, "the disk went away"))
+    return
+
+# ******************** tree-merge ******************** #
+
+
+@scenario("Many files are merged in levels")
+def test_tree_merge():
+    return
+
+
+@given("many capture files with interleaved packets")
+def many_files(katamari, tmp_path):
+    katamari.directory = tmp_path
+    katamari.target = tmp_path/"merged"/"merged.pcap"
+    katamari.files = []
+    katamari.timestamps = []
+    for index in range(11):
+        timestamps = [EPOCH + (packet * 11 + index) * SECOND
+                      for packet in range(5)]
+        katamari.timestamps.extend(timestamps)
+        katamari.files.append(str(write_pcap(
+            tmp_path/"channel_{}.pcap{}".format(index % 2, index),
+            timestamps)))
+    katamari.timestamps.sort()
+    return
+
+
+@when("the Merger is called with a small fan-in and a time window")
+def tree_merge(katamari):
+    start, end = EPOCH + 7 * SECOND, EPOCH + 40 * SECOND
+    Merger(katamari.files, str(katamari.target), start=start, end=end,
+           workers=2, fan_in=3)()
+    katamari.output = io.BytesIO(katamari.target.read_bytes())
+    katamari.expected = [timestamp for timestamp in katamari.timestamps
+                         if start <= timestamp <= end]
+    return
+
+#  Then the output only has the packets in the window
+
+
+@then("the intermediate files are gone")
+def check_intermediates(katamari):
+    expect([path.name for path in katamari.target.parent.iterdir()]).to(
+        equal([katamari.target.name]))
+    return
+
+# ******************** groups ******************** #
+
+
+@scenario("The merge groups are bounded by the fan-in")
+def test_tree_groups():
+    return
+
+
+@when("the files are grouped for a tree-merge")
+def tree_groups(katamari):
+    katamari.fan_in = 4
+    katamari.channels = {path: Path(path).stem for path in katamari.files}
+    katamari.groups = TreeMerge(katamari.files, str(katamari.directory),
+                                katamari.fan_in,
+                                channels=katamari.channels).groups(
+                                    katamari.files)
+    return
+
+
+@then("no group has more files than the fan-in")
+def check_group_sizes(katamari):
+    expect(sorted(path for _, group in katamari.groups
+                  for path in group)).to(equal(sorted(katamari.files)))
+    for _, group in katamari.groups:
+        expect(len(group)).to(be_below_or_equal(katamari.fan_in))
+    return
+
+
+@then("the groups don't mix channels")
+def check_group_channels(katamari):
+    for channel, group in katamari.groups:
+        expect(set(katamari.channels[path] for path in group)).to(
+            equal({channel}))
+    return
+
+# ******************** bounded ******************** #
+
+
+@scenario("A long rotation is merged with few files open")
+def test_bounded_rotation():
+    return
+
+
+@given("a long rotation of capture files")
+def long_rotation(katamari, tmp_path):
+    katamari.target = tmp_path/"merged.pcap"
+    katamari.files = []
+    katamari.timestamps = []
+    for index in range(30):
+        timestamps = [EPOCH + (index * 10 + packet) * SECOND
+                      for packet in range(10)]
+        katamari.timestamps.extend(timestamps)
+        katamari.files.append(str(write_pcap(
+            tmp_path/"channel_6.pcap{:02d}".format(index), timestamps)))
+    return
+
+
+@when("the files are merged with small buffers")
+def bounded_merge(katamari):
+    katamari.output = io.BytesIO()
+    katamari.engine = MergeEngine(list(reversed(katamari.files)),
+                                  buffer_size=4096)
+    katamari.engine(katamari.output)
+    katamari.expected = katamari.timestamps
+    return
+
+#  Then the output has all the packets in time order
+
+
+@then("no more than one file was open at a time")
+def check_open_files(katamari):
+    expect(katamari.engine.most_open).to(equal(1))
+    return
+
+# ******************** levels ******************** #
+
+
+@scenario("Too many overlapping files are merged in levels")
+def test_bounded_levels():
+    return
+
+#  Given many capture files with interleaved packets
+
+
+@when("the Merger is called with a limit on the open files")
+def merge_with_file_limit(katamari, mocker):
+    katamari.tree_merge = mocker.spy(Merger, "tree_merge")
+    Merger(katamari.files, str(katamari.target), max_files=4, workers=1)()
+    katamari.output = io.BytesIO(katamari.target.read_bytes())
+    katamari.expected = katamari.timestamps
+    return
+
+#  Then the output has all the packets in time order
+
+
+@then("the files were merged in levels")
+def check_levels(katamari):
+    expect(katamari.tree_merge.called).to(be_true)
+    return
+
+# ******************** budget ******************** #
+
+
+@scenario("The memory budget decides how many files are open")
+def test_budget():
+    return
+
+#  Given a long rotation of capture files
+
+
+@when("the memory budget is worked out")
+def work_out_budget(katamari):
+    katamari.readers = MergeEngine(katamari.files).readers
+    katamari.per_file = 2**16 + 262144
+    katamari.budget = MemoryBudget(2**20 + 5 * katamari.per_file,
+                                   reserve=2**20)
+    katamari.limits = katamari.budget(katamari.readers)
+    return
+
+
+@then("the files and their buffers fit in the budget")
+def check_budget(katamari):
+    expect(katamari.limits).to(equal((5, 2**16)))
+    return
+
+
+@then("a budget too small for two files is an error")
+def check_small_budget(katamari):
+    budget = MemoryBudget(2**20 + 262144, reserve=2**20)
+    expect(lambda: budget(katamari.readers)).to(
+        raise_error(ConfigurationError))
+    return
+
+# ******************** dedupe ******************** #
+
+RADIOTAP = 127
+
+
+def wifi_frame(sequence, retry=False):
+    """Builds an 802.11 data frame
+
+    Args:
+     sequence (int): the frame's sequence number (makes it unique)
+     retry (bool): set the retry flag (as a retransmission would)
+
+    Returns:
+     bytes: the frame
+    """
+    return (bytes((0x08, 0x08 if retry else 0x00)) + bytes(2)
+            + bytes(range(18)) + sequence.to_bytes(2, "little")
+            + b"payload" * 4)
+
+
+def radiotap(frame, channel, tsft=False, fcs=False):
+    """Puts a radiotap header (and maybe an FCS) around a frame
+
+    Args:
+     frame (bytes): the 802.11 frame
+     channel (int): the frequency for the channel field
+     tsft (bool): add a TSFT field (it comes before the flags)
+     fcs (bool): add an FCS (and say so in the flags)
+
+    Returns:
+     bytes: the packet
+    """
+    present = 0b1010 | (0b1 if tsft else 0)
+    fields = (channel.to_bytes(8, "little") if tsft else b"")
+    fields += bytes((0x10 if fcs else 0, 0)) + channel.to_bytes(2, "little")
+    fields += bytes(2)
+    length = 8 + len(fields)
+    header = (bytes((0, 0)) + length.to_bytes(2, "little")
+              + present.to_bytes(4, "little"))
+    return header + fields + frame + (channel.to_bytes(4, "little")
+                                      if fcs else b"")
+
+
+def write_frames(path, packets):
+    """Writes a radiotap capture
+
+    Args:
+     path (Path): where to write it
+     packets (list): (timestamp, data) for each packet
+
+    Returns:
+     str: the path
+    """
+    path.write_bytes(pcap_header(linktype=RADIOTAP) + b"".join(
+        pcap_record(timestamp, data) for timestamp, data in packets))
+    return str(path)
+
+
+@scenario("Duplicate frames from neighbouring channels are dropped")
+def test_dedupe():
+    return
+
+
+@given("two channels that caught some of the same frames")
+def overlapping_channels(katamari, tmp_path):
+    """Channel 6 has frames 0-9, channel 11 leaked frames 2, 4 and 6 a few
+    microseconds later (with their own radiotap header and an FCS), frame 8
+    is retransmitted on channel 6 a millisecond later, and channel 11 has
+    frames 100-104 to itself"""
+    katamari.target = tmp_path/"merged.pcap"
+    six, eleven = tmp_path/"channel_6", tmp_path/"channel_11"
+    six.mkdir()
+    eleven.mkdir()
+    ms = SECOND // 1000
+    sixes = [(EPOCH + index * 10 * ms, radiotap(wifi_frame(index), 2437))
+             for index in range(10)]
+    sixes.append((EPOCH + 81 * ms, radiotap(wifi_frame(8, retry=True),
+                                            2437)))
+    sixes.sort()
+    leaked = [(EPOCH + index * 10 * ms + 3000,
+               radiotap(wifi_frame(index), 2462, tsft=True, fcs=True))
+              for index in (2, 4, 6)]
+    own = [(EPOCH + index * ms + 5000, radiotap(wifi_frame(index), 2462))
+           for index in range(100, 105)]
+    katamari.channels = {
+        write_frames(six/"channel_6.pcap0", sixes): "channel_6",
+        write_frames(eleven/"channel_11.pcap0",
+                     sorted(leaked + own)): "channel_11"}
+    retransmitted = sixes.pop(9)
+    katamari.dropped = [data for _, data in leaked] + [retransmitted[1]]
+    katamari.kept = sorted(sixes + own)
+    return
+
+
+@when("the channels are merged with dedupe")
+def merge_dedupe(katamari):
+    katamari.merger = Merger(list(katamari.channels), str(katamari.target),
+                             channels=katamari.channels, dedupe=0.1)
+    katamari.merger()
+    return
+
+
+@then("only the first copy of each frame is kept")
+def check_first_copies(katamari):
+    records = [(record.timestamp, bytes(record.data))
+               for record in PcapReader(str(katamari.target)).records()]
+    expect(records).to(equal(katamari.kept))
+    return
+
+
+@then("the removed bytes are counted")
+def check_removed_bytes(katamari):
+    deduplicator = katamari.merger.deduplicator
+    expect(deduplicator.dropped).to(equal(4))
+    expect(deduplicator.bytes).to(equal(sum(len(data)
+                                            for data in katamari.dropped)))
+    return
+
+# ******************** window ******************** #
+
+
+@scenario("Copies outside of the dedupe window are kept")
+def test_dedupe_window():
+    return
+
+
+@given("frames that repeat after longer than the window")
+def repeating_frames(katamari):
+    frames = [bytes([index]) * 60 for index in range(4)]
+    katamari.records = [Record(EPOCH + offset, 60, None, frames[index])
+                        for offset, index in (
+                            (0, 0), (1, 0),           # a duplicate
+                            (2 * SECOND, 0),          # past the window
+                            (2 * SECOND + 1, 1),
+                            (2 * SECOND + 2, 2),
+                            (2 * SECOND + 3, 3),
+                            (2 * SECOND + 4, 1))]     # forgotten early
+    return
+
+
+@when("the frames are deduplicated with a small memory")
+def small_memory(katamari):
+    katamari.deduplicator = Deduplicator(1.0, frames=2)
+    katamari.kept = list(katamari.deduplicator(katamari.records, {None: 1}))
+    return
+
+
+@then("the repeats the window forgot are kept")
+def check_forgotten(katamari):
+    expect([record.timestamp - EPOCH for record in katamari.kept]).to(equal(
+        [0, 2 * SECOND, 2 * SECOND + 1, 2 * SECOND + 2, 2 * SECOND + 3,
+         2 * SECOND + 4]))
+    expect(katamari.deduplicator.dropped).to(equal(1))
+    return
+
+# ******************** pcapng ******************** #
+
+
+def write_pcapng(path, packets, ethernet=True):
+    """Writes a pcapng file with a nanosecond wlan0 and microsecond eth0
+
+    Args:
+     path (Path): where to write the file
+     packets (list): (epoch nanoseconds, interface) for each packet
+     ethernet (bool): describe the eth0 interface
+
+    Returns:
+     Path: the path to the file
+    """
+    blocks = [pcapng_section(),
+              pcapng_interface(127, name="wlan0", resolution=9)]
+    if ethernet:
+        blocks.append(pcapng_interface(1, name="eth0"))
+    blocks.extend(pcapng_packet(timestamp, bytes(60), interface=interface,
+                                resolution=9 if interface == 0 else None)
+                  for timestamp, interface in packets)
+    path.write_bytes(b"".join(blocks))
+    return path
+
+
+@scenario("pcap and pcapng files are merged into one pcap")
+def test_pcap_and_pcapng():
+    return
+
+
+@given("a pcap file and a pcapng file with the same link-type")
+def pcap_and_pcapng(katamari, tmp_path):
+    katamari.target = tmp_path/"merged.pcap"
+    microseconds = [EPOCH + index * SECOND for index in range(5)]
+    nanoseconds = [EPOCH + index * SECOND + 7 for index in range(5)]
+    katamari.files = [
+        str(write_pcap(tmp_path/"micro.pcap", microseconds)),
+        str(write_pcapng(tmp_path/"dumpcap.pcapng",
+                         [(timestamp, 0) for timestamp in nanoseconds],
+                         ethernet=False))]
+    katamari.timestamps = sorted(microseconds + nanoseconds)
+    return
+
+#  When the files are merged
+#  Then the output has all the packets in time order
+
+
+@scenario("Files with different link-types are merged into pcapng")
+def test_mixed_linktypes():
+    return
+
+
+@given("a pcap file and a pcapng file with two link-types")
+def mixed_linktypes(katamari, tmp_path):
+    katamari.target = tmp_path/"merged.pcapng"
+    pcap = [EPOCH + index * SECOND for index in range(5)]
+    pcapng = [(EPOCH + index * SECOND // 2 + 7 * (1 - index % 2), index % 2)
+              for index in range(10)]
+    katamari.files = [
+        str(write_pcap(tmp_path/"wifi.pcap", pcap)),
+        str(write_pcapng(tmp_path/"dumpcap.pcapng", pcapng))]
+    katamari.timestamps = sorted(pcap + [timestamp
+                                         for timestamp, _ in pcapng])
+    return
+
+
+@then("the output is pcapng with an interface for each link-type")
+def check_pcapng_interfaces(katamari):
+    katamari.target.write_bytes(katamari.output.getvalue())
+    katamari.reader = PcapngReader(str(katamari.target))
+    expect(katamari.reader.interfaces).to(equal(
+        [Interface(None, 127, 262144), Interface("wlan0", 127, 262144),
+         Interface("eth0", 1, 262144)]))
+    return
+
+
+@then("the pcapng output has all the packets in time order")
+def check_pcapng_order(katamari):
+    records = list(katamari.reader.records())
+    expect([record.timestamp for record in records]).to(equal(
+        katamari.timestamps))
+    expect(sorted(set(record.interface for record in records))).to(equal(
+        [0, 1, 2]))
+    return
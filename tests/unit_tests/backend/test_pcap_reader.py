@@ -0,0 +1,308 @@
+# coding=utf-8
+"""A native pcap reader feature tests."""
+# python standard library
+from functools import partial
+import gzip
+import io
+import os
+import time
+
+# from pypi
+from expects import (
+    be_a,
+    be_below,
+    be_none,
+    contain,
+    equal,
+    expect,
+    raise_error,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    pcap_bytes,
+    write_pcap,
+)
+
+# software under test
+from packets.pcap import (
+    PcapFormat,
+    PcapReader,
+    PcapWriter,
+    )
+from packets.errors import CaptureFormatError
+
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/pcap_reader.feature')
+
+# ******************** timestamps ******************** #
+
+
+@scenario("The reader gets the first and last timestamps")
+def test_timestamps():
+    return
+
+
+@given("a pcap file with many packets")
+def many_packets(katamari, tmp_path):
+    katamari.timestamps = [EPOCH + index * 1000 for index in range(5000)]
+    katamari.path = write_pcap(tmp_path/"channel_6.pcap00",
+                               katamari.timestamps, size=100)
+    return
+
+
+@when("the reader gets the timestamps")
+def get_timestamps(katamari):
+    reader = PcapReader(str(katamari.path))
+    katamari.first = reader.first
+    katamari.last = reader.last
+    return
+
+
+@then("they are the first and last packet times")
+def check_timestamps(katamari):
+    expect(katamari.first).to(equal(katamari.timestamps[0]))
+    expect(katamari.last).to(equal(katamari.timestamps[-1]))
+    return
+
+# ********** big-endian ********** #
+
+
+@scenario("The reader handles big-endian nanosecond files")
+def test_big_endian():
+    return
+
+
+@given("a big-endian nanosecond pcap file")
+def big_endian(katamari, tmp_path):
+    katamari.timestamps = [EPOCH + index * 7 for index in range(3)]
+    katamari.path = write_pcap(tmp_path/"big.pcap", katamari.timestamps,
+                               byte_order=">", nanoseconds=True)
+    return
+
+#  When the reader gets the timestamps
+#  Then they are the first and last packet times
+
+# ********** truncated ********** #
+
+
+@scenario("The reader handles a truncated last packet")
+def test_truncated():
+    return
+
+
+@given("a pcap file with a truncated last packet")
+def truncated(katamari, tmp_path):
+    timestamps = [EPOCH + index * 1000 for index in range(10000)]
+    katamari.timestamps = timestamps[:-1]
+    katamari.path = tmp_path/"truncated.pcap"
+    katamari.path.write_bytes(pcap_bytes(timestamps, size=50)[:-10])
+    return
+
+#  When the reader gets the timestamps
+#  Then they are the first and last packet times
+
+# ********** empty ********** #
+
+
+@scenario("The reader handles an empty capture")
+def test_empty():
+    return
+
+
+@given("a pcap file with no packets")
+def empty(katamari, tmp_path):
+    katamari.path = write_pcap(tmp_path/"empty.pcap", [])
+    return
+
+#  When the reader gets the timestamps
+
+
+@then("there are no timestamps")
+def check_no_timestamps(katamari):
+    expect(katamari.first).to(be_none)
+    expect(katamari.last).to(be_none)
+    return
+
+# ********** not pcap ********** #
+
+
+@scenario("The reader is given something that isn't a pcap file")
+def test_not_pcap():
+    return
+
+
+@given("a file that isn't a pcap file")
+def not_pcap(katamari, tmp_path):
+    katamari.path = tmp_path/"notes.txt"
+    katamari.path.write_text("First packet time: yesterday\n" * 3)
+    return
+
+
+@when("the reader reads the bad file")
+def read_bad_file(katamari):
+    def bad_call():
+        PcapReader(str(katamari.path)).first
+        return
+    katamari.bad_call = bad_call
+    return
+
+
+@then("a CaptureFormatError is raised")
+def check_format_error(katamari):
+    expect(katamari.bad_call).to(raise_error(CaptureFormatError))
+    return
+
+# ******************** records ******************** #
+
+
+@scenario("The reader gets all the records")
+def test_records():
+    return
+
+#  Given a pcap file with many packets
+
+
+@when("the reader gets the records")
+def get_records(katamari):
+    katamari.records = list(PcapReader(str(katamari.path)).records())
+    return
+
+
+@then("the records have the packet times")
+def check_records(katamari):
+    expect([record.timestamp for record in katamari.records]).to(
+        equal(katamari.timestamps))
+    return
+
+# ******************** gzip ******************** #
+
+
+@scenario("The reader handles gzipped captures")
+def test_gzip():
+    return
+
+
+@given("a gzipped pcap file")
+def gzipped(katamari, tmp_path):
+    katamari.timestamps = [EPOCH + index * 1000 for index in range(5000)]
+    katamari.path = tmp_path/"channel_6.pcap00.gz"
+    katamari.path.write_bytes(gzip.compress(pcap_bytes(katamari.timestamps)))
+    return
+
+#  When the reader gets the timestamps
+#  Then they are the first and last packet times
+
+# ********** partial gzip ********** #
+
+
+@scenario("The reader handles a gzipped capture that is still being compressed")
+def test_partial_gzip():
+    return
+
+
+@given("a gzipped pcap file that stops part-way through")
+def partial_gzip(katamari, tmp_path):
+    katamari.timestamps = [EPOCH + index * 1000 for index in range(20000)]
+    compressed = gzip.compress(pcap_bytes(katamari.timestamps))
+    katamari.path = tmp_path/"channel_6.pcap00.gz"
+    katamari.path.write_bytes(compressed[:len(compressed)//2])
+    return
+
+
+@then("the last timestamp is the last complete packet")
+def check_partial(katamari):
+    expect(katamari.first).to(equal(katamari.timestamps[0]))
+    expect(katamari.timestamps).to(contain(katamari.last))
+    expect(katamari.last).to(be_below(katamari.timestamps[-1]))
+    return
+
+# ******************** memory-map ******************** #
+
+
+@scenario("The reader maps uncompressed captures without copying the packets")
+def test_mapped():
+    return
+
+@given("a pcap file with many packets that hasn't changed for a while")
+def settled(katamari, tmp_path):
+    many_packets(katamari, tmp_path)
+    then = time.time() - 3600
+    os.utime(str(katamari.path), (then, then))
+    return
+
+
+@when("the records are written straight out")
+def write_records(katamari):
+    reader = PcapReader(str(katamari.path))
+    katamari.output = io.BytesIO()
+    writer = PcapWriter(katamari.output, reader.header)
+    writer.write_header()
+    katamari.records = []
+    for record in reader.records():
+        katamari.records.append(record)
+        writer.write(record)
+    return
+
+
+@then("the records are views of the file")
+def check_views(katamari):
+    for record in katamari.records:
+        expect(record.header).to(be_a(memoryview))
+        expect(record.data).to(be_a(memoryview))
+    return
+
+
+@then("the output is the same as the file")
+def check_output(katamari):
+    expect(katamari.output.getvalue()).to(
+        equal(katamari.path.read_bytes()))
+    return
+
+
+@scenario("The reader doesn't map a capture that's still being written")
+def test_not_mapped():
+    return
+
+#  Given a pcap file with many packets
+#  When the records are written straight out
+
+
+@then("the records are copies")
+def check_copies(katamari):
+    for record in katamari.records:
+        expect(record.data).to(be_a(bytes))
+    return
+
+# ******************** shrinking ******************** #
+
+
+@scenario("The reader stops when a mapped capture shrinks")
+def test_shrinking():
+    return
+
+
+@when("the file is truncated while its records are read")
+def truncate_while_reading(katamari):
+    katamari.kept = PcapFormat.header_size + 2 * PcapFormat.check_size
+    records = PcapReader(str(katamari.path)).records()
+    katamari.records = [next(records)]
+    os.truncate(str(katamari.path), katamari.kept)
+    katamari.records.extend(records)
+    return
+
+
+@then("the records stop without reading past the end of the file")
+def check_stopped(katamari):
+    expect(len(katamari.records)).to(be_below(len(katamari.timestamps)))
+    expect([record.timestamp for record in katamari.records]).to(equal(
+        katamari.timestamps[:len(katamari.records)]))
+    return
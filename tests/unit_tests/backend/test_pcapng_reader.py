@@ -0,0 +1,277 @@
+# coding=utf-8
+"""A native pcapng reader feature tests."""
+# python standard library
+from functools import partial
+import gzip
+import struct
+
+# from pypi
+from expects import (
+    be_a,
+    equal,
+    expect,
+    raise_error,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    pcapng_block,
+    pcapng_interface,
+    pcapng_packet,
+    pcapng_section,
+    ticks,
+    write_pcap,
+)
+
+# software under test
+from packets.errors import CaptureFormatError
+from packets.pcap import (
+    Interface,
+    PcapReader,
+    )
+from packets.pcapng import (
+    PcapngReader,
+    capture_reader,
+    )
+
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/pcapng_reader.feature')
+
+NANOSECONDS = 9
+BINARY = 0x80 | 20
+STATISTICS = 5
+NAME_RESOLUTION = 4
+SIMPLE_PACKET = 3
+
+
+def two_interfaces(katamari, count=200):
+    """Builds a dumpcap-like file with a nanosecond and a microsecond interface
+
+    Args:
+     katamari: object to put the expected packets on
+     count (int): number of packets
+
+    Returns:
+     list: the blocks of the file
+    """
+    blocks = [pcapng_section(),
+              pcapng_interface(127, name="wlan0mon", resolution=NANOSECONDS),
+              pcapng_interface(1, name="eth0")]
+    katamari.expected = []
+    for index in range(count):
+        interface = index % 2
+        timestamp = EPOCH + index * 1500 * 1000 + (7 if interface == 0
+                                                   else 0)
+        blocks.append(pcapng_packet(
+            timestamp, bytes(64 + index % 7), interface=interface,
+            resolution=NANOSECONDS if interface == 0 else None))
+        katamari.expected.append((timestamp, interface))
+    katamari.interfaces = [Interface("wlan0mon", 127, 262144),
+                           Interface("eth0", 1, 262144)]
+    return blocks
+
+# ******************** timestamps ******************** #
+
+
+@scenario("The reader gets the first and last timestamps of a pcapng file")
+def test_timestamps():
+    return
+
+
+@given("a pcapng file with two interfaces")
+def pcapng_file(katamari, tmp_path):
+    blocks = two_interfaces(katamari)
+    blocks.append(pcapng_block(STATISTICS, struct.pack("<III", 0, 0, 0)))
+    katamari.path = tmp_path/"dumpcap.pcapng"
+    katamari.path.write_bytes(b"".join(blocks))
+    katamari.timestamps = [timestamp for timestamp, _ in katamari.expected]
+    return
+
+
+@when("the pcapng reader gets the timestamps")
+def get_timestamps(katamari):
+    reader = PcapngReader(str(katamari.path))
+    katamari.first = reader.first
+    katamari.last = reader.last
+    return
+
+
+@then("they are the first and last packet times")
+def check_timestamps(katamari):
+    expect(katamari.first).to(equal(katamari.timestamps[0]))
+    expect(katamari.last).to(equal(katamari.timestamps[-1]))
+    return
+
+# ******************** records ******************** #
+
+
+@scenario("The reader converts each interface's time-stamp resolution")
+def test_records():
+    return
+
+#  Given a pcapng file with two interfaces
+
+
+@when("the pcapng reader gets the records")
+def get_records(katamari):
+    katamari.reader = PcapngReader(str(katamari.path))
+    katamari.records = list(katamari.reader.records())
+    return
+
+
+@then("the records have the packet times and interfaces")
+def check_records(katamari):
+    expect([(record.timestamp, record.interface)
+            for record in katamari.records]).to(equal(katamari.expected))
+    expect(all(record.header is None for record in katamari.records)).to(
+        equal(True))
+    return
+
+
+@then("the interfaces have their names and link-types")
+def check_interfaces(katamari):
+    expect(katamari.reader.interfaces).to(equal(katamari.interfaces))
+    expect(katamari.reader.header.nanoseconds).to(equal(True))
+    expect(katamari.reader.header.raw).to(equal(None))
+    return
+
+# ******************** big-endian ******************** #
+
+
+@scenario("The reader handles big-endian files with binary resolutions")
+def test_big_endian():
+    return
+
+
+@given("a big-endian pcapng file with a binary time-stamp resolution")
+def big_endian(katamari, tmp_path):
+    blocks = [pcapng_section(">"),
+              pcapng_interface(127, resolution=BINARY, byte_order=">")]
+    katamari.expected = []
+    for index in range(50):
+        timestamp = EPOCH + index * 123456789
+        blocks.append(pcapng_packet(timestamp, bytes(60), resolution=BINARY,
+                                    byte_order=">"))
+        katamari.expected.append(
+            (ticks(timestamp, BINARY) * 10**9 // 2**20, 0))
+    katamari.path = tmp_path/"big.pcapng"
+    katamari.path.write_bytes(b"".join(blocks))
+    return
+
+# ******************** other blocks ******************** #
+
+
+@scenario("The reader skips the blocks that aren't packets")
+def test_other_blocks():
+    return
+
+
+@given("a pcapng file with other blocks between the packets")
+def other_blocks(katamari, tmp_path):
+    blocks = two_interfaces(katamari, count=4)
+    simple = pcapng_block(SIMPLE_PACKET, struct.pack("<I", 60) + bytes(60))
+    blocks[5:5] = [pcapng_block(NAME_RESOLUTION, bytes(4)),
+                   pcapng_block(0x40000bad, bytes(8)), simple]
+    katamari.expected.insert(2, (katamari.expected[1][0], 0))
+    katamari.path = tmp_path/"blocks.pcapng"
+    katamari.path.write_bytes(b"".join(blocks))
+    return
+
+# ******************** truncated ******************** #
+
+
+@scenario("The reader handles a truncated last block")
+def test_truncated():
+    return
+
+
+@given("a pcapng file with a truncated last block")
+def truncated(katamari, tmp_path):
+    blocks = two_interfaces(katamari)
+    katamari.path = tmp_path/"writing.pcapng"
+    katamari.path.write_bytes(b"".join(blocks)[:-10])
+    katamari.timestamps = [timestamp
+                           for timestamp, _ in katamari.expected[:-1]]
+    return
+
+# ******************** gzip ******************** #
+
+
+@scenario("The reader handles gzipped pcapng files")
+def test_gzip():
+    return
+
+
+@given("a gzipped pcapng file")
+def gzipped(katamari, tmp_path):
+    pcapng_file(katamari, tmp_path)
+    katamari.path.write_bytes(gzip.compress(katamari.path.read_bytes()))
+    return
+
+# ******************** bad file ******************** #
+
+
+@scenario("The reader is given something that isn't a pcapng file")
+def test_bad_file():
+    return
+
+
+@given("a file with the pcapng magic but no byte-order magic")
+def bad_file(katamari, tmp_path):
+    katamari.path = tmp_path/"bad.pcapng"
+    katamari.path.write_bytes(b"\x0a\x0d\x0d\x0a" + bytes(60))
+    return
+
+
+@when("the pcapng reader reads the bad file")
+def read_bad_file(katamari):
+    katamari.reader = PcapngReader(str(katamari.path))
+    return
+
+
+@then("a CaptureFormatError is raised")
+def check_error(katamari):
+    def read():
+        return katamari.reader.first
+    expect(read).to(raise_error(CaptureFormatError))
+    return
+
+# ******************** picking ******************** #
+
+
+@scenario("The right reader is picked for a capture")
+def test_capture_reader():
+    return
+
+
+@given("a pcap file and a pcapng file")
+def both_formats(katamari, tmp_path):
+    katamari.pcap = write_pcap(tmp_path/"old.pcap", [EPOCH])
+    pcapng_file(katamari, tmp_path)
+    return
+
+
+@when("the readers are picked")
+def pick_readers(katamari):
+    katamari.readers = [capture_reader(str(katamari.pcap)),
+                        capture_reader(str(katamari.path))]
+    return
+
+
+@then("each file gets the reader for its format")
+def check_readers(katamari):
+    pcap, pcapng = katamari.readers
+    expect(pcap).to(be_a(PcapReader))
+    expect(isinstance(pcap, PcapngReader)).to(equal(False))
+    expect(pcapng).to(be_a(PcapngReader))
+    expect(pcap.first).to(equal(EPOCH))
+    expect(pcapng.first).to(equal(katamari.timestamps[0]))
+    return
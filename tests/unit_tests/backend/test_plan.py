@@ -0,0 +1,155 @@
+# coding=utf-8
+"""A merge planner feature tests."""
+# python standard library
+from functools import partial
+from collections import namedtuple
+
+# from pypi
+from expects import (
+    be_below,
+    be_within,
+    contain,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    write_pcap,
+)
+
+# software under test
+from packets.get import GetPackets
+from packets.index import Indexer
+from packets.pcap import PcapReader
+
+and_also = then
+scenario = partial(pytest_bdd.scenario, "../../features/backend/plan.feature")
+
+SECOND = 10**9
+DiskUsage = namedtuple("DiskUsage", ["total", "used", "free"])
+
+
+def getter(katamari, **kwargs):
+    """Builds the GetPackets for the window
+
+    Args:
+     katamari: object with the source and target
+     kwargs: other arguments for GetPackets
+
+    Returns:
+     GetPackets: the getter
+    """
+    return GetPackets(source=str(katamari.source),
+                      target=str(katamari.target),
+                      start=str(EPOCH // SECOND + 150),
+                      end=str(EPOCH // SECOND + 220),
+                      workers=1, **kwargs)
+
+# ******************** catalog ******************** #
+
+
+@scenario("The plan uses the catalog's packet counts")
+def test_catalog():
+    return
+
+
+@given("a catalogued capture directory")
+def catalogued(katamari, tmp_path):
+    katamari.source = tmp_path/"channel_6"
+    katamari.source.mkdir()
+    katamari.target = tmp_path/"merged.pcap"
+    katamari.files = [
+        str(write_pcap(katamari.source/"channel_6.pcap{}".format(index),
+                       [EPOCH + (index * 100 + packet) * SECOND
+                        for packet in range(100)]))
+        for index in range(4)]
+    return
+
+
+@when("the merge is planned for a window")
+def plan_window(katamari):
+    katamari.planner = getter(katamari).plan()
+    katamari.report = katamari.planner.report()
+    return
+
+
+@then("the plan has the files the merge would use")
+def check_files(katamari):
+    expect(sorted(plan.path for plan in katamari.planner.plans)).to(
+        equal(katamari.files[1:3]))
+    for plan in katamari.planner.plans:
+        expect(plan.packets).to(equal(100))
+        expect(plan.source).to(contain("catalog"))
+        expect(katamari.report).to(contain(plan.path))
+    return
+
+
+@then("the estimates are close to the real merge")
+def check_estimates(katamari):
+    getter(katamari)()
+    packets = len(list(PcapReader(str(katamari.target)).records()))
+    estimated = sum(plan.window_packets for plan in katamari.planner.plans)
+    expect(estimated).to(be_within(packets - 2, packets + 2))
+    size = katamari.target.stat().st_size
+    expect(katamari.planner.output_bytes).to(
+        be_within(size - 2 * 80, size + 2 * 80))
+    return
+
+# ******************** index ******************** #
+
+
+@scenario("The plan uses the seek-indices to estimate the reads")
+def test_index():
+    return
+
+
+@given("the files have seek-indices")
+def indexed(katamari):
+    Indexer(katamari.files, packets=10)()
+    return
+
+
+@when("the merge is planned for a window with seeking")
+def plan_with_index(katamari):
+    katamari.planner = getter(katamari, index=True).plan()
+    return
+
+
+@then("the plan reads less than the files hold")
+def check_reads(katamari):
+    plans = katamari.planner.plans
+    for plan in plans:
+        expect(plan.source).to(equal("catalog+index"))
+    expect(sum(plan.read_bytes for plan in plans)).to(
+        be_below(sum(plan.size for plan in plans) // 2))
+    return
+
+# ******************** space ******************** #
+
+
+@scenario("The plan warns when the output won't fit")
+def test_space():
+    return
+
+
+@when("the merge is planned for a disk without space")
+def plan_full_disk(katamari, mocker):
+    mocker.patch("packets.plan.shutil.disk_usage",
+                 return_value=DiskUsage(100, 100, 0))
+    katamari.report = getter(katamari).plan().report()
+    return
+
+
+@then("the report says there isn't enough space")
+def check_space(katamari):
+    expect(katamari.report).to(contain("NOT ENOUGH"))
+    return
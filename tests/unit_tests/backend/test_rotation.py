@@ -0,0 +1,162 @@
+# coding=utf-8
+"""A binary-searched tcpdump rotation feature tests."""
+# python standard library
+from functools import partial
+import gzip
+import math
+
+# from pypi
+from expects import (
+    be_below_or_equal,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    write_pcap,
+)
+
+# software under test
+from packets.get import (
+    CaptureInfo,
+    FileFilterer,
+)
+from packets.rotation import Rotation
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/rotation.feature')
+
+SECOND = 10**9
+FILES = 40
+NEWEST = 13
+
+
+def build_rotation(katamari):
+    """Builds the Rotation and counts the probes
+
+    Args:
+     katamari: object with the directory
+    """
+    katamari.captures = [CaptureInfo(str(path))
+                         for path in katamari.directory.glob("*.pcap*")]
+    katamari.rotation = Rotation(katamari.captures)
+    return
+
+# ******************** order ******************** #
+
+
+@scenario("The files of a wrapped rotation are put in time order")
+def test_order():
+    return
+
+
+@given("a rotation that has wrapped around")
+def wrapped(katamari, tmp_path):
+    katamari.directory = tmp_path
+    katamari.expected = []
+    for age in range(FILES):
+        number = (NEWEST + 1 + age) % FILES
+        start = EPOCH + age * 10 * SECOND
+        path = write_pcap(tmp_path/"channel_6.pcap{:02}".format(number),
+                          [start, start + 5 * SECOND])
+        katamari.expected.append(str(path))
+    return
+
+
+@when("the rotation is ordered")
+def order(katamari):
+    build_rotation(katamari)
+    katamari.actual = [capture.path for capture in katamari.rotation.ordered]
+    return
+
+
+@then("the files are in time order")
+def check_order(katamari):
+    expect(katamari.actual).to(equal(katamari.expected))
+    return
+
+# ******************** search ******************** #
+
+
+@scenario("The files for a time-span are found without probing them all")
+def test_search():
+    return
+
+
+@when("the rotation is searched for a time-span")
+def search(katamari):
+    build_rotation(katamari)
+    katamari.actual = katamari.rotation.between(
+        EPOCH + 107 * SECOND,
+        EPOCH + 152 * SECOND)
+    return
+
+
+@then("it gets the files that overlap the span")
+def check_span(katamari):
+    expect(katamari.actual).to(equal(katamari.expected[10:16]))
+    return
+
+
+@and_also("only a few files were probed")
+def check_probes(katamari):
+    probed = sum(1 for capture in katamari.captures
+                 if capture._first is not None)
+    expect(probed).to(be_below_or_equal(3 * math.ceil(math.log2(FILES)) + 1))
+    return
+
+# ******************** gzip ******************** #
+
+
+@scenario("A file that is still being gzipped is only used once")
+def test_gzipping():
+    return
+
+
+@given("a rotation with a file that is being gzipped")
+def gzipping(katamari, tmp_path):
+    katamari.directory = tmp_path
+    path = write_pcap(tmp_path/"channel_6.pcap00", [EPOCH])
+    (tmp_path/"channel_6.pcap00.gz").write_bytes(
+        gzip.compress(path.read_bytes())[:20])
+    katamari.expected = [str(path),
+                         str(write_pcap(tmp_path/"channel_6.pcap01",
+                                        [EPOCH + SECOND]))]
+    return
+
+#  When the rotation is ordered
+
+
+@then("the uncompressed file is used")
+def check_uncompressed(katamari):
+    expect(katamari.actual).to(equal(katamari.expected))
+    return
+
+# ******************** filterer ******************** #
+
+
+@scenario("The filterer binary-searches a rotation")
+def test_filterer():
+    return
+
+
+@when("the filterer searches the rotation for a time-span")
+def filter_rotation(katamari):
+    filterer = FileFilterer(str(katamari.directory), "channel_6.pcap*",
+                            start=EPOCH + 107 * SECOND,
+                            end=EPOCH + 152 * SECOND,
+                            rotation=True)
+    katamari.actual = filterer.file_names
+    return
+
+#  Then it gets the files that overlap the span
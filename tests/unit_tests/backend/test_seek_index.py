@@ -0,0 +1,189 @@
+# coding=utf-8
+"""A sparse seek-index for capture files feature tests."""
+# python standard library
+from functools import partial
+from pathlib import Path
+import io
+
+# from pypi
+from expects import (
+    be_above_or_equal,
+    be_below_or_equal,
+    be_true,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    write_pcap,
+)
+
+# software under test
+from packets.index import SeekIndex
+from packets.merge import MergeEngine
+from packets.pcap import PcapFormat
+
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/seek_index.feature')
+
+PACKETS = 10000
+EVERY = 100
+SIZE = 50
+RECORD = PcapFormat.record_size + SIZE
+
+
+def offset(packet):
+    """Offset of a packet in the sample files
+
+    Args:
+     packet (int): index of the packet
+
+    Returns:
+     int: offset of the packet's record
+    """
+    return PcapFormat.header_size + packet * RECORD
+
+# ******************** seek ******************** #
+
+
+@scenario("The index seeks close to the start time")
+def test_seek():
+    return
+
+
+@given("a capture file with many packets")
+def many_packets(katamari, tmp_path):
+    katamari.timestamps = [EPOCH + index * 1000 for index in range(PACKETS)]
+    katamari.path = str(write_pcap(tmp_path/"channel_6.pcap00",
+                                   katamari.timestamps, size=SIZE))
+    return
+
+
+@when("the index is asked for a time in the middle")
+def seek_middle(katamari):
+    katamari.packet = PACKETS // 2 + 17
+    katamari.actual = SeekIndex(katamari.path, packets=EVERY).seek(
+        katamari.timestamps[katamari.packet])
+    return
+
+
+@then("it gives an offset shortly before the time's packet")
+def check_offset(katamari):
+    expect(katamari.actual).to(be_below_or_equal(offset(katamari.packet)))
+    expect(katamari.actual).to(be_above_or_equal(
+        offset(katamari.packet - EVERY)))
+    return
+
+# ******************** sidecar ******************** #
+
+
+@scenario("The index is kept in a sidecar file")
+def test_sidecar():
+    return
+
+
+@when("the index is updated twice")
+def update_twice(katamari, mocker):
+    SeekIndex(katamari.path, packets=EVERY).update()
+    katamari.index = SeekIndex(katamari.path, packets=EVERY)
+    katamari.build = mocker.spy(katamari.index, "build")
+    katamari.index.update()
+    return
+
+
+@then("the second index is loaded from the sidecar")
+def check_sidecar(katamari):
+    expect(katamari.build.call_count).to(equal(0))
+    expect(len(katamari.index._offsets)).to(equal(PACKETS // EVERY))
+    return
+
+# ******************** out of order ******************** #
+
+
+@scenario("The index never skips out-of-order packets")
+def test_out_of_order():
+    return
+
+
+@given("a capture file with an out-of-order packet")
+def out_of_order(katamari, tmp_path):
+    katamari.timestamps = [EPOCH + index * 1000 for index in range(PACKETS)]
+    katamari.late = 4990
+    katamari.timestamps[katamari.late] = katamari.timestamps[5500]
+    katamari.path = str(write_pcap(tmp_path/"channel_6.pcap00",
+                                   katamari.timestamps, size=SIZE))
+    return
+
+
+@when("the index is asked for the out-of-order packet's time")
+def seek_late(katamari):
+    katamari.actual = SeekIndex(katamari.path, packets=EVERY).seek(
+        katamari.timestamps[katamari.late])
+    return
+
+
+@then("the out-of-order packet is after the offset")
+def check_late(katamari):
+    expect(katamari.actual).to(be_below_or_equal(offset(katamari.late)))
+    return
+
+# ******************** merge ******************** #
+
+
+@scenario("The merge seeks with the index")
+def test_merge():
+    return
+
+
+@when("the file is merged with and without the index")
+def merge_with_index(katamari, mocker):
+    start = katamari.timestamps[7000]
+    end = katamari.timestamps[7100]
+    katamari.plain, katamari.indexed = io.BytesIO(), io.BytesIO()
+    MergeEngine([katamari.path], start=start, end=end)(katamari.plain)
+    katamari.seek = mocker.spy(SeekIndex, "seek")
+    MergeEngine([katamari.path], start=start, end=end,
+                index=True)(katamari.indexed)
+    return
+
+
+@then("the outputs are the same")
+def check_outputs(katamari):
+    expect(katamari.seek.called).to(be_true)
+    expect(katamari.indexed.getvalue()).to(equal(katamari.plain.getvalue()))
+    return
+
+# ******************** damaged ******************** #
+
+
+@scenario("A damaged sidecar is rebuilt")
+def test_damaged():
+    return
+
+
+@given("a sidecar that was cut short while it was written")
+def damaged_sidecar(katamari):
+    index = SeekIndex(katamari.path, packets=EVERY)
+    index.update()
+    katamari.sidecar = Path(index.path)
+    katamari.whole = katamari.sidecar.read_bytes()
+    katamari.sidecar.write_bytes(katamari.whole[:len(katamari.whole) // 2
+                                                + 3])
+    return
+
+
+@then("the sidecar is whole again")
+def check_whole(katamari):
+    expect(katamari.sidecar.read_bytes()).to(equal(katamari.whole))
+    names = sorted(path.name for path in katamari.sidecar.parent.iterdir())
+    expect(names).to(equal(["channel_6.pcap00", "channel_6.pcap00.pktidx"]))
+    return
@@ -0,0 +1,203 @@
+# coding=utf-8
+"""A query server for time-windows feature tests."""
+# python standard library
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+import socket
+import threading
+
+# from pypi
+from expects import (
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    write_pcap,
+)
+
+# software under test
+from packets.pcap import PcapReader
+from packets.serve import PacketServer
+
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/serve.feature')
+
+SECOND = 10**9
+FILES = 4
+PACKETS = 60
+
+
+def timestamps(data, path):
+    """Reads the packet times out of a pcap response
+
+    Args:
+     data (bytes): the response body
+     path (Path): somewhere to put it to read it
+
+    Returns:
+     list: the epoch nanoseconds of the packets
+    """
+    path.write_bytes(data)
+    return [record.timestamp for record in PcapReader(str(path)).records()]
+
+
+@pytest.fixture
+def capture_directory(tmp_path):
+    """A directory with a minute of packets per file"""
+    directory = tmp_path/"captures"
+    directory.mkdir()
+    packets = []
+    for index in range(FILES):
+        start = EPOCH + index * PACKETS * SECOND
+        times = [start + packet * SECOND for packet in range(PACKETS)]
+        write_pcap(directory/"channel_6.pcap{:02}".format(index), times)
+        packets += times
+    return directory, packets
+
+
+def start_server(katamari, server):
+    """Starts the server in a thread (stopped when the test finishes)"""
+    katamari.server = server
+    katamari.thread = threading.Thread(target=server)
+    server.server
+    katamari.thread.start()
+    return
+
+
+@pytest.fixture(autouse=True)
+def stop_server(katamari):
+    """Shuts down the server the test started"""
+    yield
+    server = getattr(katamari, "server", None)
+    if server is not None:
+        server.shutdown()
+        katamari.thread.join()
+    return
+
+
+def query(start, end):
+    """Builds the query string for a window of seconds after the epoch"""
+    return urlencode(dict(start="{:.6f}".format((EPOCH + start) / 10**9),
+                          end="{:.6f}".format((EPOCH + end) / 10**9)))
+
+# ******************** concurrent ******************** #
+
+
+@scenario("Several clients query the server at once")
+def test_concurrent():
+    return
+
+
+@given("a packet server on localhost")
+def localhost_server(katamari, capture_directory):
+    katamari.directory, katamari.packets = capture_directory
+    start_server(katamari, PacketServer(str(katamari.directory), port=0,
+                                        workers=2))
+    katamari.url = "http://{}:{}/packets".format(
+        *katamari.server.server.server_address)
+    return
+
+
+@when("several clients query different time-windows at once")
+def concurrent_queries(katamari):
+    katamari.windows = [(10 * SECOND, 70 * SECOND),
+                        (50 * SECOND, 200 * SECOND),
+                        (0, 239 * SECOND),
+                        (100 * SECOND, 101 * SECOND)]
+
+    def fetch(window):
+        with urlopen("{}?{}".format(katamari.url, query(*window))) as response:
+            return response.read()
+
+    with ThreadPoolExecutor(max_workers=len(katamari.windows)) as pool:
+        katamari.bodies = list(pool.map(fetch, katamari.windows))
+    return
+
+
+@then("each client gets the packets in its window")
+def check_windows(katamari, tmp_path):
+    for index, (window, body) in enumerate(zip(katamari.windows,
+                                               katamari.bodies)):
+        start, end = EPOCH + window[0], EPOCH + window[1]
+        expect(timestamps(body, tmp_path/"{}.pcap".format(index))).to(
+            equal([packet for packet in katamari.packets
+                   if start <= packet <= end]))
+    return
+
+# ******************** unix socket ******************** #
+
+
+@scenario("The server listens on a Unix socket")
+def test_unix_socket():
+    return
+
+
+@given("a packet server on a Unix socket")
+def unix_server(katamari, capture_directory, tmp_path):
+    katamari.directory, katamari.packets = capture_directory
+    katamari.socket = str(tmp_path/"packets.socket")
+    start_server(katamari, PacketServer(str(katamari.directory),
+                                        socket=katamari.socket))
+    return
+
+
+@when("a client queries a time-window over the socket")
+def socket_query(katamari):
+    katamari.windows = [(30 * SECOND, 90 * SECOND)]
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(katamari.socket)
+    client.sendall("GET /packets?{} HTTP/1.0\r\n\r\n".format(
+        query(*katamari.windows[0])).encode())
+    response = b""
+    while True:
+        chunk = client.recv(2**16)
+        if not chunk:
+            break
+        response += chunk
+    client.close()
+    headers, body = response.split(b"\r\n\r\n", 1)
+    expect(headers.split()[1]).to(equal(b"200"))
+    katamari.bodies = [body]
+    return
+
+
+@then("the client gets the packets in its window")
+def check_socket_window(katamari, tmp_path):
+    check_windows(katamari, tmp_path)
+    return
+
+# ******************** bad glob ******************** #
+
+
+@scenario("The server rejects a glob that leaves the directory")
+def test_bad_glob():
+    return
+
+
+@when("a client queries with a glob outside the directory")
+def bad_glob(katamari):
+    try:
+        urlopen("{}?{}".format(katamari.url, urlencode(dict(glob="../*"))))
+    except HTTPError as error:
+        katamari.status = error.code
+    return
+
+
+@then("the client gets a bad request")
+def check_bad_request(katamari):
+    expect(katamari.status).to(equal(400))
+    return
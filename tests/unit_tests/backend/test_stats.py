@@ -0,0 +1,196 @@
+# coding=utf-8
+"""Capture statistics feature tests."""
+# python standard library
+from functools import partial
+import gzip
+
+# from pypi
+from expects import (
+    be_below_or_equal,
+    be_within,
+    contain,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    pcap_bytes,
+    write_pcap,
+)
+
+pytest.importorskip("numpy")
+
+# software under test
+from packets.get import GetPackets
+from packets.stats import (
+    CaptureStats,
+    Gap,
+)
+
+and_also = then
+scenario = partial(pytest_bdd.scenario, "../../features/backend/stats.feature")
+
+SECOND = 10**9
+SIZES = (60, 100, 1500)
+
+# ******************** window ******************** #
+
+
+@scenario("The statistics count the packets in a window")
+def test_window():
+    return
+
+
+@given("capture files with different packet sizes")
+def sized_files(katamari, tmp_path):
+    """Ten packets a second for ten seconds, each file a different size"""
+    katamari.source = tmp_path/"channel_6"
+    katamari.source.mkdir()
+    katamari.files = []
+    for index, size in enumerate(SIZES):
+        timestamps = [EPOCH + packet * SECOND // 10
+                      for packet in range(100)]
+        katamari.files.append(str(write_pcap(
+            katamari.source/"channel_6.pcap{}".format(index), timestamps,
+            size=size)))
+    katamari.start = EPOCH + 2 * SECOND
+    katamari.end = EPOCH + 49 * SECOND // 10 + SECOND // 20
+    return
+
+
+@when("the statistics are worked out for a window")
+def window_stats(katamari):
+    katamari.summary = CaptureStats(katamari.files, start=katamari.start,
+                                    end=katamari.end).summary
+    return
+
+
+@then("they count the packets and bytes in the window")
+def check_counts(katamari):
+    summary = katamari.summary
+    expect(summary.files).to(equal(3))
+    expect(summary.packets).to(equal(90))
+    expect(summary.bytes).to(equal(30 * sum(SIZES)))
+    expect(summary.captured).to(equal(summary.bytes))
+    expect(summary.first).to(equal(katamari.start))
+    expect(summary.last).to(equal(EPOCH + 49 * SECOND // 10))
+    return
+
+
+@and_also("the size percentiles and histogram match the packets")
+def check_sizes(katamari):
+    summary = katamari.summary
+    expect(summary.sizes).to(equal({50: 100, 90: 1500, 99: 1500,
+                                    99.9: 1500}))
+    histogram = dict(summary.histogram)
+    expect(histogram["0-63"]).to(equal(30))
+    expect(histogram["64-127"]).to(equal(30))
+    expect(histogram["1024-1518"]).to(equal(30))
+    expect(sum(histogram.values())).to(equal(90))
+    return
+
+
+@and_also("the rates match the packets")
+def check_rates(katamari):
+    rates = katamari.summary.rates
+    expect(rates["peak_packets"]).to(equal(30))
+    expect(rates["peak_bits"]).to(equal(10 * sum(SIZES) * 8))
+    expect(rates["packets"]).to(be_within(31, 31.1))
+    expect(max(rates["percentiles"].values())).to(be_below_or_equal(30))
+    return
+
+# ******************** gaps ******************** #
+
+
+@scenario("The gaps are where no file has packets")
+def test_gaps():
+    return
+
+
+@given("capture files that cover each other's gaps")
+def covering_files(katamari, tmp_path):
+    """The first file stops for 3-6 seconds, the second for 5-9 (so only
+    5 to 6 is empty in both)"""
+    first = [EPOCH + tenth * SECOND // 10
+             for tenth in list(range(31)) + list(range(60, 120))]
+    second = [EPOCH + tenth * SECOND // 10 + 1000
+              for tenth in list(range(50)) + list(range(90, 120))]
+    katamari.files = [str(write_pcap(tmp_path/"first.pcap", first)),
+                      str(write_pcap(tmp_path/"second.pcap", second))]
+    return
+
+
+@when("the statistics are worked out for everything")
+def all_stats(katamari):
+    katamari.statistics = CaptureStats(katamari.files, gap=0.5)
+    katamari.summary = katamari.statistics.summary
+    return
+
+
+@then("only the gap in all of the files is found")
+def check_gaps(katamari):
+    expect(katamari.summary.gaps).to(equal(
+        [Gap(EPOCH + 49 * SECOND // 10 + 1000, EPOCH + 6 * SECOND)]))
+    expect(katamari.statistics.report()).to(contain(
+        "1 gaps longer than 0.5 seconds"))
+    return
+
+# ******************** chunks ******************** #
+
+
+@scenario("Compressed and nanosecond files are read a chunk at a time")
+def test_chunks():
+    return
+
+
+@given("a gzipped big-endian nanosecond capture file")
+def gzipped_file(katamari, tmp_path):
+    katamari.timestamps = [EPOCH + packet * 1001 for packet in range(500)]
+    path = tmp_path/"channel_6.pcap.gz"
+    path.write_bytes(gzip.compress(pcap_bytes(
+        katamari.timestamps, size=50, byte_order=">", nanoseconds=True)))
+    katamari.files = [str(path)]
+    return
+
+
+@when("the statistics are worked out with small chunks")
+def chunked_stats(katamari):
+    katamari.summary = CaptureStats(katamari.files, chunk_size=1000).summary
+    return
+
+
+@then("every packet is counted once")
+def check_chunks(katamari):
+    expect(katamari.summary.packets).to(equal(500))
+    expect(katamari.summary.bytes).to(equal(500 * 50))
+    expect(katamari.summary.first).to(equal(katamari.timestamps[0]))
+    expect(katamari.summary.last).to(equal(katamari.timestamps[-1]))
+    return
+
+# ******************** getter ******************** #
+
+
+@scenario("The statistics come from the files the getter picks")
+def test_getter():
+    return
+
+#  Given capture files with different packet sizes
+
+
+@when("the getter works out the statistics for a window")
+def getter_stats(katamari):
+    getter = GetPackets(source=str(katamari.source), target=None,
+                        start=str(katamari.start / SECOND),
+                        end=str(katamari.end / SECOND), workers=1)
+    katamari.summary = getter.stats().summary
+    return
@@ -0,0 +1,130 @@
+# coding=utf-8
+"""Fast timestamp parsing feature tests."""
+# python standard library
+from datetime import (
+    datetime,
+    timezone,
+)
+from functools import partial
+
+# from pypi
+from expects import (
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import dateparser
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+
+# software under test
+from packets.get import GetDefaults
+from packets.pcap import to_nanoseconds
+from packets.timestamps import (
+    parse_timestamp,
+    parse_user_timestamp,
+)
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/timestamps.feature')
+
+LOCAL = to_nanoseconds(datetime(2018, 6, 16, 16, 32, 42))
+UTC = int(datetime(2018, 6, 16, 16, 32, 42,
+                   tzinfo=timezone.utc).timestamp()) * 10**9
+
+# ******************** strict ******************** #
+
+
+@scenario("The strict formats are parsed without dateparser")
+def test_strict():
+    return
+
+
+@given("timestamps in the capinfos, ISO-8601 and epoch formats")
+def strict_timestamps(katamari, mocker):
+    katamari.timestamps = {
+        "2018-06-16 16:32:42.322949": LOCAL + 322949000,
+        "Jun 16, 2018 16:32:42.322949123": LOCAL + 322949123,
+        "Sat Jun 16 16:32:42 2018": LOCAL,
+        "2018-06-16T16:32:42Z": UTC,
+        "2018-06-16T16:32:42.5+02:00": UTC - 2 * 3600 * 10**9 + 5 * 10**8,
+        "2018-06-16": to_nanoseconds(datetime(2018, 6, 16)),
+        "1529166762": 1529166762 * 10**9,
+        "1529166762.25": 1529166762 * 10**9 + 25 * 10**7,
+    }
+    katamari.dateparser = mocker.spy(dateparser, "parse")
+    return
+
+
+@when("the timestamps are parsed")
+def parse_all(katamari):
+    katamari.actual = {text: parse_timestamp(text)
+                       for text in katamari.timestamps}
+    return
+
+
+@then("they are the expected epoch nanoseconds")
+def check_parsed(katamari):
+    expect(katamari.actual).to(equal(katamari.timestamps))
+    return
+
+
+@and_also("dateparser isn't used")
+def check_no_dateparser(katamari):
+    expect(katamari.dateparser.call_count).to(equal(0))
+    return
+
+# ******************** defaults ******************** #
+
+
+@scenario("The default times are the epoch and the year 9999")
+def test_defaults():
+    return
+
+
+@given("the default start and end times")
+def default_timestamps(katamari):
+    katamari.timestamps = {
+        GetDefaults.start: 0,
+        GetDefaults.end: to_nanoseconds(datetime(9999, 1, 1)),
+    }
+    return
+
+#  When the timestamps are parsed
+#  Then they are the expected epoch nanoseconds
+
+# ******************** free-form ******************** #
+
+
+@scenario("Free-form times fall back to dateparser")
+def test_free_form():
+    return
+
+
+@given("a free-form timestamp")
+def free_form(katamari, mocker):
+    katamari.moment = datetime(2018, 6, 16, 16, 32, 42)
+    katamari.dateparser = mocker.patch("dateparser.parse",
+                                       return_value=katamari.moment)
+    return
+
+
+@when("the user timestamp is parsed")
+def parse_user(katamari):
+    katamari.actual = parse_user_timestamp("two days ago")
+    return
+
+
+@then("dateparser is used")
+def check_dateparser(katamari):
+    katamari.dateparser.assert_called_once_with("two days ago")
+    expect(katamari.actual).to(equal(LOCAL))
+    expect(parse_timestamp("two days ago")).to(equal(None))
+    return
@@ -0,0 +1,261 @@
+# coding=utf-8
+"""Watching the captures to keep the catalog current feature tests."""
+# python standard library
+from functools import partial
+import threading
+import time
+
+# from pypi
+from expects import (
+    be_above,
+    be_false,
+    contain,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .samples import (
+    EPOCH,
+    write_pcap,
+)
+
+# software under test
+from packets.catalog import Catalog
+from packets.get import FileFilterer
+from packets.watch import (
+    Inotify,
+    Watcher,
+    )
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/backend/watch.feature')
+
+SECOND = 10**9
+PACKETS = 10
+TIMEOUT = 10
+
+
+def write_capture(directory, index):
+    """Writes a capture file a minute after the one before it
+
+    Args:
+     directory (Path): where to write it
+     index (int): the file's number
+
+    Returns:
+     Path: the capture
+    """
+    start = EPOCH + index * 60 * SECOND
+    return write_pcap(directory/"channel_6.pcap{:02}".format(index),
+                      [start + packet * SECOND for packet in range(PACKETS)])
+
+
+def wait_for(check):
+    """Waits for the watcher to catch up
+
+    Args:
+     check: callable that returns True once it has
+    """
+    deadline = time.monotonic() + TIMEOUT
+    while not check() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return
+
+
+def names(directory):
+    """The names in the directory's catalog"""
+    catalog = Catalog(str(directory))
+    try:
+        return set(catalog.entries)
+    finally:
+        catalog.close()
+
+# ******************** inotify ******************** #
+
+
+@scenario("The watcher keeps up with new and deleted files (inotify)")
+def test_inotify():
+    return
+
+
+def start_watcher(katamari, tmp_path, mocker, polling):
+    """Writes the first files and starts the watcher in a thread"""
+    katamari.directory = tmp_path
+    katamari.paths = [write_capture(tmp_path, index) for index in range(3)]
+    katamari.watcher = Watcher(str(tmp_path), interval=0.05,
+                               polling=polling)
+    katamari.probe = mocker.spy(Catalog, "probe")
+    katamari.stop = threading.Event()
+    katamari.thread = threading.Thread(target=katamari.watcher,
+                                       args=(katamari.stop,))
+    katamari.thread.start()
+    wait_for(lambda: len(names(tmp_path)) == 3)
+    katamari.first_pass = katamari.probe.call_count
+    return
+
+
+@given("a watcher on a directory of capture files")
+def inotify_watcher(katamari, tmp_path, mocker):
+    start_watcher(katamari, tmp_path, mocker, polling=False)
+    return
+
+
+@when("files are added and deleted while it watches")
+def add_and_delete(katamari):
+    katamari.new = write_capture(katamari.directory, 3)
+    katamari.paths[0].unlink()
+    wait_for(lambda: names(katamari.directory) == set(
+        path.name for path in katamari.paths[1:] + [katamari.new]))
+    katamari.stop.set()
+    katamari.thread.join(TIMEOUT)
+    return
+
+
+@then("the catalog has the new file and not the deleted one")
+def check_catalog(katamari):
+    actual = names(katamari.directory)
+    expect(actual).to(contain(katamari.new.name))
+    expect(actual).not_to(contain(katamari.paths[0].name))
+    expect(len(actual)).to(equal(3))
+    return
+
+
+@and_also("only the new file was probed after the first pass")
+def check_probes(katamari):
+    expect(katamari.first_pass).to(equal(3))
+    probed = [call.args[1].path for call in
+              katamari.probe.call_args_list[katamari.first_pass:]]
+    expect(set(probed)).to(equal({str(katamari.new)}))
+    return
+
+# ******************** polling ******************** #
+
+
+@scenario("The watcher keeps up with new and deleted files (polling)")
+def test_polling():
+    return
+
+
+@given("a polling watcher on a directory of capture files")
+def polling_watcher(katamari, tmp_path, mocker):
+    start_watcher(katamari, tmp_path, mocker, polling=True)
+    return
+
+#  When files are added and deleted while it watches
+#  Then the catalog has the new file and not the deleted one
+
+# ******************** broken file ******************** #
+
+
+@scenario("A file that can't be probed doesn't hold up the others")
+def test_broken_file():
+    return
+
+#  Given a watcher on a directory of capture files
+
+
+@when("a new file and one that can't be probed change together")
+def add_broken(katamari, mocker):
+    katamari.broken = katamari.directory/"channel_6.pcap99"
+    probe = Catalog.probe
+
+    def broken(catalog, capture):
+        if capture.path == str(katamari.broken):
+            raise OSError("can't read {}".format(capture.path))
+        return probe(catalog, capture)
+    katamari.probe = mocker.patch.object(Catalog, "probe", autospec=True,
+                                         side_effect=broken)
+    katamari.broken.write_bytes(katamari.paths[0].read_bytes())
+    katamari.new = write_capture(katamari.directory, 3)
+    wait_for(lambda: katamari.new.name in names(katamari.directory)
+             and [call.args[1].path
+                  for call in katamari.probe.call_args_list].count(
+                      str(katamari.broken)) > 2)
+    katamari.stop.set()
+    katamari.thread.join(TIMEOUT)
+    return
+
+
+@then("the catalog has the new file and not the broken one")
+def check_broken_catalog(katamari):
+    actual = names(katamari.directory)
+    expect(actual).to(contain(katamari.new.name))
+    expect(actual).not_to(contain(katamari.broken.name))
+    return
+
+
+@and_also("the broken file was tried again")
+def check_retried(katamari):
+    probed = [call.args[1].path for call in katamari.probe.call_args_list]
+    expect(probed.count(str(katamari.broken))).to(be_above(2))
+    return
+
+# ******************** overflow ******************** #
+
+
+@scenario("The watcher rescans everything when inotify loses events")
+def test_overflow():
+    return
+
+
+@given("a watcher whose inotify queue overflows")
+def overflowing_watcher(katamari, tmp_path, mocker):
+    # the first read after the first pass loses its events, the files
+    # only show up if the watcher rescans the directory
+    overflowed = []
+
+    def read(inotify, timeout):
+        time.sleep(timeout)
+        if hasattr(katamari, "new") and not overflowed:
+            overflowed.append(True)
+            return None
+        return set()
+    mocker.patch.object(Inotify, "read", read)
+    start_watcher(katamari, tmp_path, mocker, polling=False)
+    return
+
+#  When files are added and deleted while it watches
+#  Then the catalog has the new file and not the deleted one
+
+# ******************** heartbeat ******************** #
+
+
+@scenario("The filterer trusts a watched catalog")
+def test_heartbeat():
+    return
+
+
+@given("a catalog with a recent heartbeat")
+def watched_catalog(katamari, tmp_path):
+    katamari.directory = tmp_path
+    katamari.paths = [write_capture(tmp_path, index) for index in range(3)]
+    katamari.catalog = Catalog(str(tmp_path))
+    katamari.catalog.update(FileFilterer(str(tmp_path), "*").all_files)
+    katamari.catalog.beat()
+    return
+
+
+@when("the filterer uses the watched catalog")
+def filter_watched(katamari, mocker):
+    katamari.update = mocker.spy(katamari.catalog, "update")
+    katamari.actual = FileFilterer(str(katamari.directory), "*",
+                                   start=EPOCH, end=EPOCH + 70 * SECOND,
+                                   catalog=katamari.catalog).file_names
+    return
+
+
+@then("the files aren't checked")
+def check_not_updated(katamari):
+    expect(katamari.update.called).to(be_false)
+    expect(katamari.actual).to(equal([str(path)
+                                      for path in katamari.paths[:2]]))
+    return
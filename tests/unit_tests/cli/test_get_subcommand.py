@@ -109,18 +109,29 @@ def call_with_source_and_target(katamari, mocker, faker):
     katamari.getter_instance = mocker.MagicMock()
     katamari.getter = mocker.MagicMock(spec=GetPackets,
                                        return_value=katamari.getter_instance)
-    mocker.patch("packets.main.GetPackets", katamari.getter)
+    mocker.patch("packets.get.GetPackets", katamari.getter)
     katamari.source = "/tmp"
     katamari.target = faker.unix_partition()
     katamari.result = katamari.runner.invoke(main, [GetOption.subcommand,
                                                     katamari.source,
                                                     katamari.target])
     expect(katamari.result.exit_code).to(equal(ExitCode.okay))
-    katamari.arguments = dict(source=katamari.source,
+    katamari.arguments = dict(source=[katamari.source],
                               target=katamari.target,
                               source_glob=GetDefaults.glob,
                               start=GetDefaults.start,
-                              end=GetDefaults.end)
+                              end=GetDefaults.end,
+                              catalog=GetDefaults.catalog,
+                              workers=GetDefaults.workers,
+                              compression=GetDefaults.compression,
+                              rotation=GetDefaults.rotation,
+                              index=GetDefaults.index,
+                              tag=GetDefaults.tag,
+                              fan_in=GetDefaults.fan_in,
+                              max_memory=GetDefaults.max_memory,
+                              max_files=GetDefaults.max_files,
+                              buffer_size=GetDefaults.buffer_size,
+                              dedupe=GetDefaults.dedupe)
     return
 
 
@@ -180,7 +191,7 @@ def test_no_arguments():
 @when("the user calls the get subcommand with no options")
 def no_options(katamari, mocker):
     katamari.getter = mocker.MagicMock(spec=GetPackets)
-    mocker.patch("packets.main.GetPackets", katamari.getter)
+    mocker.patch("packets.get.GetPackets", katamari.getter)
     katamari.result = katamari.runner.invoke(main, [GetOption.subcommand])
     katamari.error_message = 'Error: Missing argument "source"'    
     return
@@ -204,7 +215,7 @@ def all_the_options(katamari, mocker, faker):
     katamari.getter = mocker.MagicMock(spec=GetPackets,
                                        return_value=katamari.getter_instance)
     
-    mocker.patch("packets.main.GetPackets", katamari.getter)
+    mocker.patch("packets.get.GetPackets", katamari.getter)
     katamari.source = "/tmp"
     katamari.target = faker.unix_partition()
     katamari.source_glob = "channel_6*"
@@ -218,14 +229,153 @@ def all_the_options(katamari, mocker, faker):
                                                     "--glob", katamari.source_glob,
                                                     "--start", katamari.start,
                                                     "--end", katamari.end,
-                                                    "--compression", katamari.compression])
-    katamari.arguments = dict(source=katamari.source,
+                                                    "--compression", katamari.compression,
+                                                    "--fan-in", "16",
+                                                    "--max-memory", "512M",
+                                                    "--max-files", "64",
+                                                    "--buffer-size", "16KiB"])
+    katamari.arguments = dict(source=[katamari.source],
                               target=katamari.target,
                               source_glob=katamari.source_glob,
                               start=katamari.start,
-                              end=katamari.end)
+                              end=katamari.end,
+                              catalog=GetDefaults.catalog,
+                              workers=GetDefaults.workers,
+                              compression=katamari.compression,
+                              rotation=GetDefaults.rotation,
+                              index=GetDefaults.index,
+                              tag=GetDefaults.tag,
+                              fan_in=16,
+                              max_memory=512 * 2**20,
+                              max_files=64,
+                              buffer_size=16 * 2**10,
+                              dedupe=GetDefaults.dedupe)
     return
 
 #  Then it returns an okay status
 #  And the GetPackets object is built with the expected arguments
 #  And the GetPackets object is run
+
+# ******************** several sources ******************** #
+
+
+@scenario("The user calls the get subcommand with several sources")
+def test_several_sources():
+    return
+
+#  Given a cli runner
+
+
+@when("the user calls the get subcommand with several sources and a tag")
+def several_sources(katamari, mocker, faker, tmp_path):
+    katamari.getter_instance = mocker.MagicMock()
+    katamari.getter = mocker.MagicMock(spec=GetPackets,
+                                       return_value=katamari.getter_instance)
+    mocker.patch("packets.get.GetPackets", katamari.getter)
+    sources = []
+    for channel in (1, 6, 11):
+        source = tmp_path/"channel_{}".format(channel)
+        source.mkdir()
+        sources.append(str(source))
+    katamari.target = faker.unix_partition()
+    katamari.result = katamari.runner.invoke(main, [GetOption.subcommand]
+                                             + sources
+                                             + [katamari.target, "--tag"])
+    katamari.arguments = dict(source=sources,
+                              target=katamari.target,
+                              source_glob=GetDefaults.glob,
+                              start=GetDefaults.start,
+                              end=GetDefaults.end,
+                              catalog=GetDefaults.catalog,
+                              workers=GetDefaults.workers,
+                              compression=GetDefaults.compression,
+                              rotation=GetDefaults.rotation,
+                              index=GetDefaults.index,
+                              tag=True,
+                              fan_in=GetDefaults.fan_in,
+                              max_memory=GetDefaults.max_memory,
+                              max_files=GetDefaults.max_files,
+                              buffer_size=GetDefaults.buffer_size,
+                              dedupe=GetDefaults.dedupe)
+    return
+
+#  Then it returns an okay status
+#  And the GetPackets object is built with the expected arguments
+#  And the GetPackets object is run
+
+# ******************** plan ******************** #
+
+
+@scenario("The user asks for a plan instead of the packets")
+def test_plan():
+    return
+
+#  Given a cli runner
+
+
+@when("the user calls the get subcommand with the plan option")
+def plan_option(katamari, mocker, faker):
+    katamari.getter_instance = mocker.MagicMock()
+    katamari.report = faker.sentence()
+    katamari.getter_instance.plan.return_value.report.return_value = (
+        katamari.report)
+    katamari.getter = mocker.MagicMock(spec=GetPackets,
+                                       return_value=katamari.getter_instance)
+    mocker.patch("packets.get.GetPackets", katamari.getter)
+    katamari.result = katamari.runner.invoke(main, [GetOption.subcommand,
+                                                    "/tmp",
+                                                    faker.unix_partition(),
+                                                    "--plan"])
+    return
+
+#  Then it returns an okay status
+
+
+@and_also("the plan's report is output instead of merging")
+def check_plan(katamari):
+    expect(katamari.result.output).to(contain(katamari.report))
+    katamari.getter_instance.plan.assert_called_once_with()
+    katamari.getter_instance.assert_not_called()
+    return
+
+# ******************** dedupe ******************** #
+
+
+@scenario("The user asks for the duplicate frames to be dropped")
+def test_dedupe():
+    return
+
+#  Given a cli runner
+
+
+@when("the user calls the get subcommand with the dedupe options")
+def dedupe_options(katamari, mocker, faker):
+    katamari.getter_instance = mocker.MagicMock()
+    deduplicator = katamari.getter_instance.merger.deduplicator
+    deduplicator.dropped, deduplicator.bytes = 12, 3456
+    katamari.getter = mocker.MagicMock(spec=GetPackets,
+                                       return_value=katamari.getter_instance)
+    mocker.patch("packets.get.GetPackets", katamari.getter)
+    katamari.result = katamari.runner.invoke(main, [GetOption.subcommand,
+                                                    "/tmp",
+                                                    faker.unix_partition(),
+                                                    "--dedupe",
+                                                    "--dedupe-window",
+                                                    "0.05"])
+    return
+
+#  Then it returns an okay status
+
+
+@and_also("the GetPackets object is built to drop the duplicates")
+def check_dedupe(katamari):
+    expect(katamari.getter.call_args[1]["dedupe"]).to(equal(0.05))
+    katamari.getter_instance.assert_called_once_with()
+    return
+
+
+@and_also("the removed duplicates are reported")
+def check_removed(katamari):
+    expect(katamari.result.output).to(contain(
+        "Removed 12 duplicate frames (3456 bytes)"))
+    return
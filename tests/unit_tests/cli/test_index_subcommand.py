@@ -0,0 +1,151 @@
+# coding=utf-8
+"""The index sub-command feature tests."""
+# python standard library
+from functools import partial
+
+# from pypi
+from click.testing import CliRunner
+from expects import (
+    equal,
+    expect,
+    start_with,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# Test help
+from ..fixtures import katamari
+from .common import (
+    ExitCode,
+    Option,
+    )
+
+# software under test
+from packets.main import main
+from packets.get import GetDefaults
+from packets.index import (
+    IndexDefaults,
+    Indexer,
+    )
+from packets.watch import (
+    WatchDefaults,
+    Watcher,
+    )
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/cli/index_subcommand.feature')
+
+
+class IndexOption:
+    """Something to keep all the strings together"""
+    subcommand = "index"
+
+# ******************** help ******************** #
+
+
+@scenario("The user calls the index subcommand with the help option")
+def test_help():
+    return
+
+
+@given('a cli runner')
+def a_cli_runner(katamari):
+    katamari.runner = CliRunner()
+    return
+
+
+@when("the user calls the index subcommand with the help option")
+def call_help(katamari):
+    katamari.result = katamari.runner.invoke(main, [IndexOption.subcommand,
+                                                    Option.long_help])
+    return
+
+
+@then('it returns an okay status')
+def it_returns_an_okay_status(katamari):
+    expect(katamari.result.exit_code).to(equal(ExitCode.okay))
+    return
+
+
+@and_also('it outputs the help message')
+def it_outputs_the_help_message(katamari):
+    expect(katamari.result.output).to(start_with("Usage"))
+    return
+
+# ******************** source ******************** #
+
+
+@scenario("The user calls the index subcommand with a source")
+def test_source():
+    return
+
+
+@when("the user calls the index subcommand with a source")
+def call_source(katamari, mocker, tmp_path):
+    katamari.files = [str(tmp_path/name) for name in ("a.pcap", "b.pcap")]
+    for name in katamari.files:
+        open(name, "w").close()
+    katamari.indexer_instance = mocker.MagicMock()
+    katamari.indexer = mocker.MagicMock(spec=Indexer,
+                                        return_value=katamari.indexer_instance)
+    mocker.patch("packets.index.Indexer", katamari.indexer)
+    katamari.result = katamari.runner.invoke(main, [IndexOption.subcommand,
+                                                    str(tmp_path),
+                                                    "--glob", "*.pcap"])
+    return
+
+
+@and_also("the Indexer is built with the source files")
+def check_indexer(katamari):
+    katamari.indexer.assert_called_once_with(
+        sorted(katamari.indexer.call_args[0][0]),
+        packets=IndexDefaults.packets,
+        seconds=IndexDefaults.seconds,
+        workers=GetDefaults.workers)
+    expect(sorted(katamari.indexer.call_args[0][0])).to(
+        equal(katamari.files))
+    return
+
+
+@and_also("the Indexer is run")
+def check_run(katamari):
+    katamari.indexer_instance.assert_called_once_with()
+    return
+
+# ******************** watch ******************** #
+
+
+@scenario("The user calls the index subcommand with the watch option")
+def test_watch():
+    return
+
+
+@when("the user calls the index subcommand with the watch option")
+def call_watch(katamari, mocker, tmp_path):
+    katamari.source = str(tmp_path)
+    katamari.watcher_instance = mocker.MagicMock()
+    katamari.watcher = mocker.MagicMock(spec=Watcher,
+                                        return_value=katamari.watcher_instance)
+    mocker.patch("packets.watch.Watcher", katamari.watcher)
+    katamari.result = katamari.runner.invoke(main, [IndexOption.subcommand,
+                                                    katamari.source,
+                                                    "--watch", "--poll"])
+    return
+
+
+@and_also("the Watcher is built and run")
+def check_watcher(katamari):
+    katamari.watcher.assert_called_once_with(
+        katamari.source, GetDefaults.glob,
+        packets=IndexDefaults.packets,
+        seconds=IndexDefaults.seconds,
+        workers=GetDefaults.workers,
+        interval=WatchDefaults.interval,
+        polling=True)
+    katamari.watcher_instance.assert_called_once_with()
+    return
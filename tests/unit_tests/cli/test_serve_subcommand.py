@@ -0,0 +1,74 @@
+# coding=utf-8
+"""The serve sub-command feature tests."""
+# python standard library
+from functools import partial
+
+# from pypi
+from click.testing import CliRunner
+from expects import (
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# Test help
+from ..fixtures import katamari
+from .common import ExitCode
+
+# software under test
+from packets.main import main
+from packets.get import GetDefaults
+from packets.serve import (
+    PacketServer,
+    ServeDefaults,
+    )
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/cli/serve_subcommand.feature')
+
+
+@scenario("The user calls the serve subcommand with a socket")
+def test_socket():
+    return
+
+
+@given('a cli runner')
+def a_cli_runner(katamari):
+    katamari.runner = CliRunner()
+    return
+
+
+@when("the user calls the serve subcommand with a socket")
+def call_socket(katamari, mocker, tmp_path):
+    katamari.source = str(tmp_path)
+    katamari.socket = str(tmp_path/"packets.socket")
+    katamari.server_instance = mocker.MagicMock()
+    katamari.server = mocker.MagicMock(spec=PacketServer,
+                                       return_value=katamari.server_instance)
+    mocker.patch("packets.serve.PacketServer", katamari.server)
+    katamari.result = katamari.runner.invoke(main, ["serve", katamari.source,
+                                                    "--socket",
+                                                    katamari.socket])
+    return
+
+
+@then('it returns an okay status')
+def it_returns_an_okay_status(katamari):
+    expect(katamari.result.exit_code).to(equal(ExitCode.okay))
+    return
+
+
+@and_also("the PacketServer is built and run")
+def check_server(katamari):
+    katamari.server.assert_called_once_with(
+        katamari.source, socket=katamari.socket, port=ServeDefaults.port,
+        catalog=GetDefaults.catalog, workers=GetDefaults.workers,
+        index=GetDefaults.index)
+    katamari.server_instance.assert_called_once_with()
+    return
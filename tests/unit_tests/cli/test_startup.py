@@ -0,0 +1,130 @@
+# coding=utf-8
+"""Fast command-line start-up feature tests.
+
+These time fresh interpreters (so nothing is cached in sys.modules), the
+best of a few runs is used so a busy machine doesn't make them flaky
+"""
+# python standard library
+from functools import partial
+from pathlib import Path
+import os
+import subprocess
+import sys
+import time
+
+# from pypi
+from expects import (
+    be_below,
+    contain,
+    equal,
+    expect,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+
+# software under test
+import packets
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/cli/startup.feature')
+
+
+class StartupBudget:
+    """Most seconds the commands can take to start (and finish)"""
+    help = 0.5
+    get = 0.75
+    runs = 3
+    script = ("import sys; from packets.main import main\n"
+              "try:\n"
+              "    main()\n"
+              "except SystemExit:\n"
+              "    pass\n"
+              "print(' '.join(sorted(sys.modules)))\n")
+
+
+def run(arguments):
+    """Runs the command-line in a fresh interpreter
+
+    Args:
+     arguments (list): arguments for the packets command
+
+    Returns:
+     tuple: fastest seconds, the modules that were imported
+    """
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = str(Path(packets.__file__).parent.parent)
+    fastest = None
+    for _ in range(StartupBudget.runs):
+        started = time.perf_counter()
+        outcome = subprocess.run(
+            [sys.executable, "-c", StartupBudget.script] + arguments,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, env=environment)
+        elapsed = time.perf_counter() - started
+        expect(outcome.returncode).to(equal(0))
+        fastest = elapsed if fastest is None else min(fastest, elapsed)
+    return fastest, outcome.stdout.splitlines()[-1].split()
+
+# ******************** help ******************** #
+
+
+@scenario("The help starts within the budget")
+def test_help():
+    return
+
+
+@given("the startup budget")
+def startup_budget(katamari):
+    katamari.budget = StartupBudget
+    return
+
+
+@when("the user calls packets with the help option (timed)")
+def time_help(katamari):
+    katamari.limit = katamari.budget.help
+    katamari.elapsed, katamari.modules = run(["--help"])
+    return
+
+
+@then("it starts within the budget")
+def check_budget(katamari):
+    expect(katamari.elapsed).to(be_below(katamari.limit))
+    return
+
+
+@and_also("it doesn't import the heavy modules")
+def check_help_modules(katamari):
+    for module in ("dateparser", "packets.get", "sqlite3"):
+        expect(katamari.modules).not_to(contain(module))
+    return
+
+# ******************** get ******************** #
+
+
+@scenario("A trivial get starts within the budget")
+def test_get():
+    return
+
+
+@when("the user gets packets from an empty directory (timed)")
+def time_get(katamari, tmp_path):
+    katamari.limit = katamari.budget.get
+    source = tmp_path/"empty"
+    source.mkdir()
+    katamari.elapsed, katamari.modules = run(
+        ["get", "--no-catalog", str(source), str(tmp_path/"out.pcap")])
+    return
+
+
+@and_also("it doesn't import dateparser")
+def check_get_modules(katamari):
+    expect(katamari.modules).not_to(contain("dateparser"))
+    return
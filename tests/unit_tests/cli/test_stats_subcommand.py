@@ -0,0 +1,160 @@
+# coding=utf-8
+"""The stats sub-command feature tests."""
+# python standard library
+from functools import partial
+
+# from pypi
+from click.testing import CliRunner
+from expects import (
+    contain,
+    equal,
+    expect,
+    start_with,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from .common import (
+    ExitCode,
+    Option,
+    )
+
+# software under test
+from packets.main import main
+from packets.get import (
+    GetDefaults,
+    GetPackets,
+)
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/cli/stats_subcommand.feature')
+
+
+class StatsOption:
+    """Something to keep all the strings together"""
+    subcommand = "stats"
+
+# ******************** help ******************** #
+
+
+@scenario("The user calls the stats subcommand with the help option")
+def test_help():
+    return
+
+
+@given('a cli runner')
+def a_cli_runner(katamari):
+    katamari.runner = CliRunner()
+    return
+
+
+@when("the user calls the stats subcommand with the help option")
+def call_help(katamari):
+    katamari.result = katamari.runner.invoke(main, [StatsOption.subcommand,
+                                                    Option.long_help])
+    return
+
+
+@then('it returns an okay status')
+def it_returns_an_okay_status(katamari):
+    expect(katamari.result.exit_code).to(equal(ExitCode.okay))
+    return
+
+
+@and_also('it outputs the help message')
+def it_outputs_the_help_message(katamari):
+    expect(katamari.result.output).to(start_with("Usage"))
+    return
+
+# ******************** sources ******************** #
+
+
+@scenario("The user calls the stats subcommand with sources")
+def test_sources():
+    return
+
+#  Given a cli runner
+
+
+@when("the user calls the stats subcommand with sources and a window")
+def call_sources(katamari, mocker, faker, tmp_path):
+    katamari.sources = [str(tmp_path/name) for name in ("one", "two")]
+    for source in katamari.sources:
+        (tmp_path/source).mkdir()
+    katamari.start, katamari.end = "2018-06-16", "2018-06-17"
+    katamari.report = faker.sentence()
+    katamari.getter_instance = mocker.MagicMock()
+    katamari.getter_instance.stats.return_value.report.return_value = (
+        katamari.report)
+    katamari.getter = mocker.MagicMock(spec=GetPackets,
+                                       return_value=katamari.getter_instance)
+    mocker.patch("packets.get.GetPackets", katamari.getter)
+    katamari.result = katamari.runner.invoke(
+        main, [StatsOption.subcommand] + katamari.sources
+        + ["--start", katamari.start, "--end", katamari.end,
+           "--gap", "2.5", "--index"])
+    return
+
+#  Then it returns an okay status
+
+
+@and_also("the GetPackets object is built with the sources and window")
+def check_getter(katamari):
+    katamari.getter.assert_called_once_with(
+        source=katamari.sources, target=None,
+        source_glob=GetDefaults.glob,
+        start=katamari.start, end=katamari.end,
+        catalog=GetDefaults.catalog,
+        workers=GetDefaults.workers,
+        rotation=GetDefaults.rotation,
+        index=True)
+    katamari.getter_instance.stats.assert_called_once_with(gap=2.5)
+    return
+
+
+@and_also("the statistics' report is output")
+def check_report(katamari):
+    expect(katamari.result.output).to(contain(katamari.report))
+    katamari.getter_instance.assert_not_called()
+    return
+
+# ******************** numpy ******************** #
+
+
+@scenario("The user calls the stats subcommand without NumPy")
+def test_no_numpy():
+    return
+
+#  Given a cli runner
+
+
+@when("the user calls the stats subcommand without NumPy installed")
+def call_without_numpy(katamari, mocker, tmp_path):
+    getter_instance = mocker.MagicMock()
+    getter_instance.stats.side_effect = ModuleNotFoundError(
+        "No module named 'numpy'", name="numpy")
+    mocker.patch("packets.get.GetPackets",
+                 mocker.MagicMock(spec=GetPackets,
+                                  return_value=getter_instance))
+    katamari.result = katamari.runner.invoke(main, [StatsOption.subcommand,
+                                                    str(tmp_path)])
+    return
+
+
+@then("it returns the failure status")
+def check_failure(katamari):
+    expect(katamari.result.exit_code).to(equal(1))
+    return
+
+
+@and_also("it says NumPy is needed")
+def check_message(katamari):
+    expect(katamari.result.output).to(contain("needs NumPy"))
+    return
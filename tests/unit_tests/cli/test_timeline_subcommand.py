@@ -0,0 +1,147 @@
+# coding=utf-8
+"""The timeline sub-command feature tests."""
+# python standard library
+from functools import partial
+
+# from pypi
+from click.testing import CliRunner
+from expects import (
+    contain,
+    equal,
+    expect,
+    start_with,
+)
+from pytest_bdd import (
+    given,
+    then,
+    when,
+)
+import pytest_bdd
+
+# for testing
+from ..fixtures import katamari
+from ..backend.samples import (
+    EPOCH,
+    write_pcap,
+)
+from .common import (
+    ExitCode,
+    Option,
+    )
+
+# software under test
+from packets.main import main
+from packets.get import GetDefaults
+from packets.timeline import Timeline
+
+and_also = then
+scenario = partial(pytest_bdd.scenario,
+                   '../../features/cli/timeline_subcommand.feature')
+
+MINUTE = 60 * 10**9
+
+
+class TimelineOption:
+    """Something to keep all the strings together"""
+    subcommand = "timeline"
+
+# ******************** help ******************** #
+
+
+@scenario("The user calls the timeline subcommand with the help option")
+def test_help():
+    return
+
+
+@given('a cli runner')
+def a_cli_runner(katamari):
+    katamari.runner = CliRunner()
+    return
+
+
+@when("the user calls the timeline subcommand with the help option")
+def call_help(katamari):
+    katamari.result = katamari.runner.invoke(main, [TimelineOption.subcommand,
+                                                    Option.long_help])
+    return
+
+
+@then('it returns an okay status')
+def it_returns_an_okay_status(katamari):
+    expect(katamari.result.exit_code).to(equal(ExitCode.okay))
+    return
+
+
+@and_also('it outputs the help message')
+def it_outputs_the_help_message(katamari):
+    expect(katamari.result.output).to(start_with("Usage"))
+    return
+
+# ******************** source ******************** #
+
+
+@scenario("The user calls the timeline subcommand with a source")
+def test_source():
+    return
+
+
+@when("the user calls the timeline subcommand with a source and buckets")
+def call_source(katamari, mocker, faker, tmp_path):
+    katamari.source = str(tmp_path)
+    katamari.report = faker.sentence()
+    katamari.timeline_instance = mocker.MagicMock()
+    katamari.timeline_instance.report.return_value = katamari.report
+    katamari.timeline = mocker.MagicMock(
+        spec=Timeline, return_value=katamari.timeline_instance)
+    mocker.patch("packets.timeline.Timeline", katamari.timeline)
+    katamari.result = katamari.runner.invoke(
+        main, [TimelineOption.subcommand, katamari.source,
+               "--start", "2018-06-16", "--minutes", "60"])
+    return
+
+
+@and_also("the Timeline is built with the source and buckets")
+def check_timeline(katamari):
+    katamari.timeline.assert_called_once_with(
+        katamari.source, GetDefaults.glob, start="2018-06-16",
+        end=GetDefaults.end, minutes=60, workers=GetDefaults.workers)
+    return
+
+
+@and_also("the timeline's report is output")
+def check_report(katamari):
+    expect(katamari.result.output).to(contain(katamari.report))
+    return
+
+# ******************** catalog ******************** #
+
+
+@scenario("The timeline is counted from a directory's catalog")
+def test_catalog():
+    return
+
+
+@given("a directory with a capture file")
+def capture_directory(katamari, tmp_path):
+    katamari.runner = CliRunner()
+    katamari.source = tmp_path
+    base = EPOCH - EPOCH % MINUTE
+    write_pcap(tmp_path/"channel_6.pcap0",
+               [base + tick * 10**9 for tick in range(90)])
+    return
+
+
+@when("the user calls the timeline subcommand on the directory")
+def call_directory(katamari):
+    katamari.result = katamari.runner.invoke(
+        main, [TimelineOption.subcommand, str(katamari.source)])
+    return
+
+
+@and_also("the output has a row for each minute with packets")
+def check_rows(katamari):
+    lines = katamari.result.output.splitlines()
+    expect(len(lines)).to(equal(3))
+    expect(lines[1].split()[2:]).to(equal(["60", "3.8", "KiB", "1"]))
+    expect(lines[2].split()[2:]).to(equal(["30", "1.9", "KiB", "1"]))
+    return